@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""Documents per second for batches of tiny inputs.
+
+Compares ``commonmark.render_batch()`` with calling ``commonmark()`` in
+a loop, on ``-n`` one-to-three-line comments, some of them plain text
+and some with inline or block syntax.
+
+    $ python bench/batch.py -n 10000
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import itertools
+import time
+
+import commonmark
+
+timer = getattr(time, 'perf_counter', time.time)
+
+COMMENTS = [
+    'LGTM',
+    'Thanks, merged.',
+    'Could you add a test for this?\nOtherwise looks fine.',
+    'This breaks `make docs` for me.',
+    'See [the FAQ](https://example.com/faq) first.',
+    '- fixed the typo\n- updated the changelog',
+    'I *think* this is **wrong**.\n\nWhat about <b>html</b>?',
+    '> quoting the original\nand a reply',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', type=int, default=10000,
+                        help="documents per batch (default 10000)")
+    parser.add_argument('-r', type=int, default=5,
+                        help="runs (the best is reported)")
+    parser.add_argument('--format', default='html',
+                        choices=['html', 'json', 'rst'])
+    args = parser.parse_args()
+
+    texts = list(itertools.islice(itertools.cycle(COMMENTS), args.n))
+
+    def loop():
+        return [commonmark.commonmark(text, args.format) for text in texts]
+
+    def batch():
+        return commonmark.render_batch(texts, args.format)
+
+    assert loop() == batch()
+    results = {}
+    for label, func in (('commonmark() loop', loop),
+                        ('render_batch()', batch)):
+        best = None
+        for _ in range(args.r):
+            start = timer()
+            func()
+            elapsed = timer() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[label] = args.n / best
+        print('{:>17}: {:9.0f} docs/s'.format(label, results[label]))
+    print('speedup: {:.2f}x'.format(
+        results['render_batch()'] / results['commonmark() loop']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""Time and memory of parsing documents made of one large block.
+
+``Parser.parse()`` records the content of a block as spans of the input
+and copies it out once, when the block is closed; ``parse_lines()``,
+fed the same document as a list of lines, stores a copy of every line.
+Peak memory is measured with tracemalloc (Python 3.4+).
+
+    $ python bench/code_blocks.py -n 100000
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import gc
+import re
+import sys
+import time
+
+from commonmark.blocks import Parser, reLineEnding
+
+timer = getattr(time, 'perf_counter', time.time)
+
+LINE = 'for (i = 0; i < n; i++) { total += values[i]; }'
+
+
+def documents(n):
+    body = ''.join(LINE + '\n' for _ in range(n))
+    return [
+        ('fenced code', '```c\n' + body + '```\n'),
+        ('indented code', ''.join('    ' + LINE + '\n' for _ in range(n))),
+        ('html block', '<div>\n' + body + '</div>\n'),
+        ('paragraph', body),
+    ]
+
+
+def parse_source(source):
+    return Parser().parse_blocks(source)
+
+
+def parse_lines(source):
+    lines = re.split(reLineEnding, source)
+    if source.endswith('\n'):
+        lines.pop()
+    return Parser().parse_lines(lines)
+
+
+def measure(func, source):
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    start = timer()
+    doc = func(source)
+    elapsed = timer() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    block = doc.first_child
+    return block.literal or block.string_content, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', type=int, default=50000,
+                        help="lines in the block (default 50000)")
+    args = parser.parse_args()
+
+    if sys.version_info < (3, 4):
+        sys.exit('tracemalloc needs Python 3.4 or later')
+
+    for label, source in documents(args.n):
+        print('{} ({:.1f} MB):'.format(label, len(source) / 1e6))
+        results = []
+        for name, func in (('spans', parse_source), ('lines', parse_lines)):
+            content, peak, elapsed = measure(func, source)
+            results.append(content)
+            print('  {:>5}: peak {:7.1f} MB, {:6.3f} s'.format(
+                name, peak / 1e6, elapsed))
+        assert results[0] == results[1]
+
+
+if __name__ == '__main__':
+    main()
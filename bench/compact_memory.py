@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""Compare the memory of Node trees and CompactTrees.
+
+The corpus is the input file repeated ``-r`` times.  For each
+representation the memory still held once the tree is built, and the
+peak while building it, are measured with tracemalloc (Python 3.4+).
+
+    $ python bench/compact_memory.py -r 20 spec.txt
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import codecs
+import gc
+import sys
+import time
+
+import commonmark
+from commonmark import compact
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+def measure(build, source):
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    start = timer()
+    tree = build(source)
+    elapsed = timer() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tree, current, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('infile', nargs='?', default='spec.txt',
+                        help="Markdown document (default spec.txt)")
+    parser.add_argument('-r', type=int, default=10,
+                        help="how many times to repeat the document")
+    args = parser.parse_args()
+
+    if sys.version_info < (3, 4):
+        sys.exit('tracemalloc needs Python 3.4 or later')
+
+    with codecs.open(args.infile, encoding='utf-8') as f:
+        source = '\n'.join([f.read()] * args.r)
+    print('corpus: {:.1f} MB'.format(len(source.encode('utf-8')) / 1e6))
+
+    results = {}
+    for label, build in (('Node', lambda s: commonmark.Parser().parse(s)),
+                         ('CompactTree', compact.parse)):
+        tree, current, peak, elapsed = measure(build, source)
+        if label == 'Node':
+            nodes = sum(1 for _ in tree.walker() if _[1])
+        else:
+            nodes = len(tree)
+        start = timer()
+        commonmark.HtmlRenderer().render(tree)
+        render = timer() - start
+        results[label] = current
+        print('{:>11}: {:8d} nodes, held {:8.1f} MB ({:5.0f} B/node), '
+              'peak {:8.1f} MB, parse {:6.2f}s, render {:6.2f}s'.format(
+                  label, nodes, current / 1e6, current / nodes, peak / 1e6,
+                  elapsed, render))
+        del tree
+    print('Node / CompactTree memory: {:.1f}x'.format(
+        results['Node'] / results['CompactTree']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""Cost of deadline checks, and how soon a deadline stops the parser.
+
+Parses and renders ``spec.txt`` without a deadline and with one that is
+never reached (the difference is the cost of the checks), then parses
+inputs that take long to process with a deadline ``--budget``
+milliseconds away and reports how late ``DeadlineExceeded`` arrives.
+
+    $ python bench/deadline.py -r 10
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import io
+import os
+import time
+
+from commonmark import DeadlineExceeded, HtmlRenderer, Parser
+from commonmark.common import monotonic
+
+timer = getattr(time, 'perf_counter', time.time)
+
+SPEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                    'spec.txt')
+
+SLOW = [
+    ('nested brackets', '[a ' * 20000 + '**b ' * 20000),
+    ('many emphasis delimiters', '*a _b ' * 40000),
+    ('deep list', ''.join('  ' * i + '- a\n' for i in range(1500))),
+]
+
+
+def best_time(func, runs):
+    best = None
+    for _ in range(runs):
+        start = timer()
+        func()
+        elapsed = timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-r', type=int, default=5,
+                        help="runs (the best is reported)")
+    parser.add_argument('--budget', type=float, default=20,
+                        help="deadline for the slow inputs, in ms")
+    args = parser.parse_args()
+
+    with io.open(SPEC, encoding='utf-8') as f:
+        spec = f.read()
+    never = monotonic() + 1e6
+    doc = Parser().parse(spec)
+    for label, func in (
+            ('parse', lambda deadline: Parser().parse(spec, deadline)),
+            ('render',
+             lambda deadline: HtmlRenderer().render(doc, deadline))):
+        times = [best_time(lambda: func(deadline), args.r)
+                 for deadline in (None, never)]
+        print('spec.txt {:>6}: no deadline {:6.1f} ms, deadline set '
+              '{:6.1f} ms ({:+.1f}%)'.format(
+                  label, times[0] * 1e3, times[1] * 1e3,
+                  (times[1] / times[0] - 1) * 100))
+
+    for label, text in SLOW:
+        start = monotonic()
+        try:
+            Parser().parse(text, start + args.budget / 1e3)
+        except DeadlineExceeded:
+            outcome = 'stopped'
+        else:
+            outcome = 'finished'
+        print('{:>24}: {} after {:.1f} ms (budget {:.0f} ms)'.format(
+            label, outcome, (monotonic() - start) * 1e3, args.budget))
+
+
+if __name__ == '__main__':
+    main()
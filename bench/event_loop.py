@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""Event-loop stalls while rendering large documents in coroutines.
+
+A ticker coroutine sleeps 1 ms at a time and records how late it wakes
+up, while ``-n`` concurrent requests each render ``spec.txt`` (and a
+stream of small comments is rendered alongside).  Compared: calling
+``commonmark()`` on the loop, ``commonmark.aio`` with the default
+thread pool, and ``commonmark.aio`` with a process pool.
+
+    $ python bench/event_loop.py -n 8
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import asyncio
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import commonmark
+from commonmark import aio
+
+timer = getattr(time, 'perf_counter', time.time)
+
+SPEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                    'spec.txt')
+
+
+async def ticker(stalls, done):
+    while not done.is_set():
+        start = timer()
+        await asyncio.sleep(0.001)
+        stalls.append(timer() - start - 0.001)
+
+
+async def direct(text):
+    return commonmark.commonmark(text)
+
+
+async def run(render, texts):
+    stalls = []
+    done = asyncio.Event()
+    tick = asyncio.ensure_future(ticker(stalls, done))
+    await asyncio.sleep(0.01)
+    start = timer()
+    await asyncio.gather(*[render(text) for text in texts])
+    elapsed = timer() - start
+    done.set()
+    await tick
+    stalls.sort()
+    return elapsed, stalls[-1], stalls[len(stalls) * 99 // 100]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', type=int, default=4,
+                        help="concurrent large documents (default 4)")
+    parser.add_argument('--workers', type=int, default=2,
+                        help="processes in the process pool (default 2)")
+    args = parser.parse_args()
+
+    with io.open(SPEC, encoding='utf-8') as f:
+        spec = f.read()
+    texts = [spec] * args.n + ['a *small* comment'] * 100
+    with ProcessPoolExecutor(args.workers) as executor:
+        in_processes = aio.AsyncRenderer(executor=executor)
+        for label, render in (
+                ('on the loop', direct),
+                ('aio, threads', aio.render),
+                ('aio, processes', in_processes.render)):
+            elapsed, worst, p99 = asyncio.run(run(render, texts))
+            print('{:>14}: {:6.2f} s total, longest stall {:7.1f} ms, '
+                  '99th percentile {:7.1f} ms'.format(
+                      label, elapsed, worst * 1e3, p99 * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""Time rebuilding a document after editing one section.
+
+The document is the input file repeated ``-r`` times.  It is rendered
+once to fill a FragmentCache, then one paragraph is changed, and the
+new version is rendered both from scratch and through the cache.
+
+    $ python bench/fragment_cache.py -r 4 spec.txt
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import codecs
+import time
+
+import commonmark
+from commonmark.render.cache import FragmentCache
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('infile', nargs='?', default='spec.txt',
+                        help="Markdown document (default spec.txt)")
+    parser.add_argument('-r', type=int, default=4,
+                        help="how many times to repeat the document")
+    args = parser.parse_args()
+
+    with codecs.open(args.infile, encoding='utf-8') as f:
+        source = '\n'.join([f.read()] * args.r)
+    middle = source.index('\n\n', len(source) // 2) + 2
+    edited = source[:middle] + 'An *edited* paragraph.\n\n' + source[middle:]
+
+    renderer = commonmark.HtmlRenderer()
+    cache = FragmentCache()
+    cache.render(commonmark.Parser().parse(source), renderer)
+    cache.hits = cache.misses = 0
+
+    doc = commonmark.Parser().parse(edited)
+    start = timer()
+    full = renderer.render(doc)
+    plain = timer() - start
+    start = timer()
+    cached = cache.render(doc, renderer)
+    elapsed = timer() - start
+    assert cached == full
+
+    stats = cache.stats()
+    print('render: {:.1f} ms, with cache {:.1f} ms ({} blocks reused, '
+          '{} rendered, {:.1f} MB cached)'.format(
+              plain * 1000, elapsed * 1000, stats['hits'], stats['misses'],
+              stats['bytes'] / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""Measure garbage-collector pauses under a sustained render load.
+
+Renders the same document over and over, once letting the trees die as
+reference cycles and once freeing them with ``Node.dispose()``, and
+reports the number, total and worst duration of collections for each
+generation (``gc.callbacks`` needs Python 3.3+).  A long-lived heap is
+allocated first, as in a real worker process, since that is what makes
+full collections slow.
+
+    $ python bench/gc_pauses.py -n 500 spec.txt
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import codecs
+import gc
+import sys
+import time
+
+import commonmark
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+class PauseRecorder(object):
+    def __init__(self):
+        self.pauses = {0: [], 1: [], 2: []}
+        self._start = None
+
+    def __call__(self, phase, info):
+        if phase == 'start':
+            self._start = timer()
+        elif self._start is not None:
+            self.pauses[info['generation']].append(timer() - self._start)
+            self._start = None
+
+
+def run(source, count, dispose):
+    parser = commonmark.Parser()
+    renderer = commonmark.HtmlRenderer()
+    recorder = PauseRecorder()
+    gc.collect()
+    gc.callbacks.append(recorder)
+    start = timer()
+    try:
+        for _ in range(count):
+            ast = parser.parse(source)
+            renderer.render(ast)
+            if dispose:
+                ast.dispose()
+            del ast
+    finally:
+        gc.callbacks.remove(recorder)
+    return timer() - start, recorder.pauses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('infile', nargs='?', default='spec.txt',
+                        help="Markdown document to render (default spec.txt)")
+    parser.add_argument('-n', type=int, default=200,
+                        help="number of renders per mode")
+    parser.add_argument('--heap', type=int, default=500000,
+                        help="long-lived objects to keep alive")
+    args = parser.parse_args()
+
+    if not hasattr(gc, 'callbacks'):
+        sys.exit('gc.callbacks needs Python 3.3 or later')
+
+    with codecs.open(args.infile, encoding='utf-8') as f:
+        source = f.read()
+    heap = [[i] for i in range(args.heap)]  # noqa: F841
+
+    for label, dispose in (('cycles', False), ('dispose', True)):
+        elapsed, pauses = run(source, args.n, dispose)
+        print('{}: {} renders in {:.2f}s'.format(label, args.n, elapsed))
+        for generation in (0, 1, 2):
+            times = pauses[generation]
+            print('  gen{}: {:6d} collections, total {:8.1f} ms, '
+                  'max {:7.2f} ms'.format(
+                      generation, len(times), sum(times) * 1000,
+                      max(times or [0]) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""Report how long ``import commonmark`` takes, per module.
+
+Each run imports the package in a fresh interpreter with
+``-X importtime`` (Python 3.7+) and the median of all runs is shown.
+
+    $ python bench/import_time.py -n 20
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import subprocess
+import sys
+
+
+def import_times(module):
+    """Return {module name: (self us, cumulative us)} for one import."""
+    proc = subprocess.Popen(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True)
+    _, err = proc.communicate()
+    times = {}
+    for line in err.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # the header line
+        times[fields[2].strip()] = (self_us, cumulative_us)
+    return times
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', type=int, default=10,
+                        help="number of fresh interpreters to time")
+    parser.add_argument('-m', default='commonmark',
+                        help="module to import (default: commonmark)")
+    parser.add_argument('-a', action='store_true',
+                        help="also list non-commonmark modules")
+    args = parser.parse_args()
+
+    if sys.version_info < (3, 7):
+        sys.exit('-X importtime needs Python 3.7 or later')
+
+    runs = [import_times(args.m) for _ in range(args.n)]
+    names = set()
+    for run in runs:
+        names.update(run)
+
+    rows = []
+    for name in names:
+        if not args.a and not name.startswith('commonmark'):
+            continue
+        samples = [run[name] for run in runs if name in run]
+        rows.append((median(s[1] for s in samples),
+                     median(s[0] for s in samples), name))
+
+    print('{:>10} {:>10}  {}'.format('self ms', 'total ms', 'module'))
+    for cumulative_us, self_us, name in sorted(rows, reverse=True):
+        print('{:10.2f} {:10.2f}  {}'.format(
+            self_us / 1000, cumulative_us / 1000, name))
+
+
+if __name__ == '__main__':
+    main()
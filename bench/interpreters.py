@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""Pages per second of subinterpreter and process-pool rendering.
+
+Renders the pages of ``bench/parallel.py`` with
+``commonmark.interpreters.render_many()`` and
+``commonmark.parallel.render_many()`` for each worker count, pool start
+included.  Before Python 3.14 the first falls back to processes too.
+
+    $ python bench/interpreters.py -n 5000 1 2 4 8
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import time
+
+import commonmark
+from commonmark import interpreters, parallel
+
+from parallel import pages, worker_counts
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('workers', nargs='*', type=int,
+                        help="worker counts (default 1, 2, 4, ... CPUs)")
+    parser.add_argument('-n', type=int, default=2000,
+                        help="pages (default 2000)")
+    parser.add_argument('--lines', type=int, default=40,
+                        help="lines per page (default 40)")
+    args = parser.parse_args()
+
+    print('subinterpreters: {}'.format(interpreters.SUBINTERPRETERS))
+    texts = pages(args.n, args.lines)
+    expected = commonmark.render_batch(texts)
+    for workers in args.workers or worker_counts():
+        rates = []
+        for module in (interpreters, parallel):
+            start = timer()
+            results = module.render_many(texts, workers=workers)
+            rates.append(args.n / (timer() - start))
+            assert results == expected
+        print('{:4d} worker(s): interpreters {:8.0f} pages/s, '
+              'processes {:8.0f} pages/s'.format(workers, *rates))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""Peak memory and time of hostile inputs, with and without limits.
+
+Each input is converted to HTML with no limits, and with ``max_nodes``,
+``max_depth``, ``max_inline_depth`` and ``max_output`` set under both
+``on_limit`` policies; the peak memory is measured with tracemalloc
+(Python 3.4+).  ``spec.txt`` shows the cost of the checks on ordinary
+input.
+
+    $ python bench/limits.py --nodes 10000
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import gc
+import io
+import os
+import sys
+import time
+
+from commonmark import Converter, LimitExceeded
+
+timer = getattr(time, 'perf_counter', time.time)
+
+SPEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                    'spec.txt')
+
+HOSTILE = [
+    ('deep block quotes', '>' * 5000 + ' a\n'),
+    ('deep lists', ''.join('  ' * i + '- a\n' for i in range(500))),
+    ('many links', '[a](/b) ' * 20000),
+    ('deep emphasis', '*a ' * 5000 + 'b' + '*' * 5000),
+    ('entities', '&amp;' * 50000),
+    ('reference links', '[x]: /' + 'u' * 1000 + '\n\n' + '[x] ' * 5000),
+]
+
+
+def measure(convert, text):
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    start = timer()
+    try:
+        html = convert(text)
+    except LimitExceeded as e:
+        outcome = 'raised ({})'.format(e.limit)
+    else:
+        outcome = '{} chars'.format(len(html))
+        del html
+    elapsed = timer() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return outcome, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=10000,
+                        help="max_nodes (default 10000)")
+    parser.add_argument('--depth', type=int, default=32,
+                        help="max_depth and max_inline_depth (default 32)")
+    parser.add_argument('--output', type=int, default=1000000,
+                        help="max_output in characters (default 1000000)")
+    args = parser.parse_args()
+
+    if sys.version_info < (3, 4):
+        sys.exit('tracemalloc needs Python 3.4 or later')
+
+    limits = {'max_nodes': args.nodes, 'max_depth': args.depth,
+              'max_inline_depth': args.depth, 'max_output': args.output}
+    converters = [
+        ('no limits', Converter()),
+        ('raise', Converter(limits)),
+        ('text', Converter(dict(limits, on_limit='text'))),
+    ]
+    with io.open(SPEC, encoding='utf-8') as f:
+        inputs = [('spec.txt', f.read())] + HOSTILE
+    for label, text in inputs:
+        print('{} ({} chars)'.format(label, len(text)))
+        for name, converter in converters:
+            outcome, peak, elapsed = measure(converter.convert, text)
+            print('  {:>9}: {:7.1f} ms, peak {:7.2f} MB, {}'.format(
+                name, elapsed * 1e3, peak / 1e6, outcome))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""Per-line block parsing cost as block quotes and lists nest deeper.
+
+Each document nests block quotes (``> > > text``) or list items to the
+given depths and then has ``-n`` lines of text at the innermost level,
+one in five of them blank.  With ``--tabs`` the lists are indented with
+tabs, which takes the general, per-container path.
+
+    $ python bench/nesting_depth.py -n 4000 1 4 16 64
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import time
+
+from commonmark.blocks import Parser
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+def quotes(depth, count, tabs):
+    lines = []
+    for i in range(count):
+        text = '' if i % 5 == 4 else 'some text here'
+        lines.append('> ' * depth + text)
+    return '\n'.join(lines) + '\n'
+
+
+def lists(depth, count, tabs):
+    lines = []
+    indent = ''
+    for _ in range(depth):
+        lines.append(indent + '-   item')
+        indent += '\t' if tabs else '    '
+    for i in range(count):
+        lines.append('' if i % 5 == 4 else indent + 'continued text')
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('depths', nargs='*', type=int,
+                        default=[1, 4, 16, 64],
+                        help="nesting depths (default 1 4 16 64)")
+    parser.add_argument('-n', type=int, default=4000,
+                        help="lines at the innermost level")
+    parser.add_argument('-r', type=int, default=3,
+                        help="runs per document (the best is reported)")
+    parser.add_argument('--tabs', action='store_true',
+                        help="indent the lists with tabs")
+    args = parser.parse_args()
+
+    for label, build in (('block quotes', quotes), ('lists', lists)):
+        print(label + ':')
+        for depth in args.depths:
+            source = build(depth, args.n, args.tabs)
+            best = None
+            for _ in range(args.r):
+                start = timer()
+                Parser().parse_blocks(source)
+                elapsed = timer() - start
+                best = elapsed if best is None else min(best, elapsed)
+            print('  depth {:4d}: {:8.2f} us/line'.format(
+                depth, best / args.n * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""Time outline parsing against a full parse and a walk for headings.
+
+Times ``Parser.parse_outline()`` and ``Parser.parse()`` followed by a
+walk that collects the headings, on ``spec.txt`` and on a corpus of
+documentation-like prose (headings, paragraphs, lists and code), each
+repeated ``-n`` times.
+
+    $ python bench/outline.py -n 4 -r 5
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import io
+import os
+import time
+
+from commonmark import Parser
+from commonmark.inlines import literal_text
+
+timer = getattr(time, 'perf_counter', time.time)
+
+SPEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                    'spec.txt')
+
+SECTION = '''## Section {0}
+
+Some *introductory* text for section {0}, with a [link](/s/{0}) and
+`inline code`, wrapped over a few lines the way documentation usually
+is, so that paragraphs take up most of the input.
+
+A second paragraph that goes on about **options** and their defaults,
+refers to [the reference][ref] and ends here.
+
+- a list item
+- another item, with *emphasis*
+
+```python
+def example_{0}():
+    return {0}
+```
+
+'''
+
+PROSE = ''.join(SECTION.format(i) for i in range(200)) + \
+    '[ref]: /reference\n'
+
+
+def full_outline(text):
+    outline = []
+    for node, entering in Parser().parse(text).walker():
+        if entering and node.t == 'heading':
+            outline.append({'level': node.level, 'text': literal_text(node),
+                            'sourcepos': node.sourcepos})
+    return outline
+
+
+def best_time(func, runs):
+    best = None
+    for _ in range(runs):
+        start = timer()
+        func()
+        elapsed = timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', type=int, default=2,
+                        help="how many times to repeat each document")
+    parser.add_argument('-r', type=int, default=3,
+                        help="runs (the best is reported)")
+    args = parser.parse_args()
+
+    with io.open(SPEC, encoding='utf-8') as f:
+        spec = f.read()
+    for label, text in (('spec.txt', spec), ('prose', PROSE)):
+        text = '\n'.join([text] * args.n)
+        assert Parser().parse_outline(text) == full_outline(text)
+        full = best_time(lambda: full_outline(text), args.r)
+        outline = best_time(lambda: Parser().parse_outline(text), args.r)
+        print('{:>8}: parse and walk {:7.1f} ms, parse_outline {:7.1f} ms '
+              '({:.1f}x)'.format(label, full * 1e3, outline * 1e3,
+                                 full / outline))
+
+
+if __name__ == '__main__':
+    main()
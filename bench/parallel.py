@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""Pages per second of commonmark.parallel.render_many() by worker count.
+
+The pages are ``-n`` consecutive slices of ``spec.txt`` of a few dozen
+lines each.  ``render_batch()`` in this process is the baseline; each
+worker count then includes starting the pool.
+
+    $ python bench/parallel.py -n 5000 1 2 4 8
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import io
+import os
+import time
+
+import commonmark
+from commonmark.parallel import render_many
+
+timer = getattr(time, 'perf_counter', time.time)
+
+SPEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                    'spec.txt')
+
+
+def pages(count, size):
+    with io.open(SPEC, encoding='utf-8') as f:
+        lines = f.read().split('\n')
+    result = []
+    start = 0
+    for _ in range(count):
+        if start + size > len(lines):
+            start = 0
+        result.append('\n'.join(lines[start:start + size]))
+        start += size
+    return result
+
+
+def worker_counts():
+    counts = []
+    workers = 1
+    while workers < (os.cpu_count() or 1):
+        counts.append(workers)
+        workers *= 2
+    return counts + [os.cpu_count() or 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('workers', nargs='*', type=int,
+                        help="worker counts (default 1, 2, 4, ... CPUs)")
+    parser.add_argument('-n', type=int, default=2000,
+                        help="pages (default 2000)")
+    parser.add_argument('--lines', type=int, default=40,
+                        help="lines per page (default 40)")
+    parser.add_argument('--chunksize', type=int, default=None)
+    args = parser.parse_args()
+
+    texts = pages(args.n, args.lines)
+    start = timer()
+    expected = commonmark.render_batch(texts)
+    serial = args.n / (timer() - start)
+    print('  render_batch(): {:8.0f} pages/s'.format(serial))
+    for workers in args.workers or worker_counts():
+        start = timer()
+        results = render_many(texts, workers=workers,
+                              chunksize=args.chunksize)
+        rate = args.n / (timer() - start)
+        assert results == expected
+        print('{:4d} worker(s):  {:8.0f} pages/s  ({:5.2f}x)'.format(
+            workers, rate, rate / serial))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""Per-call cost of rendering small inputs without Markdown syntax.
+
+``commonmark()`` writes the HTML of plain text directly, and
+``Parser.parse()`` skips the general block parser for it.  Both are
+compared with the full pipeline (block parser, inline parser and
+``HtmlRenderer``) on a few typical chat-sized messages.
+
+    $ python bench/plain_text.py -n 20000
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import time
+
+import commonmark
+from commonmark.blocks import Parser
+from commonmark.plain import is_plain, split_lines
+from commonmark.render.html import HtmlRenderer
+
+timer = getattr(time, 'perf_counter', time.time)
+
+MESSAGES = [
+    'ok',
+    'Thanks, that fixed it.',
+    'Sounds good. I will look at it tomorrow morning.\n'
+    'Can you send me the logs?',
+    'First paragraph of a longer comment, with a few sentences in it.\n\n'
+    'And a second one, after a blank line.',
+]
+
+
+def full_parse(text):
+    parser = Parser()
+    doc = parser.parse_lines(split_lines(text))
+    parser.process_inlines(doc)
+    return doc
+
+
+def full_html(text):
+    return HtmlRenderer().render(full_parse(text))
+
+
+def fast_html(text):
+    return commonmark.commonmark(text)
+
+
+def fast_parse(text):
+    return Parser().parse(text)
+
+
+def per_call(func, text, count):
+    start = timer()
+    for _ in range(count):
+        func(text)
+    return (timer() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', type=int, default=10000,
+                        help="calls per message (default 10000)")
+    args = parser.parse_args()
+
+    for text in MESSAGES:
+        assert is_plain(text)
+        assert fast_html(text) == full_html(text)
+        print('{!r:.40}'.format(text))
+        for label, fast, full in (('html', fast_html, full_html),
+                                  ('parse', fast_parse, full_parse)):
+            fast_time = per_call(fast, text, args.n)
+            full_time = per_call(full, text, args.n)
+            print('  {:>5}: {:7.2f} us  (full pipeline {:7.2f} us, '
+                  '{:5.1f}x)'.format(label, fast_time * 1e6,
+                                     full_time * 1e6, full_time / fast_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""Time previews against rendering the whole document.
+
+For documents of growing length (``spec.txt`` repeated), times
+``commonmark.preview()`` of the first ``--blocks`` blocks or ``--chars``
+characters, and a full ``commonmark()`` call, which a listing page
+would otherwise truncate.
+
+    $ python bench/preview.py -r 5
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import io
+import os
+import time
+
+import commonmark
+
+timer = getattr(time, 'perf_counter', time.time)
+
+SPEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                    'spec.txt')
+
+
+def best_time(func, runs):
+    best = None
+    for _ in range(runs):
+        start = timer()
+        func()
+        elapsed = timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-r', type=int, default=3,
+                        help="runs (the best is reported)")
+    parser.add_argument('--blocks', type=int, default=5,
+                        help="max_blocks of the preview (default 5)")
+    parser.add_argument('--chars', type=int, default=500,
+                        help="max_chars of the preview (default 500)")
+    args = parser.parse_args()
+
+    with io.open(SPEC, encoding='utf-8') as f:
+        spec = f.read()
+    # a definition at the very end, used at the start
+    spec = 'See [the spec][spec].\n\n' + spec
+    for copies in (1, 2, 4):
+        text = '\n'.join([spec] * copies) + '\n[spec]: /spec\n'
+        blocks = best_time(
+            lambda: commonmark.preview(text, max_blocks=args.blocks), args.r)
+        chars = best_time(
+            lambda: commonmark.preview(text, max_chars=args.chars), args.r)
+        full = best_time(lambda: commonmark.commonmark(text), 1)
+        print('{:>8} chars: max_blocks {:6.2f} ms, max_chars {:6.2f} ms, '
+              'whole document {:8.1f} ms'.format(
+                  len(text), blocks * 1e3, chars * 1e3, full * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""Compare per-keystroke latency of Parser.reparse() and a full parse.
+
+The document is the input file repeated ``-r`` times, for each size in
+``--sizes``.  A character is typed at the end of ``-n`` lines spread
+through the document (a replacement, so the line count is unchanged)
+and a new line is inserted after each, and every edit is applied once
+with a full parse and once with ``reparse``.  Edits near link reference
+definitions fall back to a full parse, which shows up in the maximum.
+
+    $ python bench/reparse.py --sizes 1 4 16 spec.txt
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import codecs
+import re
+import time
+
+import commonmark
+from commonmark.blocks import reLineEnding
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+def edits(lines, count):
+    step = max(1, len(lines) // (count + 1))
+    for number in range(step, len(lines) + 1, step)[:count]:
+        yield (number, number, lines[number - 1] + 'x')
+        yield (number + 1, number, 'new line')
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('infile', nargs='?', default='spec.txt',
+                        help="Markdown document (default spec.txt)")
+    parser.add_argument('-n', type=int, default=20,
+                        help="number of edited lines per size")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 4, 16],
+                        help="how many times to repeat the document")
+    args = parser.parse_args()
+
+    with codecs.open(args.infile, encoding='utf-8') as f:
+        base = f.read()
+
+    for size in args.sizes:
+        source = '\n'.join([base] * size)
+        lines = re.split(reLineEnding, source)
+        count = len(lines)
+        parser = commonmark.Parser({'incremental': True})
+        doc = parser.parse(source)
+        full = []
+        incremental = []
+        for start, end, text in edits(lines, args.n):
+            lines[start - 1:end] = [text]
+            began = timer()
+            commonmark.Parser().parse('\n'.join(lines))
+            full.append(timer() - began)
+            began = timer()
+            doc = parser.reparse(doc, (start, end, text))
+            incremental.append(timer() - began)
+        print('{:8d} lines: parse {:8.2f} ms, reparse median {:6.2f} ms, '
+              'max {:8.2f} ms'.format(
+                  count, median(full) * 1000,
+                  median(incremental) * 1000, max(incremental) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""Compare peak memory of walking a parsed tree and commonmark.events().
+
+Both extract every link destination from the input file repeated ``-r``
+times; peak memory above the source text is measured with tracemalloc
+(Python 3.4+).
+
+    $ python bench/sax_memory.py -r 10 spec.txt
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import codecs
+import gc
+import sys
+import time
+
+import commonmark
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+def tree_links(source):
+    doc = commonmark.Parser().parse(source)
+    return [node.destination for node, entering in doc.walker()
+            if entering and node.t == 'link']
+
+
+def event_links(source):
+    return [attrs['destination']
+            for event, t, attrs in commonmark.events(source)
+            if event == 'enter' and t == 'link']
+
+
+def measure(func, source):
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    start = timer()
+    result = func(source)
+    elapsed = timer() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('infile', nargs='?', default='spec.txt',
+                        help="Markdown document (default spec.txt)")
+    parser.add_argument('-r', type=int, default=10,
+                        help="how many times to repeat the document")
+    args = parser.parse_args()
+
+    if sys.version_info < (3, 4):
+        sys.exit('tracemalloc needs Python 3.4 or later')
+
+    with codecs.open(args.infile, encoding='utf-8') as f:
+        source = '\n'.join([f.read()] * args.r)
+    print('corpus: {:.1f} MB'.format(len(source.encode('utf-8')) / 1e6))
+
+    results = []
+    for label, func in (('tree walk', tree_links), ('events', event_links)):
+        links, peak, elapsed = measure(func, source)
+        results.append(links)
+        print('{:>9}: {} links, peak {:7.1f} MB, {:.2f} s'.format(
+            label, len(links), peak / 1e6, elapsed))
+    assert results[0] == results[1]
+
+
+if __name__ == '__main__':
+    main()
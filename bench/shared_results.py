@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""Returning large rendered pages from workers: pickles vs shared memory.
+
+Renders ``-n`` copies of ``spec.txt`` (about 300 KB of HTML each) with
+``render_many()``, which pickles each page back to this process, and
+with ``render_shared()``, which returns views of shared memory, then
+writes every page to ``os.devnull`` as UTF-8.  Needs Python 3.8+.
+
+    $ python bench/shared_results.py -n 32 --workers 4
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import io
+import os
+import time
+
+from commonmark.parallel import render_many, render_shared
+
+timer = getattr(time, 'perf_counter', time.time)
+
+SPEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                    'spec.txt')
+
+
+def pickled(texts, workers):
+    with open(os.devnull, 'wb') as out:
+        for page in render_many(texts, workers=workers, chunksize=1):
+            out.write(page.encode('utf-8'))
+
+
+def shared(texts, workers):
+    with render_shared(texts, workers=workers, chunksize=1) as pages:
+        with open(os.devnull, 'wb') as out:
+            for page in pages:
+                out.write(page)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', type=int, default=16,
+                        help="pages (default 16)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument('-r', type=int, default=3,
+                        help="runs (the best is reported)")
+    args = parser.parse_args()
+
+    with io.open(SPEC, encoding='utf-8') as f:
+        texts = [f.read()] * args.n
+    for label, func in (('pickled str', pickled),
+                        ('shared memory', shared)):
+        best = None
+        for _ in range(args.r):
+            start = timer()
+            func(texts, args.workers)
+            elapsed = timer() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print('{:>13}: {:6.3f} s'.format(label, best))
+
+
+if __name__ == '__main__':
+    main()
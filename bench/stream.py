@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""Compare streaming a document with StreamParser against re-parsing.
+
+The input is fed in chunks of ``-c`` characters, as a token stream would
+arrive, and rendered after every chunk: once by parsing the whole text
+so far each time, and once with ``StreamParser.append()`` and
+``document()``, rendering the whole snapshot or, with
+``ProgressiveHtmlRenderer``, only the blocks that are not final yet.
+Parsing and rendering times are reported separately (for the last mode
+the snapshot is taken while rendering).
+
+    $ python bench/stream.py -c 16 -l 20000 spec.txt
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import codecs
+import time
+
+import commonmark
+from commonmark.render.progressive import ProgressiveHtmlRenderer
+from commonmark.stream import StreamParser
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+def report(label, count, parse, render):
+    print('{:>16}: parse {:6.2f} ms/chunk, render {:6.2f} ms/chunk'.format(
+        label, parse / count * 1000, render / count * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('infile', nargs='?', default='spec.txt',
+                        help="Markdown document (default spec.txt)")
+    parser.add_argument('-c', type=int, default=16,
+                        help="characters per chunk")
+    parser.add_argument('-l', type=int, default=20000,
+                        help="characters of the input to stream")
+    args = parser.parse_args()
+
+    with codecs.open(args.infile, encoding='utf-8') as f:
+        source = f.read()[:args.l]
+    chunks = [source[i:i + args.c] for i in range(0, len(source), args.c)]
+    renderer = commonmark.HtmlRenderer()
+
+    text = ''
+    parse = render = 0
+    for chunk in chunks:
+        text += chunk
+        start = timer()
+        doc = commonmark.Parser().parse(text)
+        parse += timer() - start
+        start = timer()
+        full = renderer.render(doc)
+        render += timer() - start
+    report('parse everything', len(chunks), parse, render)
+
+    stream = StreamParser()
+    parse = render = 0
+    for chunk in chunks:
+        start = timer()
+        stream.append(chunk)
+        doc = stream.document()
+        parse += timer() - start
+        start = timer()
+        renderer.render(doc)
+        render += timer() - start
+    streamed = renderer.render(stream.close())
+    report('StreamParser', len(chunks), parse, render)
+    assert streamed == full
+
+    stream = StreamParser()
+    progressive = ProgressiveHtmlRenderer()
+    parse = render = 0
+    output = ''
+    for chunk in chunks:
+        start = timer()
+        stream.append(chunk)
+        parse += timer() - start
+        start = timer()
+        final, provisional = progressive.render_progress(stream)
+        output += final
+        render += timer() - start
+    stream.close()
+    output += progressive.render_progress(stream)[0]
+    report('+ progressive', len(chunks), parse, render)
+    assert output == full
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""Documents per second of a shared Converter on 1 to 16 threads.
+
+Each thread renders its share of ``-n`` small documents (the comments
+of ``bench/batch.py``, plus a link reference so that the shared label
+memo is used) through one ``commonmark.Converter``.  On a standard
+build the GIL lets only one thread run Python code at a time, so the
+rate stays flat; on a free-threaded build (3.13t and later) it should
+grow with the number of cores.
+
+    $ python bench/threads.py -n 20000 1 2 4 8 16
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import itertools
+import sys
+import threading
+import time
+
+import commonmark
+
+from batch import COMMENTS
+
+timer = getattr(time, 'perf_counter', time.time)
+
+TEXTS = COMMENTS + ['See [the docs][docs].\n\n[docs]: https://example.com']
+
+
+def run(converter, texts, threads):
+    barrier = threading.Barrier(threads + 1)
+    results = [None] * threads
+
+    def work(number):
+        barrier.wait()
+        results[number] = [converter.convert(text)
+                           for text in texts[number::threads]]
+    workers = [threading.Thread(target=work, args=(number,))
+               for number in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = timer()
+    for worker in workers:
+        worker.join()
+    elapsed = timer() - start
+    return elapsed, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('threads', nargs='*', type=int,
+                        default=[1, 2, 4, 8, 16],
+                        help="thread counts (default 1 2 4 8 16)")
+    parser.add_argument('-n', type=int, default=10000,
+                        help="documents (default 10000)")
+    parser.add_argument('-r', type=int, default=3,
+                        help="runs (the best is reported)")
+    args = parser.parse_args()
+
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', lambda: True)
+    print('GIL enabled: {}'.format(is_gil_enabled()))
+    texts = list(itertools.islice(itertools.cycle(TEXTS), args.n))
+    converter = commonmark.Converter()
+    expected = commonmark.render_batch(texts)
+    base = None
+    for threads in args.threads:
+        best = None
+        for _ in range(args.r):
+            elapsed, results = run(converter, texts, threads)
+            best = elapsed if best is None else min(best, elapsed)
+        for number, result in enumerate(results):
+            assert result == expected[number::threads]
+        rate = args.n / best
+        base = base or rate
+        print('{:3d} thread(s): {:9.0f} docs/s  ({:5.2f}x)'.format(
+            threads, rate, rate / base))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""Time finding every node of some types, by walking versus the index.
+
+Each document is parsed once without and once with the ``type_index``
+option; the lookup is then repeated ``-n`` times each way.
+
+    $ python bench/type_index.py -n 100 -t link -t heading spec.txt
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import codecs
+import time
+
+import commonmark
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = timer()
+        func()
+        elapsed = timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('infile', nargs='?', default='spec.txt',
+                        help="Markdown document (default spec.txt)")
+    parser.add_argument('-n', type=int, default=20,
+                        help="number of lookups per mode")
+    parser.add_argument('-t', action='append', dest='types',
+                        help="node type to look up (repeatable, "
+                             "default link, image and heading)")
+    args = parser.parse_args()
+    types = args.types or ['link', 'image', 'heading']
+
+    with codecs.open(args.infile, encoding='utf-8') as f:
+        source = f.read()
+
+    plain = best_of(3, lambda: commonmark.Parser().parse(source))
+    indexed = best_of(
+        3, lambda: commonmark.Parser({'type_index': True}).parse(source))
+    print('parse: {:.1f} ms, with type_index {:.1f} ms'.format(
+        plain * 1000, indexed * 1000))
+
+    walked = commonmark.Parser().parse(source)
+    index = commonmark.Parser({'type_index': True}).parse(source)
+    for t in types:
+        count = len(index.nodes_of_type(t))
+        walk = best_of(args.n, lambda: walked.nodes_of_type(t))
+        lookup = best_of(args.n, lambda: index.nodes_of_type(t))
+        print('{:>12}: {:6d} nodes, walk {:8.3f} ms, index {:8.3f} ms'.format(
+            t, count, walk * 1000, lookup * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,45 @@
 # flake8: noqa
 from __future__ import unicode_literals, absolute_import
 
-from commonmark.main import commonmark
-from commonmark.dump import dumpAST, dumpJSON
+import sys
+
+from commonmark.main import commonmark, render_batch, outline, Converter
 from commonmark.blocks import Parser
 from commonmark.render.html import HtmlRenderer
-from commonmark.render.rst import ReStructuredTextRenderer
+
+# Imported on first access, so that a plain ``import commonmark`` does
+# not pay for json, threading and the extra renderers.
+_lazy_attrs = {
+    'dumpAST': 'commonmark.dump',
+    'dumpJSON': 'commonmark.dump',
+    'ReStructuredTextRenderer': 'commonmark.render.rst',
+    'events': 'commonmark.sax',
+    'preview': 'commonmark.excerpt',
+    'Options': 'commonmark.options',
+    'CommonMarkError': 'commonmark.exceptions',
+    'DeadlineExceeded': 'commonmark.exceptions',
+    'LimitExceeded': 'commonmark.exceptions',
+}
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        try:
+            module_name = _lazy_attrs[name]
+        except KeyError:
+            raise AttributeError(
+                'module {!r} has no attribute {!r}'.format(__name__, name))
+        import importlib
+        value = getattr(importlib.import_module(module_name), name)
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(globals()) | set(_lazy_attrs))
+else:
+    from commonmark.dump import dumpAST, dumpJSON
+    from commonmark.render.rst import ReStructuredTextRenderer
+    from commonmark.sax import events
+    from commonmark.excerpt import preview
+    from commonmark.options import Options
+    from commonmark.exceptions import (
+        CommonMarkError, DeadlineExceeded, LimitExceeded)
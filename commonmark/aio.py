@@ -0,0 +1,149 @@
+"""asyncio front end (Python 3.6+).
+
+Rendering is CPU-bound, so calling :func:`commonmark.commonmark` in a
+coroutine blocks the event loop for as long as the document takes.
+:class:`AsyncRenderer` renders texts shorter than ``threshold``
+characters inline, where that is cheaper than a trip to another thread,
+and hands longer ones to an executor, at most ``max_concurrency`` at a
+time::
+
+    html = await commonmark.aio.render(text)
+
+    renderer = AsyncRenderer(executor=ProcessPoolExecutor(4))
+    html = await renderer.render(text)
+
+    async for chunk in renderer.stream(text):
+        await response.write(chunk.encode('utf-8'))
+
+``executor`` is any ``concurrent.futures`` executor; the default
+(None) is the loop's default thread pool.  A process pool keeps the
+loop responsive even under the GIL, at the cost of sending the text and
+the result between processes.  :meth:`AsyncRenderer.stream` needs the
+document tree in this process, so it always works in threads (those of
+``executor`` if it is a ``ThreadPoolExecutor``).
+"""
+from __future__ import absolute_import, unicode_literals
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from commonmark.main import Converter
+from commonmark.render.html import HtmlRenderer
+
+try:
+    get_running_loop = asyncio.get_running_loop
+except AttributeError:
+    # Python 3.6, where get_event_loop() in a coroutine is the running
+    # loop
+    get_running_loop = asyncio.get_event_loop
+
+# (options, format) -> Converter, in each process that renders.
+_converters = {}
+
+
+def _convert(options, format, text):
+    # A plain function of picklable arguments, so that it can run in a
+    # process pool too.
+    key = (options, format)
+    try:
+        converter = _converters[key]
+    except KeyError:
+        converter = _converters[key] = Converter(options, format)
+    return converter.convert(text)
+
+
+def _render_blocks(renderer, block, size):
+    """Render top-level blocks from ``block`` on until the HTML is at
+    least ``size`` characters long; return it and the next block."""
+    parts = []
+    length = 0
+    while block is not None and length < size:
+        parts.append(renderer.render(block))
+        length += len(parts[-1])
+        block = block.nxt
+    return ''.join(parts), block
+
+
+class AsyncRenderer(object):
+    """Renders CommonMark in coroutines without blocking the event loop.
+
+    ``options`` and ``format`` are those of
+    :class:`commonmark.main.Converter`.
+    """
+
+    def __init__(self, options=None, format="html", threshold=8192,
+                 executor=None, max_concurrency=4):
+        self.converter = Converter(options, format)
+        self.options = self.converter.options
+        self.format = format
+        self.threshold = threshold
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self._semaphore_loop = None
+
+    def _run(self, executor, func, *args):
+        loop = get_running_loop()
+        if self._semaphore_loop is not loop:
+            # A semaphore belongs to the loop it is first used in.
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._limited(loop, executor, func, args)
+
+    async def _limited(self, loop, executor, func, args):
+        async with self._semaphore:
+            return await loop.run_in_executor(executor, func, *args)
+
+    async def render(self, text):
+        """Return the rendering of ``text``."""
+        if len(text) < self.threshold:
+            return self.converter.convert(text)
+        return await self._run(self.executor, _convert, self.options,
+                               self.format, text)
+
+    async def stream(self, text, chunk_size=16384):
+        """Yield the HTML of ``text`` in chunks of at least
+        ``chunk_size`` characters (whole top-level blocks), parsing and
+        rendering each chunk in a thread."""
+        if self.format != "html":
+            raise ValueError("stream() only renders HTML")
+        if len(text) < self.threshold:
+            yield self.converter.convert(text)
+            return
+        executor = self.executor
+        if not isinstance(executor, ThreadPoolExecutor):
+            executor = None
+        doc = await self._run(executor, self.converter.parse, text)
+        try:
+            renderer = HtmlRenderer(self.options)
+            block = doc.first_child
+            while block is not None:
+                html, block = await self._run(
+                    executor, _render_blocks, renderer, block, chunk_size)
+                yield html
+        finally:
+            doc.dispose()
+
+
+# Used by the module-level functions, one per format.
+default_renderers = {}
+
+
+def _default_renderer(format):
+    try:
+        return default_renderers[format]
+    except KeyError:
+        renderer = default_renderers[format] = AsyncRenderer(format=format)
+        return renderer
+
+
+async def render(text, format="html"):
+    """Render ``text`` with the default :class:`AsyncRenderer` of
+    ``format``."""
+    return await _default_renderer(format).render(text)
+
+
+def stream(text, chunk_size=16384):
+    """Stream the HTML of ``text`` with the default
+    :class:`AsyncRenderer` (see :meth:`AsyncRenderer.stream`)."""
+    return _default_renderer("html").stream(text, chunk_size)
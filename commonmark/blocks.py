@@ -2,9 +2,13 @@ from __future__ import absolute_import, unicode_literals
 
 import re
 from commonmark import common
-from commonmark.common import unescape_string
-from commonmark.inlines import InlineParser
+from commonmark.common import (
+    DEADLINE_INTERVAL, check_deadline, reLineEnding, unescape_string)
+from commonmark.exceptions import LimitExceeded
+from commonmark.inlines import InlineParser, literal_text
 from commonmark.node import Node
+from commonmark.options import on_limit
+from commonmark.plain import is_plain_blocks, iter_paragraphs, split_lines
 
 
 CODE_INDENT = 4
@@ -28,6 +32,8 @@ reHtmlBlockOpen = [
         '^(?:' + common.OPENTAG + '|' + common.CLOSETAG + ')\\s*$',
         re.IGNORECASE),
 ]
+# The blocks that count towards the max_depth limit.
+NESTING = ('block_quote', 'list', 'item')
 reHtmlBlockClose = [
     re.compile(r'.'),  # dummy for 0
     re.compile(r'<\/(?:script|pre|style)>', re.IGNORECASE),
@@ -40,18 +46,22 @@ reThematicBreak = re.compile(
     r'^(?:(?:\*[ \t]*){3,}|(?:_[ \t]*){3,}|(?:-[ \t]*){3,})[ \t]*$')
 reMaybeSpecial = re.compile(r'^[#`~*+_=<>0-9-]')
 reNonSpace = re.compile(r'[^ \t\f\v\r\n]')
+reLeadingWhitespace = re.compile(r'[ \t]*')
+reBlockQuotePrefix = re.compile(r' {0,3}> ?')
 reBulletListMarker = re.compile(r'^[*+-]')
 reOrderedListMarker = re.compile(r'^(\d{1,9})([.)])')
 reATXHeadingMarker = re.compile(r'^#{1,6}(?:[ \t]+|$)')
 reCodeFence = re.compile(r'^`{3,}(?!.*`)|^~{3,}')
 reClosingCodeFence = re.compile(r'^(?:`{3,}|~{3,})(?= *$)')
 reSetextHeadingLine = re.compile(r'^(?:=+|-+)[ \t]*$')
-reLineEnding = re.compile(r'\r\n|\n|\r')
+# The first line that may not continue a paragraph as plain text: a
+# blank line, or one that could start a block (see reMaybeSpecial).
+reParagraphBreak = re.compile(r'^[ \t]*(?:[#`~*+_=<>0-9-]|$)', re.MULTILINE)
 
 
 def is_blank(s):
     """Returns True if string contains only space characters."""
-    return re.search(reNonSpace, s) is None
+    return reNonSpace.search(s) is None
 
 
 def is_space_or_tab(s):
@@ -162,6 +172,68 @@ def lists_match(list_data, item_data):
         list_data.get('bullet_char') == item_data.get('bullet_char')
 
 
+def index_inlines(block, index):
+    """Append the descendants of ``block`` to the per-type lists in
+    ``index``, in document order."""
+    stack = []
+    node = block.first_child
+    while node is not None:
+        index.setdefault(node.t, []).append(node)
+        if node.first_child is not None:
+            if node.nxt is not None:
+                stack.append(node.nxt)
+            node = node.first_child
+        else:
+            node = node.nxt
+        if node is None and stack:
+            node = stack.pop()
+
+
+def shift_sourcepos(block, delta):
+    """Move ``block`` and the blocks inside it ``delta`` lines down."""
+    stack = [block]
+    while stack:
+        node = stack.pop()
+        pos = node.sourcepos
+        if pos is not None:
+            node.sourcepos = [[pos[0][0] + delta, pos[0][1]],
+                              [pos[1][0] + delta, pos[1][1]]]
+        if node.t != 'paragraph' and node.t != 'heading':
+            child = node.first_child
+            while child is not None:
+                stack.append(child)
+                child = child.nxt
+
+
+def flush_content(block):
+    """Append the pending content of ``block`` (see Parser.add_line) to
+    its string_content."""
+    spans = block.__dict__.pop('content_spans', None)
+    if spans:
+        parts = [block.string_content]
+        for span in spans:
+            if type(span) is list:
+                source, start, end, offset = span
+                text = source[start + offset:end]
+                if offset:
+                    text = re.sub('\n.{%d}' % offset, '\n', text)
+                parts.append(text)
+                parts.append('\n')
+            else:
+                parts.append(span)
+        block.string_content = ''.join(parts)
+
+
+def dispose_chain(block):
+    """Dispose of ``block`` and its following siblings, which must
+    already be detached from their parent."""
+    while block is not None:
+        nxt = block.nxt
+        block.parent = block.prv = block.nxt = None
+        block.dispose()
+        block = nxt
+
+
 class Block(object):
     accepts_lines = None
 
@@ -326,6 +398,8 @@ class CodeBlock(Block):
                 re.search(reClosingCodeFence, ln[parser.next_nonspace:])
             if match and len(match.group()) >= container.fence_length:
                 # closing fence - we're at end of line, so we can return
+                parser.last_line_length = \
+                    parser.offset + indent + len(match.group())
                 parser.finalize(container, parser.line_number)
                 return 2
             else:
@@ -432,6 +506,10 @@ class BlockStarts(object):
         'list_item',
         'indented_code_block',
     ]
+    # Those that cannot nest a container, and all but block_quote and
+    # list_item, which nest one (or a list and an item).
+    LEAF_METHODS = [m for m in METHODS if m not in ('block_quote',
+                                                    'list_item')]
 
     @staticmethod
     def block_quote(parser, container=None):
@@ -518,6 +596,7 @@ class BlockStarts(object):
                 parser.current_line[parser.next_nonspace:])
             if m:
                 parser.close_unmatched_blocks()
+                flush_content(container)
                 # resolve reference link definitiosn
                 while peek(container.string_content, 0) == '[':
                     pos = parser.inline_parser.parseReference(
@@ -585,13 +664,31 @@ class BlockStarts(object):
         return 0
 
 
+def nesting_depth(block):
+    """ The number of block quotes, lists and items block is, or is
+    nested in."""
+    depth = 0
+    while block is not None:
+        if block.t in NESTING:
+            depth += 1
+        block = block.parent
+    return depth
+
+
 class Parser(object):
-    def __init__(self, options={}):
+    def __init__(self, options=None):
+        if options is None:
+            options = {}
         self.doc = Node('document', [[1, 1], [0, 0]])
         self.block_starts = BlockStarts()
         self.tip = self.doc
         self.oldtip = self.doc
         self.current_line = ''
+        self.source = None
+        self.line_start = None
+        self.scanned_offset = -1
+        self.scanned_column = -1
+        self.blank_propagated = None
         self.line_number = 0
         self.offset = 0
         self.column = 0
@@ -607,17 +704,59 @@ class Parser(object):
         self.last_line_length = 0
         self.inline_parser = InlineParser(options)
         self.options = options
+        # A monotonic() time, set by parse(deadline=...).
+        self.deadline = None
+        self.read_limits()
+
+    def read_limits(self):
+        """ Read the resource limits from the options (see
+        commonmark.options) and start counting nodes."""
+        options = self.options
+        self.max_nodes = options.get('max_nodes')
+        self.max_depth = options.get('max_depth')
+        self.max_inline_depth = options.get('max_inline_depth')
+        self.on_limit = on_limit(options)
+        self.limited = self.max_nodes is not None or \
+            self.max_depth is not None
+        self.node_count = 0
 
     def add_line(self):
         """ Add a line to the block at the tip.  We assume the tip
-        can accept lines -- that check should be done before calling this."""
+        can accept lines -- that check should be done before calling this.
+
+        The line is not copied into string_content right away but
+        recorded in the block's content_spans, and flush_content() builds
+        string_content once, when the block is finalized.  A line sliced
+        from the input buffer (see incorporate_line) extends the last
+        ``[source, start, end, offset]`` run -- lines ``source[start:end]``
+        separated by ``'\\n'``, each without its first ``offset``
+        characters -- when it directly follows it with the same offset;
+        other content is recorded as strings."""
+        tip = self.tip
+        try:
+            spans = tip.content_spans
+        except AttributeError:
+            spans = tip.content_spans = []
         if self.partially_consumed_tab:
             # Skip over tab
             self.offset += 1
             # Add space characters
             chars_to_tab = 4 - (self.column % 4)
-            self.tip.string_content += (' ' * chars_to_tab)
-        self.tip.string_content += (self.current_line[self.offset:] + '\n')
+            spans.append(' ' * chars_to_tab)
+        line_start = self.line_start
+        if line_start is None:
+            spans.append(self.current_line[self.offset:] + '\n')
+            return
+        source = self.source
+        end = line_start + len(self.current_line)
+        if spans:
+            run = spans[-1]
+            if type(run) is list and run[2] + 1 == line_start and \
+               run[3] == self.offset and run[0] is source and \
+               source[run[2]] == '\n':
+                run[2] = end
+                return
+        spans.append([source, line_start, end, self.offset])
 
     def add_child(self, tag, offset):
         """ Add block of type tag as a child of the tip.  If the tip can't
@@ -626,6 +765,9 @@ class Parser(object):
         while not self.blocks[self.tip.t].can_contain(tag):
             self.finalize(self.tip, self.line_number - 1)
 
+        if self.limited:
+            self.count_block(tag)
+
         column_number = offset + 1
         new_block = Node(tag, [[self.line_number, column_number], [0, 0]])
         new_block.string_content = ''
@@ -633,6 +775,46 @@ class Parser(object):
         self.tip = new_block
         return new_block
 
+    def count_block(self, tag):
+        """ Count a new block of type tag against max_nodes and
+        max_depth.  With on_limit 'text' the parser opens no block past
+        either (see block_start_methods and parse_blocks) but the
+        paragraphs that take the rest of the line and the rest of the
+        input as text, so the number of blocks passes max_nodes by two
+        at most (not counting the document)."""
+        self.node_count += 1
+        if self.on_limit != 'raise':
+            return
+        if self.max_nodes is not None and self.node_count > self.max_nodes:
+            raise LimitExceeded('max_nodes', self.max_nodes)
+        if self.max_depth is not None and tag in NESTING and \
+           nesting_depth(self.tip) >= self.max_depth:
+            raise LimitExceeded('max_depth', self.max_depth)
+
+    def block_start_methods(self, container):
+        """ The block starts to try in container: with on_limit 'text',
+        those that would go over max_nodes or nest a block deeper than
+        max_depth are left out, and the rest of the line is read as
+        text instead."""
+        starts = self.block_starts
+        if self.on_limit == 'raise':
+            return starts.METHODS
+        # how many blocks can still be opened, and nested
+        room = None
+        if self.max_nodes is not None:
+            room = self.max_nodes - self.node_count
+            if room <= 0:
+                return []
+        if self.max_depth is not None:
+            depth_room = self.max_depth - nesting_depth(container)
+            room = depth_room if room is None else min(room, depth_room)
+        if room is None or room >= (1 if container.t == 'list' else 2):
+            return starts.METHODS
+        if room >= 1:
+            # room for a block quote, not for a list and its item
+            return ['block_quote'] + starts.LEAF_METHODS
+        return starts.LEAF_METHODS
+
     def close_unmatched_blocks(self):
         """Finalize and close any unmatched blocks."""
         if not self.all_closed:
@@ -643,33 +825,34 @@ class Parser(object):
             self.all_closed = True
 
     def find_next_nonspace(self):
+        """ Find the first character after the spaces and tabs at the
+        current offset, and set next_nonspace, indent, indented and
+        blank.  Runs of spaces are skipped with a regex; only tabs need
+        column arithmetic.  The result is reused while the offset and
+        column do not change, since containers that consume nothing
+        scan the same position again."""
+        offset = self.offset
+        column = self.column
+        if offset == self.scanned_offset and column == self.scanned_column:
+            return
+        self.scanned_offset = offset
+        self.scanned_column = column
         current_line = self.current_line
-        i = self.offset
-        cols = self.column
-
-        try:
-            c = current_line[i]
-        except IndexError:
-            c = ''
-        while c != '':
-            if c == ' ':
-                i += 1
-                cols += 1
-            elif c == '\t':
-                i += 1
-                cols += (4 - (cols % 4))
-            else:
-                break
-
-            try:
-                c = current_line[i]
-            except IndexError:
-                c = ''
+        i = reLeadingWhitespace.match(current_line, offset).end()
+        if current_line.find('\t', offset, i) == -1:
+            cols = column + i - offset
+        else:
+            cols = column
+            for c in current_line[offset:i]:
+                if c == '\t':
+                    cols += (4 - (cols % 4))
+                else:
+                    cols += 1
 
-        self.blank = (c == '\n' or c == '\r' or c == '')
+        self.blank = i == len(current_line) or current_line[i] in '\n\r'
         self.next_nonspace = i
         self.next_nonspace_column = cols
-        self.indent = self.next_nonspace_column - self.column
+        self.indent = cols - column
         self.indented = self.indent >= CODE_INDENT
 
     def advance_next_nonspace(self):
@@ -679,6 +862,15 @@ class Parser(object):
 
     def advance_offset(self, count, columns):
         current_line = self.current_line
+        if count > 0 and \
+           current_line.find('\t', self.offset, self.offset + count) == -1:
+            # no tabs: one character is one column
+            count = min(count, len(current_line) - self.offset)
+            if count > 0:
+                self.partially_consumed_tab = False
+                self.offset += count
+                self.column += count
+            return
         try:
             c = current_line[self.offset]
         except IndexError:
@@ -708,11 +900,61 @@ class Parser(object):
             except IndexError:
                 c = None
 
-    def incorporate_line(self, ln):
+    def continue_plain_containers(self):
+        """ Match the open lists, list items and block quotes at the start
+        of a line without tabs, where one character is one column, without
+        going through find_next_nonspace and continue_ for each of them.
+        Stops at the first other open block, which is left to the general
+        loop in incorporate_line.  Returns the last matched container and
+        whether every container visited matched."""
+        ln = self.current_line
+        container = self.doc
+        offset = 0
+        nonspace = -1
+        matched = True
+        while True:
+            child = container.last_child
+            if not (child and child.is_open):
+                break
+            t = child.t
+            if t == 'block_quote':
+                m = reBlockQuotePrefix.match(ln, offset)
+                if m is None:
+                    matched = False
+                    break
+                offset = m.end()
+            elif t == 'item':
+                if nonspace < offset:
+                    nonspace = reLeadingWhitespace.match(ln, offset).end()
+                if nonspace == len(ln) or ln[nonspace] in '\n\r':
+                    if child.first_child is None:
+                        # Blank line after empty list item
+                        matched = False
+                        break
+                    offset = nonspace
+                else:
+                    width = child.list_data['marker_offset'] + \
+                        child.list_data['padding']
+                    if nonspace - offset < width:
+                        matched = False
+                        break
+                    offset += width
+            elif t != 'list':
+                break
+            container = child
+        if offset:
+            self.offset = self.column = offset
+            self.partially_consumed_tab = False
+        return container, matched
+
+    def incorporate_line(self, ln, start=None):
         """Analyze a line of text and update the document appropriately.
 
         We parse markdown text by calling this on each line of input,
-        then finalizing the document.
+        then finalizing the document.  ``start`` is the offset of the
+        line in ``self.source`` when it was sliced from it, so that
+        block content can be recorded as spans of the source instead of
+        copies (see add_line).
         """
         all_matched = True
 
@@ -725,15 +967,21 @@ class Parser(object):
         self.line_number += 1
 
         # replace NUL characters for security
-        if re.search(r'\u0000', ln) is not None:
-            ln = re.sub(r'\0', '\uFFFD', ln)
+        if '\0' in ln:
+            ln = ln.replace('\0', '\uFFFD')
+            start = None
+        self.line_start = start
 
         self.current_line = ln
+        self.scanned_offset = -1
+
+        if '\t' not in ln:
+            container, all_matched = self.continue_plain_containers()
 
         # For each containing block, try to parse the associated line start.
         # Bail out on failure: container will point to the last matching block.
         # Set all_matched to false if not all containers match.
-        while True:
+        while all_matched:
             last_child = container.last_child
             if not (last_child and last_child.is_open):
                 break
@@ -767,21 +1015,24 @@ class Parser(object):
         matched_leaf = container.t != 'paragraph' and \
             self.blocks[container.t].accepts_lines
         starts = self.block_starts
-        starts_len = len(starts.METHODS)
+        methods = starts.METHODS
         # Unless last matched container is a code block, try new container
         # starts, adding children to the last matched container:
         while not matched_leaf:
             self.find_next_nonspace()
+            if self.limited:
+                methods = self.block_start_methods(container)
+            starts_len = len(methods)
 
             # this is a little performance optimization:
             if not self.indented and \
-               not re.search(reMaybeSpecial, ln[self.next_nonspace:]):
+               not reMaybeSpecial.search(ln[self.next_nonspace:]):
                 self.advance_next_nonspace()
                 break
 
             i = 0
             while i < starts_len:
-                res = getattr(starts, starts.METHODS[i])(self, container)
+                res = getattr(starts, methods[i])(self, container)
                 if res == 1:
                     container = self.tip
                     break
@@ -824,11 +1075,19 @@ class Parser(object):
                       not container.first_child and
                       container.sourcepos[0][0] == self.line_number))
 
-            # propagate last_line_blank up through parents:
+            # propagate last_line_blank up through parents, stopping at
+            # the container it was last propagated from if the value is
+            # the same: everything above it already has that value
+            stop = self.blank_propagated
+            if stop is not None and stop[1] != last_line_blank:
+                stop = None
             cont = container
             while cont:
+                if stop is not None and cont is stop[0]:
+                    break
                 cont.last_line_blank = last_line_blank
                 cont = cont.parent
+            self.blank_propagated = (container, last_line_blank)
 
             if self.blocks[t].accepts_lines:
                 self.add_line()
@@ -857,6 +1116,7 @@ class Parser(object):
         above = block.parent
         block.is_open = False
         block.sourcepos[1] = [line_number, self.last_line_length]
+        flush_content(block)
 
         self.blocks[block.t].finalize(self, block)
 
@@ -867,39 +1127,443 @@ class Parser(object):
         Walk through a block & children recursively, parsing string content
         into inline content where appropriate.
         """
+        inline_parser = self.inline_parser
+        inline_parser.refmap = self.refmap
+        inline_parser.options = self.options
+        # the inlines count on from the blocks
+        inline_parser.max_nodes = self.max_nodes
+        inline_parser.max_inline_depth = self.max_inline_depth
+        inline_parser.node_count = self.node_count
+        inline_parser.on_limit = self.on_limit
+        index = {} if self.options.get('type_index') else None
+        try:
+            self.parse_inlines(block, index)
+        finally:
+            self.node_count = inline_parser.node_count
+            inline_parser.max_nodes = inline_parser.max_inline_depth = None
+        if index is not None:
+            block.type_index = index
+
+    def parse_inlines(self, block, index=None):
         walker = block.walker()
-        self.inline_parser.refmap = self.refmap
-        self.inline_parser.options = self.options
         event = walker.nxt()
         while event is not None:
             node = event['node']
             t = node.t
-            if not event['entering'] and (t == 'paragraph' or t == 'heading'):
+            if event['entering']:
+                if index is not None:
+                    index.setdefault(t, []).append(node)
+            elif t == 'paragraph' or t == 'heading':
                 self.inline_parser.parse(node)
+                if index is not None:
+                    index_inlines(node, index)
             event = walker.nxt()
 
-    def parse(self, my_input):
-        """ The main parsing function.  Returns a parsed document AST."""
+    def parse(self, my_input, deadline=None):
+        """ The main parsing function.  Returns a parsed document AST.
+
+        If ``deadline`` (a ``common.monotonic()`` time) is given, the
+        clock is checked first and then every
+        ``common.DEADLINE_INTERVAL`` lines and inline tokens, and
+        DeadlineExceeded is raised once it has passed."""
+        if deadline is not None:
+            check_deadline(deadline)
+        self.deadline = self.inline_parser.deadline = deadline
+        self.inline_parser.steps = 0
+        try:
+            self.parse_blocks(my_input)
+            self.process_inlines(self.doc)
+        finally:
+            self.deadline = self.inline_parser.deadline = None
+            self.source = None
+        return self.doc
+
+    def parse_blocks(self, my_input):
+        """ Run only the block phase of parsing.  Returns the document
+        with every block closed and link reference definitions collected
+        in refmap, but with the string_content of paragraphs and headings
+        not yet parsed into inlines (see process_inlines).
+
+        The input is kept, once: lines are handed to incorporate_line
+        with their offset in it, and block content is only copied out of
+        it when the block is finalized.  With the ``incremental`` option
+        the document keeps it, as ``doc.source``, and its refmap (see
+        reparse)."""
+        if '\0' in my_input:
+            # replace NUL characters for security
+            my_input = my_input.replace('\0', '\uFFFD')
+        if self.options.get('max_nodes') is None and \
+           is_plain_blocks(my_input):
+            return self.parse_plain_blocks(my_input)
+        self.reset()
+        self.source = my_input
+        if self.options.get('incremental'):
+            self.doc.source = my_input
+        deadline = self.deadline
+        # with on_limit 'text', lines stop being parsed once the node
+        # budget is spent
+        budget = self.max_nodes if self.on_limit == 'text' else None
+        start = 0
+        for match in reLineEnding.finditer(my_input):
+            if budget is not None and self.node_count >= budget:
+                break
+            self.incorporate_line(my_input[start:match.start()], start)
+            start = match.end()
+            if deadline is not None and \
+               not self.line_number % DEADLINE_INTERVAL:
+                check_deadline(deadline)
+        else:
+            if (not my_input or my_input[-1] != '\n') and \
+               (budget is None or self.node_count < budget):
+                # the last line (a final newline does not start a new one)
+                self.incorporate_line(my_input[start:], start)
+                start = len(my_input)
+        while (self.tip):
+            self.finalize(self.tip, self.line_number)
+        if budget is not None and my_input[start:].strip():
+            self.add_rest_as_text(my_input[start:])
+        self.source = None
+        return self.doc
+
+    def add_rest_as_text(self, rest):
+        """ End the document with a paragraph holding the input from
+        ``rest`` on, unparsed, for on_limit 'text' once max_nodes is
+        reached."""
+        lines = split_lines(rest)
+        first = self.line_number + 1
+        last = self.line_number + len(lines)
+        paragraph = Node('paragraph', [[first, 1], [last, len(lines[-1])]])
+        paragraph.string_content = rest
+        paragraph.is_open = False
+        self.doc.append_child(paragraph)
+        self.node_count += 1
+        self.line_number = last
+        self.last_line_length = len(lines[-1])
+        self.doc.sourcepos[1] = [last, self.last_line_length]
+
+    def parse_outline(self, my_input):
+        """ Return the headings of my_input, in document order, as a
+        list of ``{'level': ..., 'text': ..., 'sourcepos': ...}`` dicts,
+        where ``text`` is the text of the heading without markup.
+
+        Only the block phase runs in full: inlines are parsed for
+        headings alone, and the lines of top-level paragraphs and fenced
+        code blocks that cannot end them are skipped over with one
+        regex search (see parse_outline_blocks)."""
+        doc = self.parse_outline_blocks(my_input)
+        outline = []
+        try:
+            stack = []
+            node = doc.first_child
+            while node is not None:
+                if node.t == 'heading':
+                    self.process_inlines(node)
+                    outline.append({'level': node.level,
+                                    'text': literal_text(node),
+                                    'sourcepos': node.sourcepos})
+                elif node.t in NESTING and node.first_child is not None:
+                    stack.append(node.nxt)
+                    node = node.first_child
+                    continue
+                node = node.nxt
+                while node is None and stack:
+                    node = stack.pop()
+        finally:
+            doc.dispose()
+        return outline
+
+    def parse_outline_blocks(self, my_input):
+        """ The block phase for parse_outline().  Lines that continue a
+        top-level paragraph as plain text are added to it without being
+        parsed, and the lines inside a top-level fenced code block are
+        skipped up to its closing fence, so the document has the same
+        headings, link reference definitions and block structure as
+        with parse_blocks(), but not the content of fenced code."""
+        if '\0' in my_input:
+            # replace NUL characters for security
+            my_input = my_input.replace('\0', '\uFFFD')
+        if is_plain_blocks(my_input):
+            # no line can start a block: no headings
+            self.reset()
+            return self.doc
+        if '\r' in my_input:
+            # skipping is done on '\n' line endings only
+            return self.parse_blocks(my_input)
+        self.reset()
+        self.source = my_input
+        doc = self.doc
+        doc.source = my_input
+        deadline = self.deadline
+        pos = 0
+        length = len(my_input)
+        while pos < length:
+            end = my_input.find('\n', pos)
+            if end == -1:
+                end = length
+            self.incorporate_line(my_input[pos:end], pos)
+            pos = end + 1
+            if deadline is not None and \
+               not self.line_number % DEADLINE_INTERVAL:
+                check_deadline(deadline)
+            tip = self.tip
+            if pos >= length or tip.parent is not doc:
+                continue
+            if tip.t == 'paragraph':
+                match = reParagraphBreak.search(my_input, pos)
+            elif tip.t == 'code_block' and tip.is_fenced:
+                match = re.compile(
+                    r'^ {0,3}' + re.escape(tip.fence_char) +
+                    '{%d,}(?= *$)' % tip.fence_length,
+                    re.MULTILINE).search(my_input, pos)
+            else:
+                continue
+            skip_to = match.start() if match else length
+            if skip_to > pos:
+                self.skip_lines(tip, my_input[pos:skip_to])
+                pos = skip_to
+        while (self.tip):
+            self.finalize(self.tip, self.line_number)
+        self.source = None
+        return doc
+
+    def skip_lines(self, tip, text):
+        """ Account for the lines of text without parsing them: they
+        are added to tip if it is a paragraph, and dropped otherwise."""
+        lines = (text[:-1] if text[-1] == '\n' else text).split('\n')
+        if tip.t == 'paragraph':
+            tip.content_spans.append(
+                ''.join(line.lstrip(' \t') + '\n' for line in lines))
+        self.line_number += len(lines)
+        self.last_line_length = len(lines[-1])
+
+    def parse_plain_blocks(self, my_input):
+        """ The block phase for input that passes
+        plain.is_plain_blocks(), where every run of non-empty lines is a
+        paragraph.  Builds the same document as the general block
+        parser, line numbers, source positions and last_line_blank
+        included."""
+        self.reset()
+        doc = self.doc
+        if self.options.get('incremental'):
+            doc.source = my_input
+        lines = split_lines(my_input)
+        for first, paragraph_lines in iter_paragraphs(lines):
+            last = first + len(paragraph_lines) - 1
+            paragraph = Node('paragraph', [[first, 1],
+                                           [last, len(paragraph_lines[-1])]])
+            paragraph.string_content = '\n'.join(paragraph_lines) + '\n'
+            paragraph.is_open = False
+            # only a blank line can follow a paragraph
+            paragraph.last_line_blank = last < len(lines)
+            doc.append_child(paragraph)
+        self.line_number = len(lines)
+        self.last_line_length = len(lines[-1])
+        doc.sourcepos[1] = [self.line_number, self.last_line_length]
+        doc.last_line_blank = not lines[-1]
+        doc.is_open = False
+        self.tip = None
+        return doc
+
+    def parse_lines(self, lines):
+        """ Run the block phase over a list of lines without line
+        endings (see parse_blocks)."""
+        self.reset()
+        for line in lines:
+            self.incorporate_line(line)
+        while (self.tip):
+            self.finalize(self.tip, len(lines))
+        if self.options.get('incremental'):
+            # kept for reparse()
+            self.doc.lines = lines
+        return self.doc
+
+    def reset(self):
+        """ Start a new, empty document, to be fed with incorporate_line
+        and closed by finalizing the tip until there is none."""
         self.doc = Node('document', [[1, 1], [0, 0]])
         self.tip = self.doc
         self.refmap = {}
+        if self.options.get('incremental'):
+            self.doc.refmap = self.refmap
         self.line_number = 0
         self.last_line_length = 0
         self.offset = 0
         self.column = 0
         self.last_matched_container = self.doc
         self.current_line = ''
-        lines = re.split(reLineEnding, my_input)
-        length = len(lines)
-        if len(my_input) > 0 and my_input[-1] == '\n':
-            # ignore last blank line created by final newline
-            length -= 1
-        for i in range(length):
-            self.incorporate_line(lines[i])
-        while (self.tip):
-            self.finalize(self.tip, length)
-        self.process_inlines(self.doc)
-        return self.doc
+        self.source = None
+        self.line_start = None
+        self.blank_propagated = None
+        self.read_limits()
+
+    def reparse(self, old_doc, edit):
+        """ Parse a document again after an edit, reusing the unchanged
+        blocks of ``old_doc``, which must come from parse(), parse_lines()
+        or reparse() with the ``incremental`` option, and is consumed (the
+        updated tree is returned; the list of lines is copied, not
+        changed in place).
+
+        ``edit`` is a ``(start, end, text)`` tuple: lines ``start``
+        through ``end`` of the old document (1-based and inclusive, so
+        ``end == start - 1`` inserts before line ``start``) are replaced
+        by the lines of ``text``, whose trailing newline is ignored.
+
+        Line-by-line parsing restarts at the last top-level block that
+        begins before the edit, and stops once a new top-level block
+        starts on a line after the edit where an old one started: from
+        there on the old blocks are kept, with their line numbers
+        shifted.  Edits that add or remove link reference definitions
+        fall back to a full parse, since they can change any link.
+        """
+        start, end, text = edit
+        if getattr(old_doc, 'refmap', None) is None:
+            raise ValueError("reparse() needs a document parsed with the "
+                             "'incremental' option")
+        old_lines = getattr(old_doc, 'lines', None)
+        if old_lines is None:
+            # a document from parse(): split its source once; from now
+            # on the lines are kept instead
+            old_lines = re.split(reLineEnding, old_doc.source)
+            if old_doc.source and old_doc.source[-1] == '\n':
+                old_lines.pop()
+        else:
+            old_lines = list(old_lines)
+        if not 1 <= start <= len(old_lines) + 1 or \
+           not start - 1 <= end <= len(old_lines):
+            raise ValueError('edit {!r} is outside the document'.format(
+                (start, end)))
+        new_lines = re.split(reLineEnding, text) if text else []
+        if text and text[-1] == '\n':
+            new_lines.pop()
+        delta = len(new_lines) - (end - start + 1)
+        removed = old_lines[start - 1:end]
+        lines = old_lines
+        lines[start - 1:end] = new_lines
+        for line in removed:
+            if ']:' in line:
+                return self._reparse_all(old_doc, lines, None)
+        # new line number of the first line after the edit
+        after = start + len(new_lines)
+
+        doc = old_doc
+        # find the restart block from whichever end is nearer
+        if start * 2 < len(lines):
+            restart = None
+            block = doc.first_child
+            while block is not None and block.sourcepos[0][0] < start:
+                restart = block
+                block = block.nxt
+        else:
+            restart = doc.last_child
+            while restart is not None and restart.sourcepos[0][0] >= start:
+                restart = restart.prv
+        if restart is None:
+            old = doc.first_child
+            kept = None
+            first_line = 1
+        else:
+            old = restart
+            kept = restart.prv
+            first_line = restart.sourcepos[0][0]
+        old_last = doc.last_child
+        old_end = doc.sourcepos[1]
+        # detach the old blocks from the restart point on
+        if kept is None:
+            doc.first_child = doc.last_child = None
+        else:
+            kept.nxt = None
+            doc.last_child = kept
+        if old is not None:
+            old.prv = None
+        discarded = old
+
+        self.doc = doc
+        self.tip = doc
+        self.oldtip = doc
+        self.last_matched_container = doc
+        self.all_closed = True
+        self.refmap = doc.refmap
+        self.line_number = first_line - 1
+        self.last_line_length = len(lines[first_line - 2]) \
+            if first_line > 1 else 0
+        self.offset = 0
+        self.column = 0
+        self.current_line = ''
+        self.blank_propagated = None
+        doc.is_open = True
+
+        # the lines parsed again must not add reference definitions (the
+        # removed ones were checked above, and the others are unchanged)
+        converged = None
+        for i in range(first_line - 1, len(lines)):
+            line = lines[i]
+            if ']:' in line:
+                return self._reparse_all(doc, lines, discarded)
+            self.incorporate_line(line)
+            line_number = i + 1
+            if line_number < after:
+                continue
+            last = doc.last_child
+            if last is None or last.sourcepos[0][0] != line_number:
+                continue
+            old_line = line_number - delta
+            while old is not None and old.sourcepos[0][0] < old_line:
+                old = old.nxt
+            if old is not None and old.sourcepos[0][0] == old_line and \
+               old_line > end and old.t == last.t and \
+               old.sourcepos[0][1] == last.sourcepos[0][1]:
+                converged = last
+                break
+
+        if converged is None:
+            old = None
+            dispose_chain(discarded)
+            while (self.tip):
+                self.finalize(self.tip, len(lines))
+        else:
+            # drop the old blocks that were parsed again
+            if old.prv is not None:
+                old.prv.nxt = None
+                old.prv = None
+                dispose_chain(discarded)
+            converged.dispose()
+            self.tip = None
+            if doc.last_child is None:
+                doc.first_child = old
+            else:
+                doc.last_child.nxt = old
+                old.prv = doc.last_child
+            doc.last_child = old_last
+            if delta:
+                block = old
+                while block is not None:
+                    shift_sourcepos(block, delta)
+                    block = block.nxt
+            doc.sourcepos[1] = [old_end[0] + delta, old_end[1]]
+            doc.is_open = False
+
+        self.inline_parser.refmap = self.refmap
+        self.inline_parser.options = self.options
+        block = doc.first_child if kept is None else kept.nxt
+        while block is not None and block is not old:
+            self.parse_inlines(block)
+            block = block.nxt
+        if self.options.get('type_index'):
+            doc.type_index = {'document': [doc]}
+            index_inlines(doc, doc.type_index)
+        doc.lines = lines
+        doc.source = None
+        doc.line_starts = None
+        return doc
+
+    def _reparse_all(self, old_doc, lines, discarded):
+        dispose_chain(discarded)
+        old_doc.dispose()
+        doc = self.parse_lines(lines)
+        self.process_inlines(doc)
+        doc.lines = lines
+        doc.refmap = self.refmap
+        return doc
 
 
 CAMEL_RE = re.compile("(.)([A-Z](?:[a-z]+|(?<=[a-z0-9].)))")
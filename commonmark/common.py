@@ -2,22 +2,24 @@ from __future__ import absolute_import, unicode_literals
 
 import re
 import sys
+import time
+
+from commonmark.exceptions import DeadlineExceeded
 
 try:
     from urllib.parse import quote
 except ImportError:
     from urllib import quote
 
-if sys.version_info >= (3, 0):
-    if sys.version_info >= (3, 4):
-        import html
-        HTMLunescape = html.unescape
-    else:
-        from .entitytrans import _unescape
-        HTMLunescape = _unescape
+if sys.version_info >= (3, 4):
+    import html
+    HTMLunescape = html.unescape
 else:
-    from commonmark import entitytrans
-    HTMLunescape = entitytrans._unescape
+    def HTMLunescape(s):
+        # The HTML5 entity table is large; only load it once an entity
+        # actually needs decoding.
+        from commonmark.entitytrans import _unescape
+        return _unescape(s)
 
 ENTITY = '&(?:#x[a-f0-9]{1,6}|#[0-9]{1,7}|[a-z][a-z0-9]{1,31});'
 
@@ -45,6 +47,24 @@ reEntityOrEscapedChar = re.compile(
     '\\\\' + ESCAPABLE + '|' + ENTITY, re.IGNORECASE)
 XMLSPECIAL = '[&<>"]'
 reXmlSpecial = re.compile(XMLSPECIAL)
+reLineEnding = re.compile(r'\r\n|\n|\r')
+
+
+# The clock deadlines are measured on: ``deadline`` arguments are
+# ``monotonic()`` values (``time.monotonic()`` on Python 3).
+monotonic = getattr(time, 'monotonic', time.time)
+
+# Deadlines are checked once per this many lines, inline tokens or
+# rendered nodes.
+DEADLINE_INTERVAL = 64
+
+
+def check_deadline(deadline):
+    """Raise DeadlineExceeded if the ``monotonic()`` time ``deadline``
+    has passed."""
+    if monotonic() > deadline:
+        raise DeadlineExceeded('deadline exceeded by {:.3f} s'.format(
+            monotonic() - deadline))
 
 
 def unescape_char(s):
@@ -104,10 +124,8 @@ def replace_unsafe_char(s):
 def escape_xml(s):
     if s is None:
         return ''
-    if re.search(reXmlSpecial, s):
-        return re.sub(
-            reXmlSpecial,
-            lambda m: replace_unsafe_char(m.group()),
-            s)
+    if reXmlSpecial.search(s):
+        return reXmlSpecial.sub(
+            lambda m: replace_unsafe_char(m.group()), s)
     else:
         return s
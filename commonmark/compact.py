@@ -0,0 +1,434 @@
+"""Array-backed ("struct of arrays") document trees.
+
+A parsed document normally costs one Python object (plus a ``__dict__``,
+a ``sourcepos`` list and a ``list_data`` dict) per node.  A
+:class:`CompactTree` stores the same tree as parallel ``array('i')``
+columns indexed by node number, with all text literals concatenated into
+one UTF-8 buffer and the remaining strings kept once in a pool, which
+needs several times less memory for large documents.
+
+Nodes are read through lightweight :class:`CompactNode` views that
+expose the attributes of :class:`commonmark.node.Node`, so renderers
+work on a compact tree unchanged::
+
+    tree = commonmark.compact.parse(text)
+    html = commonmark.HtmlRenderer().render(tree)
+
+Compact trees are read-only.  They do not keep ``string_content``,
+``last_line_blank`` or ``is_open``, which only matter while parsing.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import re
+from array import array
+
+from commonmark.blocks import Parser
+from commonmark.node import NodeWalker, reContainer
+
+# Attributes that are rarely set; they live in a sparse side table.
+EXTRA_ATTRIBUTES = (
+    'is_fenced', 'fence_char', 'fence_length', 'fence_offset',
+    'html_block_type', 'on_enter', 'on_exit',
+)
+_EXTRA_DEFAULTS = {
+    'is_fenced': False,
+    'fence_char': None,
+    'fence_length': 0,
+    'fence_offset': None,
+    'html_block_type': None,
+    'on_enter': None,
+    'on_exit': None,
+}
+
+
+class CompactTree(object):
+    """A read-only document tree stored as parallel integer columns.
+
+    Node 0 is the root.  Links between nodes (``parents``,
+    ``first_children``, ``nexts``) hold node numbers, with -1 for "none";
+    ``last_child`` and ``prv`` are found by following ``nexts``.  A
+    node's literal is ``literal_lengths[i]`` bytes of :attr:`literal_data`
+    starting at ``literal_starts[i]``, decoded as UTF-8 (length -1 for
+    ``None``).  Other string attributes hold indexes into ``strings``,
+    also -1 for ``None``.
+    """
+
+    def __init__(self):
+        self.type_names = []
+        self.container_codes = set()
+        self._type_codes = {}
+        self.strings = []
+        self._string_ids = {}
+        self._literal_data = b''
+        self._literal_chunks = []
+        self._literal_size = 0
+        # Last child of each parent still being appended to.
+        self._last_children = {}
+        self._shared = {}
+
+        self.types = array(str('H'))
+        self.parents = array(str('i'))
+        self.first_children = array(str('i'))
+        self.nexts = array(str('i'))
+        self.start_lines = array(str('i'))
+        self.start_columns = array(str('i'))
+        self.end_lines = array(str('i'))
+        self.end_columns = array(str('i'))
+        self.literal_starts = array(str('i'))
+        self.literal_lengths = array(str('i'))
+        self.destinations = array(str('i'))
+        self.titles = array(str('i'))
+        self.infos = array(str('i'))
+        self.levels = array(str('b'))
+
+        # Sparse columns: node number -> value.
+        self.list_data = {}
+        self.extras = {}
+
+    @classmethod
+    def from_node(cls, root):
+        """Build a compact copy of the tree rooted at ``root``."""
+        tree = cls()
+        tree.append(root, -1)
+        tree._finish()
+        return tree
+
+    def __len__(self):
+        return len(self.types)
+
+    @property
+    def root(self):
+        return CompactNode(self, 0)
+
+    def node(self, index):
+        """Return a view of node number ``index``."""
+        return CompactNode(self, index)
+
+    def walker(self):
+        return CompactWalker(self.root)
+
+    @property
+    def literal_data(self):
+        """All literals, UTF-8 encoded and concatenated in node order."""
+        if self._literal_chunks:
+            self._literal_data += b''.join(self._literal_chunks)
+            self._literal_chunks = []
+        return self._literal_data
+
+    def _finish(self):
+        # Drop the lookup tables that are only needed while appending.
+        self._string_ids = {}
+        self._last_children = {}
+        self._shared = {}
+        self.literal_data
+
+    def _type_code(self, t):
+        code = self._type_codes.get(t)
+        if code is None:
+            code = len(self.type_names)
+            self.type_names.append(t)
+            self._type_codes[t] = code
+            if re.search(reContainer, t) is not None:
+                self.container_codes.add(code)
+        return code
+
+    def _string(self, s):
+        if s is None:
+            return -1
+        index = self._string_ids.get(s)
+        if index is None:
+            index = len(self.strings)
+            self.strings.append(s)
+            self._string_ids[s] = index
+        return index
+
+    def _literal(self, s):
+        if s is None:
+            self.literal_starts.append(self._literal_size)
+            self.literal_lengths.append(-1)
+        else:
+            data = s.encode('utf-8')
+            self.literal_starts.append(self._literal_size)
+            self.literal_lengths.append(len(data))
+            self._literal_chunks.append(data)
+            self._literal_size += len(data)
+
+    def _share(self, values):
+        # Equal side-table entries (every ``` fence, every bullet list
+        # with the same marker) share one dict.
+        key = tuple(sorted(values.items()))
+        try:
+            return self._shared.setdefault(key, values)
+        except TypeError:
+            return values
+
+    def append(self, node, parent):
+        """Copy the subtree rooted at ``node`` in as the last child of node
+        number ``parent`` (-1 for a new root).  Returns the new node
+        number of ``node``."""
+        top = None
+        stack = []
+        for cur, entering in node.walker():
+            if not entering:
+                stack.pop()
+                continue
+            index = self._append_one(cur, stack[-1] if stack else parent)
+            if top is None:
+                top = index
+            if cur.is_container():
+                # the walker exits every container, even an empty one
+                stack.append(index)
+        return top
+
+    def _append_one(self, node, parent):
+        index = len(self.types)
+        self.types.append(self._type_code(node.t))
+        self.parents.append(parent)
+        self.first_children.append(-1)
+        self.nexts.append(-1)
+        if parent >= 0:
+            prv = self._last_children.get(parent, -1)
+            if prv >= 0:
+                self.nexts[prv] = index
+            else:
+                self.first_children[parent] = index
+            self._last_children[parent] = index
+
+        pos = node.sourcepos
+        if pos:
+            self.start_lines.append(pos[0][0])
+            self.start_columns.append(pos[0][1])
+            self.end_lines.append(pos[1][0])
+            self.end_columns.append(pos[1][1])
+        else:
+            self.start_lines.append(-1)
+            self.start_columns.append(-1)
+            self.end_lines.append(-1)
+            self.end_columns.append(-1)
+
+        self._literal(node.literal)
+        self.destinations.append(self._string(node.destination))
+        self.titles.append(self._string(node.title))
+        self.infos.append(self._string(node.info))
+        self.levels.append(-1 if node.level is None else node.level)
+
+        if node.list_data:
+            self.list_data[index] = self._share(dict(node.list_data))
+        extras = {}
+        for name in EXTRA_ATTRIBUTES:
+            value = getattr(node, name, None)
+            if value != _EXTRA_DEFAULTS[name]:
+                extras[name] = value
+        if extras:
+            self.extras[index] = self._share(extras)
+        return index
+
+
+def _link(column):
+    def get(self):
+        index = getattr(self.tree, column)[self.index]
+        return None if index < 0 else CompactNode(self.tree, index)
+    return property(get)
+
+
+def _string(column):
+    def get(self):
+        index = getattr(self.tree, column)[self.index]
+        return None if index < 0 else self.tree.strings[index]
+    return property(get)
+
+
+def _last_sibling(tree, index):
+    nexts = tree.nexts
+    while nexts[index] >= 0:
+        index = nexts[index]
+    return index
+
+
+def _extra(name):
+    def get(self):
+        extras = self.tree.extras.get(self.index)
+        if extras is None:
+            return _EXTRA_DEFAULTS[name]
+        return extras.get(name, _EXTRA_DEFAULTS[name])
+    return property(get)
+
+
+class CompactNode(object):
+    """A read-only, :class:`commonmark.node.Node`-like view of one node of
+    a :class:`CompactTree`.  Views are created on demand; two views of the
+    same node compare equal."""
+    __slots__ = ('tree', 'index')
+
+    string_content = None
+    last_line_blank = False
+    last_line_checked = False
+    is_open = False
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def t(self):
+        tree = self.tree
+        return tree.type_names[tree.types[self.index]]
+
+    parent = _link('parents')
+    first_child = _link('first_children')
+    nxt = _link('nexts')
+    destination = _string('destinations')
+    title = _string('titles')
+    info = _string('infos')
+
+    @property
+    def last_child(self):
+        tree = self.tree
+        first_child = tree.first_children[self.index]
+        if first_child < 0:
+            return None
+        return CompactNode(tree, _last_sibling(tree, first_child))
+
+    @property
+    def prv(self):
+        tree = self.tree
+        parent = tree.parents[self.index]
+        if parent < 0:
+            return None
+        cur = tree.first_children[parent]
+        if cur == self.index:
+            return None
+        nexts = tree.nexts
+        while nexts[cur] != self.index:
+            cur = nexts[cur]
+        return CompactNode(tree, cur)
+
+    @property
+    def literal(self):
+        tree = self.tree
+        length = tree.literal_lengths[self.index]
+        if length < 0:
+            return None
+        start = tree.literal_starts[self.index]
+        return tree.literal_data[start:start + length].decode('utf-8')
+
+    @property
+    def level(self):
+        level = self.tree.levels[self.index]
+        return None if level < 0 else level
+
+    @property
+    def sourcepos(self):
+        tree = self.tree
+        i = self.index
+        if tree.start_lines[i] < 0:
+            return None
+        return [[tree.start_lines[i], tree.start_columns[i]],
+                [tree.end_lines[i], tree.end_columns[i]]]
+
+    @property
+    def list_data(self):
+        return self.tree.list_data.get(self.index, {})
+
+    is_fenced = _extra('is_fenced')
+    fence_char = _extra('fence_char')
+    fence_length = _extra('fence_length')
+    fence_offset = _extra('fence_offset')
+    html_block_type = _extra('html_block_type')
+    on_enter = _extra('on_enter')
+    on_exit = _extra('on_exit')
+
+    def is_container(self):
+        tree = self.tree
+        return tree.types[self.index] in tree.container_codes
+
+    def walker(self):
+        return CompactWalker(self)
+
+    def __eq__(self, other):
+        return isinstance(other, CompactNode) and \
+            self.tree is other.tree and self.index == other.index
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index))
+
+    def __repr__(self):
+        return "CompactNode {} [{}]".format(self.t, self.literal)
+
+
+class CompactWalker(NodeWalker):
+    """A :class:`commonmark.node.NodeWalker` that steps through the
+    columns of a :class:`CompactTree` directly."""
+
+    def __init__(self, root):
+        self.tree = root.tree
+        self._root = root.index
+        self._current = root.index
+        self.entering = True
+
+    @property
+    def root(self):
+        return CompactNode(self.tree, self._root)
+
+    @property
+    def current(self):
+        if self._current < 0:
+            return None
+        return CompactNode(self.tree, self._current)
+
+    def __next__(self):
+        cur = self._current
+        entering = self.entering
+
+        if cur < 0:
+            raise StopIteration
+
+        tree = self.tree
+        if entering and tree.types[cur] in tree.container_codes:
+            first_child = tree.first_children[cur]
+            if first_child >= 0:
+                self._current = first_child
+            else:
+                # stay on node but exit
+                self.entering = False
+        elif cur == self._root:
+            self._current = -1
+        elif tree.nexts[cur] < 0:
+            self._current = tree.parents[cur]
+            self.entering = False
+        else:
+            self._current = tree.nexts[cur]
+            self.entering = True
+
+        return CompactNode(tree, cur), entering
+
+    next = __next__
+
+    def resume_at(self, node, entering):
+        self._current = node.index
+        self.entering = (entering is True)
+
+
+def parse(text, options=None):
+    """Parse ``text`` straight into a :class:`CompactTree`.
+
+    Inlines are parsed one top-level block at a time and each block's
+    ``Node`` objects are freed as soon as the block has been copied, so
+    the full object tree never exists at once.
+    """
+    parser = Parser(options or {})
+    doc = parser.parse_blocks(text)
+    tree = CompactTree()
+    root = tree._append_one(doc, -1)
+    block = doc.first_child
+    while block is not None:
+        nxt = block.nxt
+        parser.process_inlines(block)
+        tree.append(block, root)
+        block.dispose()
+        block = nxt
+    tree._finish()
+    return tree
@@ -1,7 +1,6 @@
 from __future__ import absolute_import, unicode_literals
 
 from builtins import str
-import json
 from commonmark.node import is_container
 
 
@@ -49,6 +48,7 @@ def prepare(obj, topnode=False):
 
 def dumpJSON(obj):
     """Output AST in JSON form, this is destructive of block."""
+    import json
     prepared = prepare(obj)
     return json.dumps(prepared, indent=4, sort_keys=True)
 
@@ -0,0 +1,22 @@
+"""Exceptions raised by commonmark."""
+from __future__ import absolute_import, unicode_literals
+
+
+class CommonMarkError(Exception):
+    """Base class of the exceptions raised by commonmark."""
+
+
+class DeadlineExceeded(CommonMarkError):
+    """Parsing or rendering ran past its ``deadline``."""
+
+
+class LimitExceeded(CommonMarkError):
+    """The input went over one of the resource limits set in the options
+    (``max_nodes``, ``max_depth``, ``max_inline_depth`` or ``max_output``)
+    with ``on_limit`` set to ``'raise'``."""
+
+    def __init__(self, limit, maximum):
+        super(LimitExceeded, self).__init__(
+            '{} ({}) exceeded'.format(limit, maximum))
+        self.limit = limit
+        self.maximum = maximum
@@ -0,0 +1,241 @@
+"""Previews: the HTML of the beginning of a document.
+
+:func:`preview` parses only as much of a text as the excerpt needs:
+lines are fed to the block parser until enough top-level blocks are
+closed, each closed block gets its inlines parsed as soon as it is
+closed, and the rest of the text is left alone unless the excerpt
+needs its definitions::
+
+    html = commonmark.preview(post, max_blocks=3, max_chars=300)
+
+Link reference definitions can come anywhere, often at the end.  When
+an excerpt uses a label that is not defined before it, the rest of the
+text goes through the block phase only (as :func:`commonmark.events`
+does), which collects every definition without parsing any inlines.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import re
+
+from commonmark.blocks import Parser
+from commonmark.common import CLOSETAG, OPENTAG, reLineEnding
+from commonmark.inlines import literal_text
+from commonmark.node import Node
+from commonmark.normalize_reference import normalize_reference
+from commonmark.render.html import HtmlRenderer
+
+# A bracketed text, which could be a reference label.
+reLabel = re.compile(r'\[((?:[^\\\[\]]|\\.){1,999})\]')
+# The name of a raw HTML opening or closing tag.
+reTag = re.compile(r'<(/?)([A-Za-z][A-Za-z0-9-]*)')
+# An opening or closing tag in an HTML block.
+reBlockTag = re.compile(OPENTAG + '|' + CLOSETAG, re.IGNORECASE)
+# Elements that have no closing tag.
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+    'meta', 'param', 'source', 'track', 'wbr'])
+
+
+def labels(block):
+    """Return the normalized texts in brackets in the paragraphs and
+    headings of ``block``, before their inlines are parsed."""
+    result = set()
+    walker = block.walker()
+    event = walker.nxt()
+    while event is not None:
+        node = event['node']
+        if event['entering'] and (node.t == 'paragraph' or
+                                  node.t == 'heading'):
+            for match in reLabel.finditer(node.string_content):
+                result.add(normalize_reference(match.group()))
+        event = walker.nxt()
+    return result
+
+
+def tag_pairs(block):
+    """Return a dict from each raw HTML closing tag in ``block`` to the
+    opening tag it closes."""
+    pairs = {}
+    opened = []
+    walker = block.walker()
+    event = walker.nxt()
+    while event is not None:
+        node = event['node']
+        match = reTag.match(node.literal or '') \
+            if node.t == 'html_inline' else None
+        if match is not None and not node.literal.endswith('/>'):
+            name = match.group(2).lower()
+            if not match.group(1):
+                opened.append((name, node))
+            else:
+                for i in range(len(opened) - 1, -1, -1):
+                    if opened[i][0] == name:
+                        pairs[node] = opened[i][1]
+                        del opened[i:]
+                        break
+        event = walker.nxt()
+    return pairs
+
+
+def truncate(block, length):
+    """Cut the text of ``block`` (as counted by literal_text) to
+    ``length`` characters, removing the nodes that come after the cut.
+    Raw HTML is kept whole or dropped, so that the result stays well
+    formed: from the first opening tag whose closing tag is cut off on,
+    all raw inline HTML is dropped."""
+    pairs = tag_pairs(block)
+    removed = []
+    html = []
+    walker = block.walker()
+    event = walker.nxt()
+    while event is not None:
+        node = event['node']
+        if event['entering']:
+            if length <= 0:
+                removed.append(node)
+            elif node.t == 'softbreak' or node.t == 'linebreak':
+                length -= 1
+            elif node.literal is not None:
+                if len(node.literal) > length and node.t in (
+                        'html_inline', 'html_block'):
+                    removed.append(node)
+                else:
+                    node.literal = node.literal[:length]
+                    if node.t == 'html_inline':
+                        html.append(node)
+                length -= len(node.literal)
+        event = walker.nxt()
+    cut = set(removed)
+    unclosed = set(opener for closer, opener in pairs.items()
+                   if closer in cut)
+    for i, node in enumerate(html):
+        if node in unclosed:
+            removed.extend(html[i:])
+            break
+    for node in removed:
+        node.unlink()
+
+
+def unclosed_tags(doc):
+    """Return the names of the elements the top-level HTML blocks of
+    ``doc`` leave open, innermost last.  Only blocks that end at a blank
+    line (types 6 and 7) can leave an element open."""
+    opened = []
+    block = doc.first_child
+    while block is not None:
+        if block.t == 'html_block' and block.html_block_type in (6, 7):
+            for match in reBlockTag.finditer(block.literal):
+                tag = match.group()
+                closing, name = reTag.match(tag).groups()
+                name = name.lower()
+                if closing:
+                    if name in opened:
+                        i = len(opened) - 1 - opened[::-1].index(name)
+                        del opened[i:]
+                elif name not in VOID_ELEMENTS and not tag.endswith('/>'):
+                    opened.append(name)
+        block = block.nxt
+    return opened
+
+
+class Previewer(object):
+    """The state of one preview: the parser being fed the lines of
+    ``text``."""
+
+    def __init__(self, text, options=None):
+        if '\0' in text:
+            # replace NUL characters for security
+            text = text.replace('\0', '\uFFFD')
+        self.text = text
+        self.parser = Parser(options)
+        self.parser.reset()
+        self.parser.source = text
+        self.feed = self.lines()
+        # the offset in text of the first line not fed yet
+        self.read = 0
+
+    def lines(self):
+        """Feed the lines of the text to the parser, one per iteration."""
+        parser = self.parser
+        text = self.text
+        start = 0
+        for match in reLineEnding.finditer(text):
+            parser.incorporate_line(text[start:match.start()], start)
+            start = self.read = match.end()
+            yield
+        if not text or text[-1] != '\n':
+            parser.incorporate_line(text[start:], start)
+            self.read = len(text)
+            yield
+        while parser.tip:
+            parser.finalize(parser.tip, parser.line_number)
+        yield
+
+    def closed_blocks(self):
+        """Yield each top-level block once it is closed, with its
+        inlines parsed."""
+        doc = self.parser.doc
+        last = None
+        for _ in self.feed:
+            block = doc.first_child if last is None else last.nxt
+            while block is not None and not block.is_open:
+                self.resolve(block)
+                self.parser.process_inlines(block)
+                yield block
+                last = block
+                block = block.nxt
+
+    def resolve(self, block):
+        """If ``block`` uses labels that are not defined yet, run the
+        block phase over the rest of the text, which adds all of its
+        definitions to the parser's refmap."""
+        if labels(block).difference(self.parser.refmap):
+            for _ in self.feed:
+                pass
+
+
+def preview(text, max_blocks=None, max_chars=None, options=None):
+    """Return the HTML of the beginning of ``text``: its first
+    ``max_blocks`` top-level blocks, cut after ``max_chars`` characters
+    of text (not counting markup), whichever is shorter.
+
+    Parsing stops as soon as the excerpt is known, so the cost depends
+    on the excerpt rather than on the whole text.  A block cut short
+    keeps its markup, and the HTML is well formed: elements that HTML
+    blocks of the excerpt leave open are closed at its end.  ``options``
+    are those of :class:`commonmark.blocks.Parser` and
+    :class:`commonmark.render.html.HtmlRenderer`.
+    """
+    previewer = Previewer(text, options)
+    blocks = 0
+    chars = 0
+    last = None
+    cut = False
+    for block in previewer.closed_blocks():
+        last = block
+        blocks += 1
+        if max_chars is not None:
+            chars += len(literal_text(block))
+            if chars >= max_chars:
+                cut = chars > max_chars
+                truncate(block, len(literal_text(block)) -
+                         (chars - max_chars))
+                break
+        if max_blocks is not None and blocks >= max_blocks:
+            break
+    doc = previewer.parser.doc
+    if last is not None:
+        # drop the blocks after the excerpt, still open
+        while last.nxt is not None:
+            cut = True
+            last.nxt.unlink()
+        doc.sourcepos[1] = last.sourcepos[1]
+        if cut or previewer.text[previewer.read:].strip():
+            opened = unclosed_tags(doc)
+            if opened:
+                closing = Node('html_block', None)
+                closing.literal = ''.join(
+                    '</{}>'.format(name) for name in reversed(opened))
+                doc.append_child(closing)
+    previewer.parser.source = None
+    return HtmlRenderer(options).render(doc)
@@ -1,23 +1,14 @@
 from __future__ import absolute_import, unicode_literals, division
 
 import re
-import sys
 from commonmark import common
-from commonmark.common import normalize_uri, unescape_string
+from commonmark.common import (
+    DEADLINE_INTERVAL, HTMLunescape, check_deadline, normalize_uri,
+    unescape_string)
+from commonmark.exceptions import LimitExceeded
 from commonmark.node import Node
 from commonmark.normalize_reference import normalize_reference
 
-if sys.version_info >= (3, 0):
-    if sys.version_info >= (3, 4):
-        import html
-        HTMLunescape = html.unescape
-    else:
-        from .entitytrans import _unescape
-        HTMLunescape = _unescape
-else:
-    from commonmark import entitytrans
-    HTMLunescape = entitytrans._unescape
-
 # Some regexps used in inline parser:
 
 ESCAPED_CHAR = '\\\\' + common.ESCAPABLE
@@ -83,12 +74,57 @@ reLinkLabel = re.compile(r'^\[(?:[^\\\[\]]|\\.){0,1000}\]')
 reMain = re.compile(r'^[^\n`\[\]\\!<&*_\'"]+', re.MULTILINE)
 
 
+class Reference(object):
+    """A link reference definition, as stored in a refmap.
+
+    A refmap maps normalized labels to these records.  Item access
+    (``ref['destination']``) is kept for code written against the
+    old dict-of-dicts refmap.
+    """
+    __slots__ = ('label', 'destination', 'title')
+
+    def __init__(self, label, destination, title):
+        self.label = label
+        self.destination = destination
+        self.title = title
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self):
+        return 'Reference({!r}, {!r}, {!r})'.format(
+            self.label, self.destination, self.title)
+
+
 def text(s):
     node = Node('text', None)
     node.literal = s
     return node
 
 
+def literal_text(node):
+    """The text of the inlines in ``node``, without markup."""
+    parts = []
+    walker = node.walker()
+    event = walker.nxt()
+    while event is not None:
+        inline = event['node']
+        if inline.literal is not None:
+            parts.append(inline.literal)
+        elif inline.t == 'softbreak' or inline.t == 'linebreak':
+            parts.append('\n')
+        event = walker.nxt()
+    return ''.join(parts)
+
+
 def smart_dashes(chars):
     en_count = 0
     em_count = 0
@@ -118,19 +154,43 @@ class InlineParser(object):
     parsed) and a position in that subject.
     """
 
-    def __init__(self, options={}):
+    def __init__(self, options=None):
+        if options is None:
+            options = {}
         self.subject = ''
         self.brackets = None
         self.pos = 0
         self.refmap = {}
         self.options = options
+        # When set to a set, the normalized reference labels looked up
+        # and not found in refmap are added to it (see commonmark.stream).
+        self.missed_labels = None
+        # A monotonic() time (see Parser.parse), and the number of steps
+        # taken since the clock was last checked.
+        self.deadline = None
+        self.steps = 0
+        # The max_nodes and max_inline_depth limits and their policy, and
+        # the nodes counted so far (set by Parser.process_inlines).
+        self.max_nodes = None
+        self.max_inline_depth = None
+        self.node_count = 0
+        self.on_limit = 'raise'
+        # emphasis, link or image node -> the number of them it is made
+        # of, itself included (kept for max_inline_depth), and how many
+        # enclose the emphasis being made
+        self.heights = {}
+        self.enclosing = 0
 
     def match(self, regexString):
         """
         If regexString matches at current position in the subject, advance
         position in subject and return the match; otherwise return None.
+        regexString is a compiled pattern, or a string to compile.
         """
-        match = re.search(regexString, self.subject[self.pos:])
+        if not hasattr(regexString, 'search'):
+            # re.compile keeps the patterns it compiled in a cache
+            regexString = re.compile(regexString)
+        match = regexString.search(self.subject[self.pos:])
         if match is None:
             return None
         else:
@@ -219,6 +279,8 @@ class InlineParser(object):
             node.title = ''
             node.append_child(text(dest))
             block.append_child(node)
+            if self.max_nodes is not None:
+                self.count_child()
             return True
         else:
             m = self.match(reAutolink)
@@ -230,6 +292,8 @@ class InlineParser(object):
                 node.title = ''
                 node.append_child(text(dest))
                 block.append_child(node)
+                if self.max_nodes is not None:
+                    self.count_child()
                 return True
 
         return False
@@ -273,13 +337,12 @@ class InlineParser(object):
             c_after = '\n'
 
         # Python 2 doesn't recognize '\xa0' as whitespace
-        after_is_whitespace = re.search(reUnicodeWhitespaceChar, c_after) or \
+        after_is_whitespace = reUnicodeWhitespaceChar.search(c_after) or \
             c_after == '\xa0'
-        after_is_punctuation = re.search(rePunctuation, c_after)
-        before_is_whitespace = re.search(
-            reUnicodeWhitespaceChar, c_before) or \
+        after_is_punctuation = rePunctuation.search(c_after)
+        before_is_whitespace = reUnicodeWhitespaceChar.search(c_before) or \
             c_before == '\xa0'
-        before_is_punctuation = re.search(rePunctuation, c_before)
+        before_is_punctuation = rePunctuation.search(c_before)
 
         left_flanking = not after_is_whitespace and \
             (not after_is_punctuation or
@@ -353,6 +416,15 @@ class InlineParser(object):
     @staticmethod
     def removeDelimitersBetween(bottom, top):
         if bottom.get('next') != top:
+            # Also unlink the dropped entries from each other, so that
+            # the stack leaves no reference cycles (holding on to text
+            # nodes) behind for the garbage collector.
+            delim = bottom.get('next')
+            while delim is not None and delim is not top:
+                nxt = delim.get('next')
+                delim['previous'] = None
+                delim['next'] = None
+                delim = nxt
             bottom['next'] = top
             top['previous'] = bottom
 
@@ -365,6 +437,9 @@ class InlineParser(object):
         }
         odd_match = False
         use_delims = 0
+        deadline = self.deadline
+        limited = self.max_nodes is not None or \
+            self.max_inline_depth is not None
 
         # Find first closer above stack_bottom
         closer = self.delimiters
@@ -373,6 +448,8 @@ class InlineParser(object):
 
         # Move forward, looking for closers, and handling each
         while closer is not None:
+            if deadline is not None:
+                self.step()
             if not closer.get('can_close'):
                 closer = closer.get('next')
             else:
@@ -394,6 +471,15 @@ class InlineParser(object):
                         opener_found = True
                         break
                     opener = opener.get('previous')
+                    if deadline is not None:
+                        self.step()
+                if opener_found and limited and \
+                   (closercc == '*' or closercc == '_'):
+                    height = self.new_container(opener['node'].nxt,
+                                                closer['node'])
+                    if height is None:
+                        # keep the delimiters as text
+                        opener_found = False
                 old_closer = closer
 
                 if closercc == '*' or closercc == '_':
@@ -431,6 +517,8 @@ class InlineParser(object):
                             tmp = nxt
 
                         opener_inl.insert_after(emph)
+                        if limited:
+                            self.heights[emph] = height
 
                         # Remove elts between opener and closer in delimiters
                         # stack
@@ -645,11 +733,23 @@ class InlineParser(object):
 
             if reflabel:
                 # lookup rawlabel in refmap
-                link = self.refmap.get(normalize_reference(reflabel))
+                label = normalize_reference(reflabel)
+                link = self.refmap.get(label)
                 if link:
-                    dest = link['destination']
-                    title = link['title']
+                    dest = link.destination
+                    title = link.title
                     matched = True
+                elif label and self.missed_labels is not None:
+                    # a blank label can never be defined
+                    self.missed_labels.add(label)
+
+        height = None
+        if matched and (self.max_nodes is not None or
+                        self.max_inline_depth is not None):
+            height = self.new_container(opener.get('node').nxt)
+            if height is None:
+                # read the brackets as text
+                matched = False
 
         if matched:
             node = Node('image' if is_image else 'link', None)
@@ -663,7 +763,17 @@ class InlineParser(object):
                 node.append_child(tmp)
                 tmp = nxt
             block.append_child(node)
-            self.processEmphasis(opener.get('previousDelimiter'))
+            if height is None:
+                self.processEmphasis(opener.get('previousDelimiter'))
+            else:
+                # the emphasis in the link text is made after the link:
+                # count the link above it
+                self.enclosing = 1
+                try:
+                    self.processEmphasis(opener.get('previousDelimiter'))
+                finally:
+                    self.enclosing = 0
+                self.heights[node] = self.height(node.first_child)
             self.removeBracket()
             opener.get('node').unlink()
 
@@ -816,11 +926,8 @@ class InlineParser(object):
             self.pos = startpos
             return 0
 
-        if not refmap.get(normlabel):
-            refmap[normlabel] = {
-                'destination': dest,
-                'title': title
-            }
+        if normlabel not in refmap:
+            refmap[normlabel] = Reference(normlabel, dest, title)
         return (self.pos - startpos)
 
     def parseInline(self, block):
@@ -873,8 +980,80 @@ class InlineParser(object):
         self.pos = 0
         self.delimiters = None
         self.brackets = None
-        while (self.parseInline(block)):
-            pass
+        if self.deadline is None and self.max_nodes is None:
+            while (self.parseInline(block)):
+                pass
+        else:
+            while not self.nodes_spent(block) and self.parseInline(block):
+                if self.deadline is not None:
+                    self.step()
+                if self.max_nodes is not None:
+                    self.node_count += 1
         self.processEmphasis(None)
+        if self.heights:
+            self.heights.clear()
+
+    def step(self):
+        """Count a step towards the next deadline check."""
+        self.steps += 1
+        if self.steps >= DEADLINE_INTERVAL:
+            self.steps = 0
+            check_deadline(self.deadline)
+
+    def nodes_spent(self, block):
+        """Return whether max_nodes is reached with subject left to
+        parse.  Parsing another token would go over it: LimitExceeded is
+        raised, or with on_limit 'text' the rest of the subject is added
+        to block as a single text node."""
+        if self.max_nodes is None or self.node_count < self.max_nodes or \
+           self.pos >= len(self.subject):
+            return False
+        if self.on_limit == 'raise':
+            raise LimitExceeded('max_nodes', self.max_nodes)
+        block.append_child(text(self.subject[self.pos:]))
+        self.pos = len(self.subject)
+        self.node_count += 1
+        return True
+
+    def count_child(self):
+        """Count the text node of an autolink, on top of the token
+        itself, against max_nodes.  With on_limit 'text' the autolink is
+        kept, one node over."""
+        self.node_count += 1
+        if self.on_limit == 'raise' and self.node_count >= self.max_nodes:
+            raise LimitExceeded('max_nodes', self.max_nodes)
+
+    def new_container(self, first, last=None):
+        """Count a new emphasis, link or image, made of the inlines from
+        first up to last (or the end), against max_nodes and
+        max_inline_depth.  Return its height (the number of them it is
+        made of, itself included), or None if it may not be created with
+        on_limit 'text'; LimitExceeded is raised with 'raise'."""
+        height = self.height(first, last)
+        if self.max_inline_depth is not None and \
+           height + self.enclosing > self.max_inline_depth:
+            return self.over_limit('max_inline_depth', self.max_inline_depth)
+        if self.max_nodes is not None:
+            if self.node_count >= self.max_nodes:
+                return self.over_limit('max_nodes', self.max_nodes)
+            self.node_count += 1
+        return height
+
+    def height(self, first, last=None):
+        """The height of a container of the inlines from first up to
+        last (or the end)."""
+        height = 1
+        node = first
+        while node is not None and node is not last:
+            below = self.heights.get(node)
+            if below is not None and below >= height:
+                height = below + 1
+            node = node.nxt
+        return height
+
+    def over_limit(self, limit, maximum):
+        if self.on_limit == 'raise':
+            raise LimitExceeded(limit, maximum)
+        return None
 
     parse = parseInlines
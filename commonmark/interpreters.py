@@ -0,0 +1,64 @@
+"""Rendering many documents in subinterpreters.
+
+:func:`render_many` works like :func:`commonmark.parallel.render_many`,
+but on Python 3.14 and later it runs the parser and renderer in a pool
+of subinterpreters (``concurrent.futures.InterpreterPoolExecutor``),
+each with its own GIL: the work runs on several cores without starting
+processes, and the texts and results cross between interpreters as
+tuples of UTF-8 ``bytes``.  On older interpreters, where subinterpreters
+have no public API, it falls back to the process pool of
+:mod:`commonmark.parallel`.  :data:`SUBINTERPRETERS` tells which is
+used.
+"""
+from __future__ import absolute_import, unicode_literals
+
+try:
+    from concurrent.futures import InterpreterPoolExecutor
+except ImportError:  # before Python 3.14
+    InterpreterPoolExecutor = None
+
+from commonmark import parallel
+from commonmark.main import text_renderer
+
+# Whether render_many() uses subinterpreters rather than processes.
+SUBINTERPRETERS = InterpreterPoolExecutor is not None
+
+
+def _render_chunk(texts):
+    # Runs in the worker; parallel._init_worker has set up its renderer.
+    return tuple(parallel._render_text(text.decode('utf-8')).encode('utf-8')
+                 for text in texts)
+
+
+def _executor(workers, format):
+    if not SUBINTERPRETERS:
+        return parallel._executor(workers, format)
+    # Fail in the caller, not in every worker.
+    text_renderer(format)
+    return InterpreterPoolExecutor(max_workers=workers,
+                                   initializer=parallel._init_worker,
+                                   initargs=(format,))
+
+
+def render_many(texts, workers=None, chunksize=None, format="html"):
+    """Render each text of ``texts`` in ``workers`` subinterpreters (or
+    processes, see :data:`SUBINTERPRETERS`) and return the results as a
+    list, in order.
+
+    ``workers`` defaults to one per CPU, ``chunksize`` as for
+    :func:`commonmark.parallel.render_many`, and ``format`` is
+    ``'html'``, ``'json'`` or ``'rst'``.
+    """
+    if format == "ast":
+        raise ValueError("format must be 'html', 'json' or 'rst'")
+    texts = [text.encode('utf-8') for text in texts]
+    workers = parallel._worker_count(workers)
+    results = []
+    with _executor(workers, format) as executor:
+        futures = [executor.submit(_render_chunk, tuple(chunk))
+                   for _, chunk in parallel._chunks(texts, workers,
+                                                    chunksize)]
+        for future in futures:
+            results.extend(result.decode('utf-8')
+                           for result in future.result())
+    return results
@@ -11,31 +11,176 @@
 
 from __future__ import absolute_import, unicode_literals
 
+import sys
+
 from commonmark.blocks import Parser
-from commonmark.dump import dumpAST, dumpJSON
+from commonmark.common import check_deadline
+from commonmark.options import LIMITS, Options, on_limit
+from commonmark.plain import is_plain, plain_html
 from commonmark.render.html import HtmlRenderer
-from commonmark.render.rst import ReStructuredTextRenderer
 
+# Imported on first access (see commonmark/__init__.py).
+_lazy_attrs = {
+    'dumpAST': 'commonmark.dump',
+    'dumpJSON': 'commonmark.dump',
+    'ReStructuredTextRenderer': 'commonmark.render.rst',
+}
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        try:
+            module_name = _lazy_attrs[name]
+        except KeyError:
+            raise AttributeError(
+                'module {!r} has no attribute {!r}'.format(__name__, name))
+        import importlib
+        value = getattr(importlib.import_module(module_name), name)
+        globals()[name] = value
+        return value
+else:
+    from commonmark import dump
+    from commonmark.render import rst
+    dumpAST, dumpJSON = dump.dumpAST, dump.dumpJSON
+    ReStructuredTextRenderer = rst.ReStructuredTextRenderer
 
-def commonmark(text, format="html"):
+
+def commonmark(text, format="html", deadline=None):
     """Render CommonMark into HTML, JSON or AST
     Optional keyword arguments:
     format:     'html' (default), 'json' or 'ast'
+    deadline:   a common.monotonic() time after which parsing and HTML
+                or RST rendering raise DeadlineExceeded
 
     >>> commonmark("*hello!*")
     '<p><em>hello</em></p>\\n'
     """
-    parser = Parser()
-    ast = parser.parse(text)
     if format not in ["html", "json", "ast", "rst"]:
         raise ValueError("format must be 'html', 'json' or 'ast'")
+    if deadline is not None:
+        check_deadline(deadline)
+    if format == "html" and is_plain(text):
+        # no Markdown syntax: write the paragraphs directly
+        return plain_html(text)
+    parser = Parser()
+    ast = parser.parse(text, deadline)
     if format == "html":
         renderer = HtmlRenderer()
-        return renderer.render(ast)
+        return renderer.render(ast, deadline)
     if format == "json":
+        from commonmark.dump import dumpJSON
         return dumpJSON(ast)
     if format == "ast":
+        from commonmark.dump import dumpAST
         return dumpAST(ast)
     if format == "rst":
+        from commonmark.render.rst import ReStructuredTextRenderer
         renderer = ReStructuredTextRenderer()
-        return renderer.render(ast)
+        return renderer.render(ast, deadline)
+
+
+def render_batch(texts, format="html"):
+    """Render each CommonMark text of the iterable ``texts`` and return
+    the results as a list, in order.
+
+    Gives the same results as calling :func:`commonmark` on each text,
+    with the same ``format`` values, but reuses one parser and one
+    renderer for the whole batch and releases each document tree as soon
+    as it has been rendered, which matters when the texts are small.
+
+    >>> render_batch(["*hello!*", "plain"])
+    ['<p><em>hello!</em></p>\\n', '<p>plain</p>\\n']
+    """
+    render_text = text_renderer(format)
+    return [render_text(text) for text in texts]
+
+
+def outline(text, options=None):
+    """Return the headings of ``text`` as a list of ``{'level': ...,
+    'text': ..., 'sourcepos': ...}`` dicts (see
+    :meth:`commonmark.blocks.Parser.parse_outline`).
+
+    >>> outline("# Hello *world*\\n\\ntext\\n")
+    [{'level': 1, 'text': 'Hello world', 'sourcepos': [[1, 1], [1, 15]]}]
+    """
+    return Parser(options).parse_outline(text)
+
+
+def text_renderer(format="html", options=None):
+    """Return a function that renders one CommonMark text in ``format``
+    (as for :func:`commonmark`), reusing one parser and one renderer for
+    every call made from the same thread."""
+    return Converter(options, format).convert
+
+
+class Converter(object):
+    """A parser and renderer configuration that threads can share.
+
+    ``options`` (a mapping, copied into an :class:`Options`) are given
+    to the parser and, for HTML, the renderer.  The parser and renderer
+    themselves keep per-document state, so each thread that uses the
+    converter gets its own pair, created on first use and reused for
+    every later call from that thread::
+
+        converter = Converter({'smart': True})
+        html = converter.convert(text)       # from any thread
+    """
+
+    def __init__(self, options=None, format="html"):
+        if format not in ["html", "json", "ast", "rst"]:
+            raise ValueError("format must be 'html', 'json' or 'ast'")
+        self.options = Options(options or {})
+        on_limit(self.options)
+        self.format = format
+        # The plain-text fast path writes what HtmlRenderer writes with
+        # the options that change the output of plain text unset.
+        # Limits are enforced by the parser and renderer only.
+        self.plain = format == "html" and not (
+            self.options.get('smart') or self.options.get('sourcepos') or
+            self.options.get('softbreak', '\n') != '\n' or
+            any(self.options.get(limit) is not None for limit in LIMITS))
+        import threading
+        self.local = threading.local()
+
+    def context(self):
+        """Return the ``(parser, render)`` pair of the calling thread."""
+        try:
+            return self.local.context
+        except AttributeError:
+            pass
+        if self.format == "html":
+            render = HtmlRenderer(self.options).render
+        elif self.format == "json":
+            from commonmark.dump import dumpJSON as render
+        elif self.format == "ast":
+            from commonmark.dump import dumpAST as render
+        else:
+            from commonmark.render.rst import ReStructuredTextRenderer
+            render = ReStructuredTextRenderer().render
+        context = self.local.context = (Parser(self.options), render)
+        return context
+
+    def parse(self, text, deadline=None):
+        """Parse ``text`` and return the document node."""
+        return self.context()[0].parse(text, deadline)
+
+    def render(self, ast, deadline=None):
+        """Render the document ``ast`` in the converter's format."""
+        render = self.context()[1]
+        if deadline is None or self.format in ("json", "ast"):
+            return render(ast)
+        return render(ast, deadline)
+
+    def convert(self, text, deadline=None):
+        """Parse and render ``text``; the tree is disposed of.
+
+        ``deadline`` is as for :meth:`commonmark.blocks.Parser.parse`.
+        """
+        if deadline is not None:
+            check_deadline(deadline)
+        if self.plain and is_plain(text):
+            return plain_html(text)
+        ast = self.parse(text, deadline)
+        try:
+            return self.render(ast, deadline)
+        finally:
+            ast.dispose()
@@ -2,6 +2,8 @@ from __future__ import unicode_literals
 
 import re
 
+from commonmark.common import reLineEnding
+
 
 reContainer = re.compile(
     r'(document|block_quote|list|item|paragraph|assertion|action|'
@@ -9,8 +11,39 @@ reContainer = re.compile(
     r'custom_inline|custom_block)')
 
 
+# node type -> whether it matches reContainer (threads racing to fill
+# it in store the same value)
+_container_types = {}
+
+
 def is_container(node):
-    return (re.search(reContainer, node.t) is not None)
+    try:
+        return _container_types[node.t]
+    except KeyError:
+        result = _container_types[node.t] = \
+            re.search(reContainer, node.t) is not None
+        return result
+
+
+def line_starts(doc):
+    """Return the offset of each line of ``doc``'s text (see
+    Node.source_span), or None if ``doc`` has no text."""
+    starts = getattr(doc, 'line_starts', None)
+    if starts is not None:
+        return starts
+    source = getattr(doc, 'source', None)
+    if source is not None:
+        starts = [0]
+        starts.extend(m.end() for m in reLineEnding.finditer(source))
+    else:
+        lines = getattr(doc, 'lines', None)
+        if lines is None:
+            return None
+        starts = [0]
+        for line in lines:
+            starts.append(starts[-1] + len(line) + 1)
+    doc.line_starts = starts
+    return starts
 
 
 class NodeWalker(object):
@@ -177,3 +210,74 @@ class Node(object):
 
     def walker(self):
         return NodeWalker(self)
+
+    def nodes_of_type(self, t):
+        """Return the nodes of type ``t`` under this node (itself
+        included), in document order.
+
+        When the tree was parsed with the ``type_index`` option the
+        answer comes straight from the index the parser built, which
+        describes the tree as it was parsed; otherwise the subtree is
+        walked.
+        """
+        index = getattr(self, 'type_index', None)
+        if index is not None:
+            return list(index.get(t, ()))
+        return [node for node, entering in self.walker()
+                if entering and node.t == t]
+
+    @property
+    def source_span(self):
+        """The ``(start, end)`` character offsets of this block in the
+        text of its document, or None for nodes without source positions
+        or outside a document.
+
+        The text is ``doc.source`` for documents from ``Parser.parse()``,
+        and the lines joined with ``'\\n'`` for documents built from a
+        list of lines (``parse_lines()``, ``reparse()``); documents only
+        keep them with the parser's ``incremental`` option.  The offsets
+        are worked out from ``sourcepos``, with a table of line starts
+        that the document keeps once it is first needed.
+        """
+        if not self.sourcepos or self.sourcepos[1][0] <= 0:
+            return None
+        doc = self
+        while doc.parent is not None:
+            doc = doc.parent
+        starts = line_starts(doc)
+        if starts is None:
+            return None
+        (start_line, start_column), (end_line, end_column) = self.sourcepos
+        return (starts[start_line - 1] + start_column - 1,
+                starts[end_line - 1] + end_column)
+
+    def dispose(self):
+        """Detach this node and break every link inside its subtree.
+
+        A parsed tree is one big reference cycle (children point at their
+        parents and siblings at each other), so normally only the cyclic
+        garbage collector can free it.  After ``dispose()`` the nodes are
+        freed by plain reference counting as soon as they are no longer
+        used.  The subtree must not be used afterwards.
+        """
+        self.unlink()
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            child = node.first_child
+            while child is not None:
+                stack.append(child)
+                child = child.nxt
+            node.parent = None
+            node.first_child = None
+            node.last_child = None
+            if getattr(node, 'type_index', None) is not None:
+                node.type_index = None
+            node.prv = None
+            node.nxt = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.dispose()
@@ -13,9 +13,17 @@
 
 import re
 import sys
+import unicodedata
 from builtins import str, chr
+from collections import OrderedDict
 
-__all__ = ["normalize_reference"]
+try:
+    # the low-level lock, which does not need the threading module
+    from _thread import allocate_lock
+except ImportError:
+    from thread import allocate_lock
+
+__all__ = ["normalize_reference", "ReferenceMemo", "reference_memo"]
 
 if sys.version_info < (3,) and sys.maxunicode <= 0xffff:
     # shim for Python 2.x UCS2 build
@@ -60,7 +68,9 @@ def _parse_table(tbl):
     return xlat
 
 
-XLAT = _parse_table(
+# Packed table; it is only unpacked (by _get_xlat) if the interpreter's
+# own str.casefold turns out to be older than it.
+_XLAT_TABLE = (
     # ===== Start of Unicode Case Folding table =====
     '1t:p:-w;37:-kn;a:m:kn;n:6:;6:3w,37;w:1a:-31:2;1b:5k,lj;1:4:-5k:2;6:e::'
     '2;f:-aa,32;:18:aa:2;19:3e;:4:-3e:2;5:7h;1:-da;:2:5t:2;3:-5p;:5p;1:1:-5'
@@ -91,6 +101,37 @@ XLAT = _parse_table(
 )
 
 
+_XLAT = None
+
+
+def _get_xlat():
+    """Unpack the case folding table on first use."""
+    global _XLAT
+    if _XLAT is None:
+        _XLAT = _parse_table(_XLAT_TABLE)
+    return _XLAT
+
+
+def __getattr__(name):
+    # Keep ``normalize_reference.XLAT`` working now that the table is
+    # built lazily (module __getattr__ needs Python 3.7+).
+    if name == 'XLAT':
+        return _get_xlat()
+    raise AttributeError(
+        'module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def _native_is_current():
+    """
+    Cheap check that Python's own case folding is at least as recent as
+    the supplied table, without unpacking the table.
+    """
+    if not hasattr(str, 'casefold'):
+        return False
+    version = tuple(int(x) for x in unicodedata.unidata_version.split('.'))
+    return version >= (12, 0, 0)
+
+
 def _check_native(tbl):
     """
     Determine if Python's own native implementation
@@ -106,25 +147,24 @@ def _check_native(tbl):
     return True
 
 
-# Hoist version check out of function for performance
 SPACE_RE = re.compile(r'[ \t\r\n]+')
-if _check_native(XLAT):
-    def normalize_reference(string):
-        """
-        Normalize reference label: collapse internal whitespace
-        to single space, remove leading/trailing whitespace, case fold.
-        """
-        return SPACE_RE.sub(' ', string[1:-1].strip()).casefold()
-elif sys.version_info >= (3,) or sys.maxunicode > 0xffff:
-    def normalize_reference(string):
-        """
-        Normalize reference label: collapse internal whitespace
-        to single space, remove leading/trailing whitespace, case fold.
-        """
-        return SPACE_RE.sub(' ', string[1:-1].strip()).translate(XLAT)
-else:
+
+
+def _make_normalizer():
+    """Pick the fastest label normalizer this interpreter supports."""
+    if _native_is_current() or _check_native(_get_xlat()):
+        def normalize(string):
+            return SPACE_RE.sub(' ', string[1:-1].strip()).casefold()
+        return normalize
+
+    xlat = _get_xlat()
+    if sys.version_info >= (3,) or sys.maxunicode > 0xffff:
+        def normalize(string):
+            return SPACE_RE.sub(' ', string[1:-1].strip()).translate(xlat)
+        return normalize
+
     def _get_smp_regex():
-        xls = sorted(x - 0x10000 for x in XLAT if x >= 0x10000)
+        xls = sorted(x - 0x10000 for x in xlat if x >= 0x10000)
         xls.append(-1)
         fmt, (dsh, opn, pip, cse) = str('\\u%04x'), str('-[|]')
         rga, srk, erk = [str(r'[ \t\r\n]+')], 0, -2
@@ -153,13 +193,92 @@ else:
         hiv = ord(src[0])
         if hiv < 0xd800:
             return ' '
-        return XLAT[0x10000 + ((hiv & 0x3ff) << 10) | (ord(src[1]) & 0x3ff)]
+        return xlat[0x10000 + ((hiv & 0x3ff) << 10) | (ord(src[1]) & 0x3ff)]
+
+    smp_re = _get_smp_regex()
 
-    SMP_RE = _get_smp_regex()
+    def normalize(string):
+        return smp_re.sub(_subst_handler, string[1:-1].strip()).translate(xlat)
+    return normalize
 
-    def normalize_reference(string):
-        """
-        Normalize reference label: collapse internal whitespace
-        to single space, remove leading/trailing whitespace, case fold.
-        """
-        return SMP_RE.sub(_subst_handler, string[1:-1].strip()).translate(XLAT)
+
+def _normalize_reference(string):
+    # Replaced by the real normalizer the first time a label is seen.
+    # Threads racing here all build the same normalizer, so no lock.
+    global _normalize_reference
+    _normalize_reference = _make_normalizer()
+    return _normalize_reference(string)
+
+
+class ReferenceMemo(object):
+    """Bounded LRU memo of normalized reference labels.
+
+    The same few labels are normalized over and over: once for every
+    definition and once for every closing bracket that might be a
+    reference.  A memo is not tied to a document, so one instance can
+    be shared by every parser in the process, from any thread: the
+    cache and counters are only touched under a lock, and labels are
+    normalized outside it.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = allocate_lock()
+
+    def __call__(self, label):
+        cache = self._cache
+        with self._lock:
+            try:
+                normalized = cache.pop(label)
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                # reinserting moves the label to the most recently used end
+                cache[label] = normalized
+                return normalized
+        normalized = _normalize_reference(label)
+        if self.maxsize <= 0:
+            return normalized
+        with self._lock:
+            # another thread may have added it meanwhile
+            if label not in cache:
+                while len(cache) >= self.maxsize:
+                    cache.popitem(last=False)
+                cache[label] = normalized
+        return normalized
+
+    def __len__(self):
+        return len(self._cache)
+
+    def stats(self):
+        """Return a dict with the hit/miss counters and current size."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._cache),
+                'maxsize': self.maxsize,
+            }
+
+    def clear(self):
+        """Forget all memoized labels and reset the counters."""
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared by every parser in the process.
+reference_memo = ReferenceMemo()
+
+
+def normalize_reference(string):
+    """
+    Normalize reference label: collapse internal whitespace
+    to single space, remove leading/trailing whitespace, case fold.
+    """
+    return reference_memo(string)
@@ -0,0 +1,90 @@
+"""Immutable parser and renderer options.
+
+``Parser`` and ``HtmlRenderer`` take their options as a mapping and
+only read it.  :class:`Options` is a read-only, hashable mapping, so
+one configuration can be shared by any number of parsers, renderers
+and threads::
+
+    options = commonmark.Options(smart=True, safe=True)
+    converter = commonmark.Converter(options)
+
+The options understood are ``smart``, ``sourcepos``, ``safe``,
+``softbreak``, ``type_index`` and ``incremental`` (parsed documents
+keep their text and reference definitions, for ``Parser.reparse()``
+and ``Node.source_span``), and the resource limits below; others are
+kept and ignored.
+
+Limits, for untrusted input (unset by default):
+
+* ``max_nodes`` -- the number of blocks, inline tokens (each text run,
+  code span, delimiter run, ...) and emphasis, link and image nodes the
+  parser creates;
+* ``max_depth`` -- the number of containers (block quotes, lists and
+  list items) a block may be nested in;
+* ``max_inline_depth`` -- the number of emphasis, link and image nodes
+  an inline may be nested in;
+* ``max_output`` -- the number of characters a renderer produces.
+
+``on_limit`` says what happens when one is reached: ``'raise'`` (the
+default) raises :class:`commonmark.exceptions.LimitExceeded`; with
+``'text'`` the input beyond the limit is kept as text.  Limits are
+enforced as nodes are created: past ``max_nodes`` no block is opened,
+the rest of the line and the rest of the document become paragraphs of
+text, and the rest of each inline subject one text node, so the tree
+has at most ``2 * max_nodes + 4`` nodes besides the document (the
+blocks pass ``max_nodes`` by two at most, the inline tokens by one, and
+each paragraph or heading adds at most one text node for its rest);
+block quotes and lists past ``max_depth`` are not
+recognized; emphasis, links and images past ``max_inline_depth`` are
+not made, and their delimiters and brackets stay text; and the output
+stops after the last top-level block that fits in ``max_output``.
+"""
+from __future__ import absolute_import, unicode_literals
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
+
+
+# The options that set a resource limit.
+LIMITS = ('max_nodes', 'max_depth', 'max_inline_depth', 'max_output')
+ON_LIMIT = ('raise', 'text')
+
+
+def on_limit(options):
+    """Return the ``on_limit`` policy of ``options``, checking it."""
+    policy = options.get('on_limit', 'raise')
+    if policy not in ON_LIMIT:
+        raise ValueError("on_limit must be 'raise' or 'text', not "
+                         "{!r}".format(policy))
+    return policy
+
+
+class Options(Mapping):
+    """A read-only mapping of options, built like a dict."""
+    __slots__ = ('_options',)
+
+    def __init__(self, *args, **kwargs):
+        object.__setattr__(self, '_options', dict(*args, **kwargs))
+
+    def __getitem__(self, key):
+        return self._options[key]
+
+    def __iter__(self):
+        return iter(self._options)
+
+    def __len__(self):
+        return len(self._options)
+
+    def __hash__(self):
+        return hash(frozenset(self._options.items()))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Options are read-only')
+
+    def __reduce__(self):
+        return (Options, (self._options,))
+
+    def __repr__(self):
+        return 'Options({!r})'.format(self._options)
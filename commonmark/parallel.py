@@ -0,0 +1,228 @@
+"""Rendering many documents in worker processes.
+
+:func:`render_many` renders a list of texts on a
+``concurrent.futures.ProcessPoolExecutor`` and returns the results in
+order; :func:`render_unordered` yields ``(index, result)`` pairs as
+soon as they are ready::
+
+    pages = commonmark.parallel.render_many(sources, workers=32)
+
+Each worker builds one parser and one renderer when it starts (see
+:func:`commonmark.main.text_renderer`) and reuses them for every text
+it is sent.  Texts are sent in chunks of ``chunksize`` so that small
+documents share the cost of a round trip; by default each worker gets
+about four chunks.
+
+For large outputs, :func:`render_shared` has the workers write the
+UTF-8 results into shared memory instead of pickling them back, and
+returns a :class:`SharedResults` of ``memoryview`` objects over them::
+
+    with commonmark.parallel.render_shared(sources) as pages:
+        for path, page in zip(paths, pages):
+            with open(path, 'wb') as f:
+                f.write(page)
+
+Needs Python 3.7 or later (for the executor's ``initializer``).  As with
+any process pool, on platforms that start workers with ``spawn`` the
+calling script must be importable, i.e. guard it with
+``if __name__ == '__main__':``.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import sys
+
+try:
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+except ImportError:  # Python 2
+    ProcessPoolExecutor = None
+
+from commonmark.main import text_renderer
+
+# The render function of this worker process, set by _init_worker().
+_render_text = None
+
+
+def _init_worker(format):
+    global _render_text
+    _render_text = text_renderer(format)
+    # Load what is only imported or built on first use (the entity
+    # table, the lazily imported renderers) before real work arrives.
+    _render_text('*warm* &amp; [up](/u)')
+
+
+def _render_chunk(texts):
+    return [_render_text(text) for text in texts]
+
+
+def _render_chunk_shared(texts):
+    from multiprocessing import shared_memory
+    results = [_render_text(text).encode('utf-8') for text in texts]
+    segment = shared_memory.SharedMemory(
+        create=True, size=max(sum(map(len, results)), 1))
+    try:
+        spans = []
+        offset = 0
+        for result in results:
+            segment.buf[offset:offset + len(result)] = result
+            spans.append((offset, len(result)))
+            offset += len(result)
+    except BaseException:
+        segment.close()
+        segment.unlink()
+        raise
+    segment.close()
+    return segment.name, spans
+
+
+def _chunks(texts, workers, chunksize):
+    if chunksize is None:
+        chunksize, extra = divmod(len(texts), workers * 4)
+        if extra:
+            chunksize += 1
+    chunksize = max(chunksize, 1)
+    for start in range(0, len(texts), chunksize):
+        yield start, texts[start:start + chunksize]
+
+
+def _executor(workers, format):
+    if sys.version_info < (3, 7):
+        raise RuntimeError('commonmark.parallel needs Python 3.7 or later')
+    # Fail in the caller, not in every worker.
+    text_renderer(format)
+    return ProcessPoolExecutor(max_workers=workers,
+                               initializer=_init_worker,
+                               initargs=(format,))
+
+
+def _worker_count(workers):
+    if workers is None:
+        import os
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def render_many(texts, workers=None, chunksize=None, format="html"):
+    """Render each text of ``texts`` in ``workers`` processes (default:
+    one per CPU) and return the results as a list, in order.
+
+    The results are those of :func:`commonmark.commonmark` with the same
+    ``format``.
+    """
+    texts = list(texts)
+    workers = _worker_count(workers)
+    results = []
+    with _executor(workers, format) as executor:
+        futures = [executor.submit(_render_chunk, chunk)
+                   for _, chunk in _chunks(texts, workers, chunksize)]
+        for future in futures:
+            results.extend(future.result())
+    return results
+
+
+def render_unordered(texts, workers=None, chunksize=None, format="html"):
+    """Like :func:`render_many`, but yield ``(index, result)`` pairs, where
+    ``index`` is the position of the text in ``texts``, chunk by chunk in
+    the order the chunks are finished."""
+    texts = list(texts)
+    workers = _worker_count(workers)
+    with _executor(workers, format) as executor:
+        starts = {}
+        for start, chunk in _chunks(texts, workers, chunksize):
+            starts[executor.submit(_render_chunk, chunk)] = start
+        for future in as_completed(starts):
+            for index, result in enumerate(future.result(), starts[future]):
+                yield index, result
+
+
+class SharedResults(object):
+    """The results of :func:`render_shared`: a sequence of read-only
+    ``memoryview`` objects of UTF-8 bytes, one per text, in order.
+
+    The views point into shared memory segments owned by this object.
+    They are valid until :meth:`close` (or the end of a ``with`` block),
+    which removes the segments; keep a copy (``bytes(view)``) of
+    anything needed longer, and drop other references to the views
+    first.
+    """
+
+    def __init__(self):
+        self.segments = []
+        self.views = []
+
+    def attach(self, name, spans):
+        """Take ownership of the segment ``name`` and append a view for
+        each ``(offset, length)`` of ``spans``."""
+        from multiprocessing import shared_memory
+        segment = shared_memory.SharedMemory(name=name)
+        self.segments.append(segment)
+        buf = segment.buf.toreadonly()
+        self.views.extend(buf[offset:offset + length]
+                          for offset, length in spans)
+        buf.release()
+
+    def close(self):
+        """Release the views and remove the shared memory segments."""
+        segments, self.segments = self.segments, []
+        views, self.views = self.views, []
+        # Unlink first: the segments are removed even if a view is still
+        # in use and closing its mapping fails.
+        for segment in segments:
+            segment.unlink()
+        for view in views:
+            view.release()
+        for segment in segments:
+            segment.close()
+
+    def __len__(self):
+        return len(self.views)
+
+    def __getitem__(self, index):
+        return self.views[index]
+
+    def __iter__(self):
+        return iter(self.views)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def render_shared(texts, workers=None, chunksize=None, format="html"):
+    """Render ``texts`` like :func:`render_many` (``format`` is
+    ``'html'``, ``'json'`` or ``'rst'``), but have the workers write the
+    UTF-8 encoded results into shared memory, one segment per chunk,
+    and return them as a :class:`SharedResults` (Python 3.8+)."""
+    if sys.version_info < (3, 8):
+        raise RuntimeError('render_shared() needs Python 3.8 or later')
+    if format == "ast":
+        raise ValueError("format must be 'html', 'json' or 'rst'")
+    texts = list(texts)
+    workers = _worker_count(workers)
+    # Start the resource tracker here, so that the workers share it
+    # instead of each starting one that removes their segments when
+    # they exit.
+    from multiprocessing import resource_tracker
+    resource_tracker.ensure_running()
+    results = SharedResults()
+    try:
+        with _executor(workers, format) as executor:
+            futures = [executor.submit(_render_chunk_shared, chunk)
+                       for _, chunk in _chunks(texts, workers, chunksize)]
+            # Collect every segment that was created, even after a
+            # failure, so that none is left behind.
+            error = None
+            for future in futures:
+                try:
+                    name, spans = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                results.attach(name, spans)
+        if error is not None:
+            raise error
+    except BaseException:
+        results.close()
+        raise
+    return results
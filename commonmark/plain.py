@@ -0,0 +1,76 @@
+"""Fast path for input without any Markdown syntax.
+
+Chat messages and short comments are often plain text: lines of words
+separated by blank lines.  Such input needs neither the block parser
+nor, for HTML output, the inline parser or a tree, since it always
+becomes one paragraph per run of non-empty lines.  One regex search
+decides whether a text qualifies:
+
+* :func:`is_plain_blocks` -- no line can start a block (it does not
+  start with a space, a tab, ``[`` or a character that can begin a
+  block marker); the block phase then reduces to grouping lines into
+  paragraphs (see ``Parser.parse_blocks``).
+* :func:`is_plain` -- in addition, nothing in the text has an inline
+  meaning and no line ends with a space (which would be a hard or soft
+  break trimming its spaces), so :func:`plain_html` can write the HTML
+  directly.
+
+Both checks are conservative: text that fails them is simply parsed the
+normal way.  The output is identical either way.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import re
+
+from commonmark.common import escape_xml, reLineEnding
+
+# A character at the start of a line that may begin a block or an
+# indented line (the characters tried by the block parser, plus '[' for
+# link reference definitions), and NUL, which the parser replaces.
+BLOCK_SYNTAX = r'(?:^|(?<=[\n\r]))[ \t#`~*+_=<>0-9\[-]|\x00'
+reNotPlainBlocks = re.compile(BLOCK_SYNTAX)
+# ... or a character with an inline meaning, or a space before a line
+# break.
+reNotPlain = re.compile(BLOCK_SYNTAX + r'|[`*_\[\]\\<&]| (?=[\n\r])')
+
+
+def is_plain_blocks(text):
+    """Return whether every line of ``text`` is paragraph text or
+    empty, so that the block structure is just paragraphs."""
+    return reNotPlainBlocks.search(text) is None
+
+
+def is_plain(text):
+    """Return whether ``text`` contains no Markdown syntax at all."""
+    return reNotPlain.search(text) is None
+
+
+def split_lines(text):
+    """Split ``text`` into lines the way Parser.parse_blocks does."""
+    lines = reLineEnding.split(text)
+    if text and text[-1] == '\n':
+        lines.pop()
+    return lines
+
+
+def iter_paragraphs(lines):
+    """Yield ``(first line number, lines)`` for each paragraph, given
+    the lines of a text that passes :func:`is_plain_blocks`."""
+    paragraph = []
+    for number, line in enumerate(lines, 1):
+        if line:
+            if not paragraph:
+                first = number
+            paragraph.append(line)
+        elif paragraph:
+            yield first, paragraph
+            paragraph = []
+    if paragraph:
+        yield first, paragraph
+
+
+def plain_html(text):
+    """Return the HTML for ``text``, which must pass :func:`is_plain`,
+    as ``HtmlRenderer`` with default options would render it."""
+    return ''.join(['<p>' + escape_xml('\n'.join(lines).strip()) + '</p>\n'
+                    for _, lines in iter_paragraphs(split_lines(text))])
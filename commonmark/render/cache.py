@@ -0,0 +1,179 @@
+"""Cache of rendered top-level blocks.
+
+Between two builds of a large document most top-level blocks are
+unchanged.  A :class:`FragmentCache` keys the output of each top-level
+block by a hash of the block's structure and content plus the renderer
+and its options, so only the blocks that changed are rendered again::
+
+    cache = FragmentCache()
+    html = cache.render(doc, HtmlRenderer())
+    cache.stats()   # {'hits': ..., 'misses': ..., ...}
+
+The cache can be saved with :meth:`FragmentCache.dump` and read back in
+the next build with :meth:`FragmentCache.load`.  It relies on the
+renderer rendering each top-level block independently, as
+:class:`commonmark.render.html.HtmlRenderer` does.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import hashlib
+import threading
+from builtins import str
+from collections import OrderedDict
+
+# Node attributes that can change the output of a renderer.
+KEY_ATTRIBUTES = ('t', 'literal', 'destination', 'title', 'info', 'level',
+                  'on_enter', 'on_exit')
+
+
+def renderer_key(renderer):
+    """Return a string identifying ``renderer``'s class and options."""
+    cls = type(renderer)
+    options = getattr(renderer, 'options', {})
+    return '{}.{}{!r}'.format(cls.__module__, cls.__name__,
+                              sorted(options.items()))
+
+
+def block_key(block, salt='', sourcepos=False):
+    """Return a structural hash of the subtree rooted at ``block``.
+
+    ``salt`` (normally :func:`renderer_key`) is mixed in.  Source
+    positions are only hashed if ``sourcepos`` is set, for renderers
+    that output them.
+    """
+    parts = [salt]
+    for node, entering in block.walker():
+        if not entering:
+            parts.append(')')
+            continue
+        parts.append('(')
+        for name in KEY_ATTRIBUTES:
+            value = getattr(node, name, None)
+            value = '' if value is None else '{}'.format(value)
+            parts.append('{}:{}'.format(len(value), value))
+        if node.list_data:
+            parts.append(repr(sorted(node.list_data.items())))
+        if sourcepos:
+            parts.append(repr(node.sourcepos))
+    data = '\x00'.join(parts).encode('utf-8')
+    return hashlib.sha1(data).hexdigest()
+
+
+def _has_sourcepos(renderer):
+    return bool(getattr(renderer, 'options', {}).get('sourcepos'))
+
+
+class FragmentCache(object):
+    """Bounded LRU cache of rendered top-level blocks.
+
+    At most ``max_entries`` fragments, and if ``max_bytes`` is given at
+    most that many characters of HTML in total, are kept; the least
+    recently used fragments are dropped first.  One cache can be used
+    from several threads; blocks are rendered outside its lock.
+    """
+
+    def __init__(self, max_entries=4096, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._cache = OrderedDict()
+        self._lock = threading.RLock()
+
+    def key(self, block, renderer):
+        """Return the cache key of ``block`` rendered by ``renderer``."""
+        return block_key(block, renderer_key(renderer),
+                         _has_sourcepos(renderer))
+
+    def get(self, key):
+        """Return the fragment stored under ``key``, or None."""
+        with self._lock:
+            try:
+                html = self._cache.pop(key)
+            except KeyError:
+                return None
+            self._cache[key] = html
+            return html
+
+    def put(self, key, html):
+        """Store the fragment ``html`` under ``key``."""
+        with self._lock:
+            old = self._cache.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            if self.max_entries <= 0 or \
+               (self.max_bytes is not None and len(html) > self.max_bytes):
+                return
+            self._cache[key] = html
+            self.bytes += len(html)
+            while len(self._cache) > self.max_entries or \
+                    (self.max_bytes is not None and
+                     self.bytes > self.max_bytes):
+                _, dropped = self._cache.popitem(last=False)
+                self.bytes -= len(dropped)
+
+    def render(self, doc, renderer):
+        """Render ``doc`` with ``renderer``, one top-level block at a
+        time, reusing the cached fragments of unchanged blocks."""
+        salt = renderer_key(renderer)
+        sourcepos = _has_sourcepos(renderer)
+        fragments = []
+        block = doc.first_child
+        while block is not None:
+            key = block_key(block, salt, sourcepos)
+            with self._lock:
+                html = self.get(key)
+                if html is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            if html is None:
+                html = renderer.render(block)
+                self.put(key, html)
+            fragments.append(html)
+            block = block.nxt
+        return ''.join(fragments)
+
+    def __len__(self):
+        return len(self._cache)
+
+    def stats(self):
+        """Return a dict with the hit/miss counters and current size."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._cache),
+                'bytes': self.bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+            }
+
+    def clear(self):
+        """Forget all fragments and reset the counters."""
+        with self._lock:
+            self._cache.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def dump(self, fp):
+        """Write the fragments to the text file ``fp`` as JSON, least
+        recently used first."""
+        import json
+        with self._lock:
+            fragments = list(self._cache.items())
+        # json.dumps gives a native (byte) string on Python 2, which
+        # text files do not accept
+        fp.write(str(json.dumps({'version': 1, 'fragments': fragments})))
+
+    def load(self, fp):
+        """Add the fragments from a file written by :meth:`dump`."""
+        import json
+        data = json.load(fp)
+        if data.get('version') != 1:
+            raise ValueError('unknown fragment cache version {!r}'.format(
+                data.get('version')))
+        for key, html in data['fragments']:
+            self.put(key, html)
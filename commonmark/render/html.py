@@ -19,7 +19,9 @@ def potentially_unsafe(url):
 
 
 class HtmlRenderer(Renderer):
-    def __init__(self, options={}):
+    def __init__(self, options=None):
+        # a copy: the caller's options are never modified
+        options = dict(options or {})
         #  by default, soft breaks are rendered as newlines in HTML
         options['softbreak'] = options.get('softbreak') or '\n'
         # set to "<br />" to make them hard breaks
@@ -0,0 +1,85 @@
+"""HTML output for documents that are still being written.
+
+A :class:`ProgressiveHtmlRenderer` follows a
+:class:`commonmark.stream.StreamParser` and splits the HTML of each
+snapshot in two: a chunk of new *final* output, for top-level blocks
+that are closed and can no longer change, and a *provisional* tail for
+the rest.  Clients append the final chunks and replace the tail::
+
+    renderer = ProgressiveHtmlRenderer()
+    final_html = ''
+    for chunk in chunks:
+        stream.append(chunk)
+        final, provisional = renderer.render_progress(stream)
+        final_html += final
+        show(final_html + provisional)
+
+Each top-level block is rendered on its own (the HTML renderer emits
+top-level blocks independently, so the pieces add up to the full
+output), and final blocks are rendered only once.  Closed blocks held
+back by undefined reference labels are only rendered again when new
+definitions arrive; blank labels like ``[ ]`` never hold a block back,
+and ``StreamParser(hold_blocks=n)`` bounds how long other labels do.
+"""
+from __future__ import absolute_import, unicode_literals
+
+from commonmark.render.html import HtmlRenderer
+
+
+class ProgressiveHtmlRenderer(HtmlRenderer):
+    """An :class:`commonmark.render.html.HtmlRenderer` that reports
+    which prefix of its output is final."""
+
+    def __init__(self, options=None):
+        super(ProgressiveHtmlRenderer, self).__init__(options)
+        self.reset()
+
+    def reset(self):
+        """Forget the output so far, to follow a new stream."""
+        self._stream = None
+        # The last top-level block whose HTML was reported as final.
+        self._last_final = None
+        # Closed blocks that are not final yet only change when the
+        # reference definitions do: block -> (refmap size, html).
+        self._held = {}
+
+    def render_progress(self, stream):
+        """Render the current snapshot of ``stream``.
+
+        Returns ``(final, provisional)``: the HTML of the blocks that
+        became final since the previous call, and the HTML of everything
+        after them.  A block that is pending (see
+        :meth:`commonmark.stream.StreamParser.is_stable`) stays
+        provisional, and so does everything after it, since a later
+        definition can still turn its brackets into a link.
+        """
+        if stream is not self._stream:
+            self.reset()
+            self._stream = stream
+        doc = stream.document()
+        if self._last_final is None:
+            block = doc.first_child
+        else:
+            block = self._last_final.nxt
+
+        final = []
+        while block is not None and stream.is_stable(block):
+            final.append(self.render(block))
+            self._last_final = block
+            block = block.nxt
+
+        provisional = []
+        held = {}
+        refs = len(stream.parser.refmap)
+        while block is not None:
+            if stream.is_closed(block):
+                size, html = self._held.get(block, (None, None))
+                if size != refs:
+                    html = self.render(block)
+                held[block] = (refs, html)
+            else:
+                html = self.render(block)
+            provisional.append(html)
+            block = block.nxt
+        self._held = held
+        return ''.join(final), ''.join(provisional)
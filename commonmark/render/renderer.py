@@ -1,22 +1,62 @@
 from __future__ import unicode_literals
 
+from commonmark.common import DEADLINE_INTERVAL, check_deadline
+from commonmark.exceptions import LimitExceeded
+from commonmark.options import on_limit
+
 
 class Renderer(object):
-    def render(self, ast):
+    def render(self, ast, deadline=None):
         """Walks the AST and calls member methods for each Node type.
 
         @param ast {Node} The root of the abstract syntax tree.
+        @param deadline {float} Optional common.monotonic() time; the
+            clock is checked every DEADLINE_INTERVAL nodes and
+            DeadlineExceeded raised once it has passed.
+
+        The ``max_output`` option, if the renderer has options, limits
+        the output to that many characters: past it LimitExceeded is
+        raised, or with ``on_limit`` 'text' the output ends after the
+        last top-level block that fits.
         """
         walker = ast.walker()
+        # the document node (ast can be a CompactTree, whose views are
+        # created on demand and compare equal)
+        root = walker.root
 
         self.buf = ''
         self.last_out = '\n'
 
+        options = getattr(self, 'options', None) or {}
+        max_output = options.get('max_output')
+        policy = on_limit(options)
+        # the length of the output up to the end of the last top-level
+        # block
+        fits = 0
+
+        steps = 0
         event = walker.nxt()
         while event is not None:
-            type_ = event['node'].t
+            node = event['node']
+            type_ = node.t
             if hasattr(self, type_):
-                getattr(self, type_)(event['node'], event['entering'])
+                getattr(self, type_)(node, event['entering'])
+            if deadline is not None:
+                steps += 1
+                if steps == DEADLINE_INTERVAL:
+                    steps = 0
+                    check_deadline(deadline)
+            if max_output is not None:
+                if len(self.buf) > max_output:
+                    if policy == 'raise':
+                        raise LimitExceeded('max_output', max_output)
+                    self.buf = self.buf[:fits]
+                    break
+                # a top-level block is complete on exit, or on entering
+                # for leaf blocks, which get no exit event
+                if node.parent == root and (not event['entering'] or
+                                            not node.is_container()):
+                    fits = len(self.buf)
             event = walker.nxt()
 
         return self.buf
@@ -0,0 +1,103 @@
+"""Event-based parsing that never holds the whole document tree.
+
+:func:`events` yields ``(event, type, attributes)`` tuples, where
+``event`` is ``'enter'`` or ``'exit'``, ``type`` is a node type and
+``attributes`` is a dict of the node's attributes that are set::
+
+    for event, t, attrs in commonmark.events(text):
+        if event == 'enter' and t == 'link':
+            links.append(attrs['destination'])
+
+Every node, including leaves like ``text``, gets an ``'enter'`` and an
+``'exit'`` event.  The document is fed to the block parser line by line;
+as soon as a top-level block is closed its inlines are parsed, its
+events are emitted and its nodes are released.  Memory is bounded by
+the largest top-level block, not by the whole document.
+
+Link reference definitions apply to the whole document, so when the
+text contains any (``]:`` appears in it) a first, block-only pass
+collects them before events are produced.
+"""
+from __future__ import absolute_import, unicode_literals
+
+from commonmark.blocks import Parser, reLineEnding
+
+# Attributes reported when they are set (not None).
+EVENT_ATTRIBUTES = ('literal', 'destination', 'title', 'info', 'level')
+
+
+def iter_lines(text):
+    """Yield the lines of ``text`` as Parser.parse_blocks splits them,
+    with their offsets in ``text``."""
+    start = 0
+    for match in reLineEnding.finditer(text):
+        yield text[start:match.start()], start
+        start = match.end()
+    if not text or text[-1] != '\n':
+        yield text[start:], start
+
+
+def closed_blocks(parser, source):
+    """Feed the lines of ``source`` to ``parser`` and yield each
+    top-level block once it is closed, detached from the document."""
+    if '\0' in source:
+        source = source.replace('\0', '\uFFFD')
+    parser.reset()
+    parser.source = source
+    doc = parser.doc
+    for line, start in iter_lines(source):
+        parser.incorporate_line(line, start)
+        block = doc.first_child
+        while block is not None and not block.is_open:
+            block.unlink()
+            yield block
+            block = doc.first_child
+    while parser.tip:
+        parser.finalize(parser.tip, parser.line_number)
+    parser.source = None
+    block = doc.first_child
+    while block is not None:
+        block.unlink()
+        yield block
+        block = doc.first_child
+
+
+def node_attributes(node):
+    """Return the attributes of ``node`` that are set, as a dict."""
+    attrs = {}
+    for name in EVENT_ATTRIBUTES:
+        value = getattr(node, name, None)
+        if value is not None:
+            attrs[name] = value
+    if node.list_data:
+        attrs['list_data'] = dict(node.list_data)
+    if node.sourcepos:
+        attrs['sourcepos'] = node.sourcepos
+    return attrs
+
+
+def events(source, options=None):
+    """Parse ``source`` and yield its ``(event, type, attributes)``
+    events in document order (see the module documentation)."""
+    options = options if options is not None else {}
+    refmap = {}
+    if ']:' in source:
+        parser = Parser(options)
+        for block in closed_blocks(parser, source):
+            block.dispose()
+        refmap = parser.refmap
+
+    parser = Parser(options)
+    parser.inline_parser.refmap = refmap
+    parser.inline_parser.options = options
+    yield 'enter', 'document', {}
+    for block in closed_blocks(parser, source):
+        parser.parse_inlines(block)
+        for node, entering in block.walker():
+            if entering:
+                yield 'enter', node.t, node_attributes(node)
+                if node.is_container():
+                    continue
+            yield 'exit', node.t, {}
+        block.dispose()
+    yield 'exit', 'document', {}
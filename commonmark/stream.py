@@ -0,0 +1,302 @@
+"""Incremental parsing of text that only ever grows at the end.
+
+A :class:`StreamParser` keeps the block parser's state between calls, so
+feeding it a chunk of text only touches the lines in that chunk and the
+blocks that are still open at the end of the document::
+
+    stream = StreamParser()
+    for chunk in chunks:
+        stream.append(chunk)
+        html = renderer.render(stream.document())
+    html = renderer.render(stream.close())
+
+Top-level blocks go through the inline phase once, when they close.  The
+open tail and any partial last line are only parsed for a
+:meth:`StreamParser.document` snapshot, on a copy, so the live state is
+never disturbed.  A closed block in which a link reference label was
+looked up and not found is parsed again when a definition of that label
+arrives, as a later definition applies to the whole document.  Until
+then the block is *pending*; ``hold_blocks`` bounds how long a block
+waits for its labels.
+"""
+from __future__ import absolute_import, unicode_literals
+
+import re
+
+from commonmark.blocks import Parser, reLineEnding
+from commonmark.node import Node
+
+
+def split_lines(text, final):
+    """Split ``text`` into lines the way Parser.parse_blocks does.
+
+    Unless ``final`` is set, only complete lines are returned, with the
+    rest of the text: an unterminated last line, or a last line ending
+    in ``\\r`` that may turn out to be the start of ``\\r\\n``.
+    """
+    lines = re.split(reLineEnding, text)
+    if final:
+        if text and text[-1] == '\n':
+            lines.pop()
+        return lines, ''
+    rest = lines.pop()
+    if text and text[-1] == '\r':
+        rest = lines.pop() + '\r'
+    return lines, rest
+
+
+def clone_blocks(block, tip=None):
+    """Copy the block structure under ``block`` (inline children are
+    left out).  Returns the copy and the copy of ``tip``."""
+    stack = [(block, None)]
+    root = tip_copy = None
+    while stack:
+        node, parent = stack.pop()
+        copy = Node(node.t, None)
+        copy.__dict__.update(node.__dict__)
+        copy.parent = copy.first_child = copy.last_child = None
+        copy.prv = copy.nxt = None
+        if node.sourcepos is not None:
+            copy.sourcepos = [list(node.sourcepos[0]),
+                              list(node.sourcepos[1])]
+        copy.list_data = dict(node.list_data)
+        if 'content_spans' in node.__dict__:
+            copy.content_spans = list(node.content_spans)
+        if parent is None:
+            root = copy
+        else:
+            parent.append_child(copy)
+        if node is tip:
+            tip_copy = copy
+        if node.t != 'paragraph' and node.t != 'heading':
+            child = node.last_child
+            while child is not None:
+                stack.append((child, copy))
+                child = child.prv
+    return root, tip_copy
+
+
+def clear_inlines(block):
+    """Dispose of the inline children of the paragraphs and headings
+    in ``block``."""
+    stack = [block]
+    while stack:
+        node = stack.pop()
+        child = node.first_child
+        if node.t == 'paragraph' or node.t == 'heading':
+            while child is not None:
+                nxt = child.nxt
+                child.dispose()
+                child = nxt
+        else:
+            while child is not None:
+                stack.append(child)
+                child = child.nxt
+
+
+def defines(refmap, labels):
+    """Return whether ``refmap`` defines any of ``labels``."""
+    return any(label in refmap for label in labels)
+
+
+class StreamParser(object):
+    """Parse a document that arrives in pieces.
+
+    Every :meth:`document` snapshot, and the tree :meth:`close` returns,
+    is the tree ``Parser.parse()`` would build for all the text appended
+    so far.
+
+    With ``hold_blocks`` set, a closed block stops waiting for the
+    definitions of its undefined labels (such as ``[sic]``) once that
+    many later top-level blocks have closed: it becomes stable, and a
+    definition arriving after that no longer changes it, so the tree can
+    then differ from ``Parser.parse()`` for it.
+    """
+
+    def __init__(self, options=None, hold_blocks=None):
+        self.options = options if options is not None else {}
+        self.hold_blocks = hold_blocks
+        self.parser = Parser(self.options)
+        self.parser.reset()
+        self.parser.inline_parser.refmap = self.parser.refmap
+        self.parser.inline_parser.options = self.options
+        self.doc = self.parser.doc
+        self.closed = False
+        self._rest = ''
+        # The last top-level block that went through the inline phase,
+        # and how many did.
+        self._last_done = None
+        self._done = 0
+        # [block, undefined labels, self._done when parsed] for pending
+        # blocks.
+        self._unresolved = []
+        # Undo information for the current snapshot.
+        self._snapshot = None
+
+    def append(self, text):
+        """Add ``text`` to the end of the document."""
+        if self.closed:
+            raise ValueError('append() on a closed StreamParser')
+        self._restore()
+        lines, self._rest = split_lines(self._rest + text, False)
+        for line in lines:
+            self.parser.incorporate_line(line)
+        self._process_closed()
+
+    def document(self):
+        """Return the document for the text appended so far.
+
+        The open blocks at the end are parsed from a copy, so the tree
+        returned is only valid until the next call to :meth:`append`,
+        :meth:`document` or :meth:`close`.
+        """
+        if self.closed:
+            return self.doc
+        self._restore()
+        parser = self.parser
+        doc = self.doc
+        tail = doc.last_child
+        if tail is not None and not tail.is_open:
+            tail = None
+        lines = self._final_lines()
+        if tail is None and not lines:
+            doc.sourcepos[1] = [parser.line_number, parser.last_line_length]
+            return doc
+
+        # Finish the open blocks and the last line on a throwaway parser.
+        scratch = Parser(self.options)
+        scratch.reset()
+        scratch.refmap.update(parser.refmap)
+        scratch.inline_parser.refmap = scratch.refmap
+        scratch.inline_parser.options = self.options
+        if tail is not None:
+            copy, scratch.tip = clone_blocks(tail, parser.tip)
+            scratch.doc.append_child(copy)
+        scratch.line_number = parser.line_number
+        scratch.last_line_length = parser.last_line_length
+        for line in lines:
+            scratch.incorporate_line(line)
+        while scratch.tip:
+            scratch.finalize(scratch.tip, scratch.line_number)
+
+        # Pending blocks that resolve with the tail's definitions.
+        swapped = []
+        if len(scratch.refmap) > len(parser.refmap):
+            for block, labels, _ in self._unresolved:
+                if not defines(scratch.refmap, labels):
+                    continue
+                copy, _ = clone_blocks(block)
+                scratch.parse_inlines(copy)
+                block.insert_before(copy)
+                block.unlink()
+                swapped.append((block, copy))
+
+        added = []
+        block = scratch.doc.first_child
+        while block is not None:
+            nxt = block.nxt
+            scratch.parse_inlines(block)
+            doc.append_child(block)
+            added.append(block)
+            block = nxt
+        if tail is not None:
+            tail.unlink()
+        self._snapshot = (tail, added, swapped, doc.sourcepos[1])
+        doc.sourcepos[1] = list(scratch.doc.sourcepos[1])
+        return doc
+
+    def close(self):
+        """Finish the document and return it."""
+        if self.closed:
+            return self.doc
+        self._restore()
+        parser = self.parser
+        for line in self._final_lines():
+            parser.incorporate_line(line)
+        self._rest = ''
+        while parser.tip:
+            parser.finalize(parser.tip, parser.line_number)
+        self._process_closed()
+        self.closed = True
+        return self.doc
+
+    def is_closed(self, block):
+        """Return whether the top-level ``block`` of the current tree is
+        closed.  Its inlines can still change when new reference
+        definitions arrive (see :meth:`is_stable`)."""
+        if self.closed:
+            return True
+        if block.parent is not self.doc or block.is_open:
+            return False
+        if self._snapshot is not None:
+            _, added, swapped, _ = self._snapshot
+            if any(block is node for node in added) or \
+               any(block is copy for _, copy in swapped):
+                return False
+        return True
+
+    def is_stable(self, block):
+        """Return whether the top-level ``block`` of the current tree can
+        no longer change as more text arrives: it is closed, and not
+        pending, i.e. every reference label it uses is defined, blank, or
+        no longer waited for (once the stream is closed, every block is
+        stable)."""
+        if not self.is_closed(block):
+            return False
+        return self.closed or \
+            not any(block is entry[0] for entry in self._unresolved)
+
+    def _final_lines(self):
+        # What is left if the text ended here.  Text ending in a line
+        # break has no partial last line, but an empty document has one
+        # (empty) line.
+        if not self._rest and self.parser.line_number > 0:
+            return []
+        return split_lines(self._rest, True)[0]
+
+    def _process_closed(self):
+        parser = self.parser
+        inline_parser = parser.inline_parser
+        if self._last_done is None:
+            block = self.doc.first_child
+        else:
+            block = self._last_done.nxt
+        while block is not None and not block.is_open:
+            inline_parser.missed_labels = labels = set()
+            parser.parse_inlines(block)
+            if labels:
+                self._unresolved.append([block, labels, self._done])
+            self._last_done = block
+            self._done += 1
+            block = block.nxt
+
+        unresolved = []
+        for entry in self._unresolved:
+            block, labels, done = entry
+            if self.hold_blocks is not None and \
+               self._done - done > self.hold_blocks:
+                continue
+            if defines(parser.refmap, labels):
+                clear_inlines(block)
+                inline_parser.missed_labels = labels = set()
+                parser.parse_inlines(block)
+                if not labels:
+                    continue
+                entry[1] = labels
+            unresolved.append(entry)
+        inline_parser.missed_labels = None
+        self._unresolved = unresolved
+
+    def _restore(self):
+        if self._snapshot is None:
+            return
+        tail, added, swapped, end = self._snapshot
+        self._snapshot = None
+        for block in added:
+            block.dispose()
+        for block, copy in swapped:
+            copy.insert_before(block)
+            copy.dispose()
+        if tail is not None:
+            self.doc.append_child(tail)
+        self.doc.sourcepos[1] = end
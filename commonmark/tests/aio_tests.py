@@ -0,0 +1,66 @@
+import asyncio
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import commonmark
+from commonmark import aio
+
+
+class TestAio(unittest.TestCase):
+    small = '*small*'
+    large = '\n\n'.join('# Part %d\n\nSome *text* with a [link](/%d).' % (i, i)
+                        for i in range(300))
+
+    def collect(self, chunks):
+        async def collect():
+            return [chunk async for chunk in chunks]
+        return asyncio.run(collect())
+
+    def test_render(self):
+        for text in [self.small, self.large]:
+            self.assertEqual(asyncio.run(aio.render(text)),
+                             commonmark.commonmark(text))
+        self.assertEqual(asyncio.run(aio.render(self.large, 'json')),
+                         commonmark.commonmark(self.large, 'json'))
+
+    def test_executor_and_limit(self):
+        running = []
+        convert = aio._convert
+
+        def record(*args):
+            running.append(None)
+            self.assertEqual(len(running), 1)
+            try:
+                return convert(*args)
+            finally:
+                running.pop()
+
+        async def render_all(renderer, texts):
+            return await asyncio.gather(
+                *[renderer.render(text) for text in texts])
+
+        texts = [self.small, self.large, self.large[:2000], self.large[:99]]
+        aio._convert = record
+        try:
+            with ThreadPoolExecutor(4) as executor:
+                renderer = aio.AsyncRenderer({'smart': True}, threshold=100,
+                                             executor=executor,
+                                             max_concurrency=1)
+                results = asyncio.run(render_all(renderer, texts))
+        finally:
+            aio._convert = convert
+        converter = commonmark.Converter({'smart': True})
+        self.assertEqual(results, [converter.convert(text) for text in texts])
+
+    def test_stream(self):
+        chunks = self.collect(aio.stream(self.large, chunk_size=1000))
+        self.assertGreater(len(chunks), 5)
+        self.assertEqual(''.join(chunks), commonmark.commonmark(self.large))
+        self.assertEqual(self.collect(aio.stream(self.small)),
+                         [commonmark.commonmark(self.small)])
+        with self.assertRaises(ValueError):
+            self.collect(aio.AsyncRenderer(format='rst').stream(self.large))
+
+
+if __name__ == '__main__':
+    unittest.main()
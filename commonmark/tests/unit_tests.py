@@ -1,5 +1,12 @@
 from __future__ import unicode_literals
 
+import gc
+import io
+import os
+import re
+import subprocess
+import sys
+import threading
 import unittest
 
 try:
@@ -14,17 +21,51 @@ except ImportError:
     example = given
 
 try:
-    from hypothesis.strategies import text
+    from hypothesis.strategies import (
+        text, data, integers, lists, sampled_from)
 except ImportError:
     def text():
         pass
 
+    data = text
+
 
 import commonmark
-from commonmark.blocks import Parser
+from commonmark import compact, interpreters, parallel
+from commonmark.blocks import Parser, reLineEnding
+from commonmark.common import monotonic
+from commonmark.render.cache import FragmentCache
 from commonmark.render.html import HtmlRenderer
-from commonmark.inlines import InlineParser
+from commonmark.render.progressive import ProgressiveHtmlRenderer
+from commonmark.inlines import InlineParser, Reference, literal_text
 from commonmark.node import NodeWalker, Node
+from commonmark.normalize_reference import ReferenceMemo
+from commonmark.plain import is_plain, is_plain_blocks, split_lines
+from commonmark.sax import node_attributes
+from commonmark.stream import StreamParser
+
+if sys.version_info >= (3, 7):
+    # async syntax; collected here so that unit_tests runs them too
+    from commonmark.tests.aio_tests import TestAio  # noqa: F401
+
+
+def run_in_threads(target, count=8):
+    """Run ``target`` in ``count`` threads and re-raise the first error
+    any of them raised."""
+    errors = []
+
+    def run():
+        try:
+            target()
+        except BaseException as e:
+            errors.append(e)
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
 
 
 class TestCommonmark(unittest.TestCase):
@@ -99,6 +140,15 @@ class TestCommonmark(unittest.TestCase):
         html = renderer.render(ast)
         self.assertEqual(html, expected_html)
 
+    def test_render_batch(self):
+        texts = ['*hello!*', 'plain', '', '- a\n- b', '[x]\n\n[x]: /u']
+        for format in ['html', 'json', 'ast', 'rst']:
+            self.assertEqual(
+                commonmark.render_batch(iter(texts), format),
+                [commonmark.commonmark(text, format) for text in texts])
+        with self.assertRaises(ValueError):
+            commonmark.render_batch(texts, 'xml')
+
     def test_regex_vulnerability_link_label(self):
         i = 200
         while i <= 2000:
@@ -116,6 +166,31 @@ class TestCommonmark(unittest.TestCase):
             i *= 10
 
 
+class TestImport(unittest.TestCase):
+    @unittest.skipIf(sys.version_info < (3, 7), 'needs module __getattr__')
+    def test_lazy_submodules(self):
+        code = ('import sys, commonmark; '
+                'print(sorted(m for m in ("json", "threading", '
+                '"commonmark.dump", "commonmark.excerpt", '
+                '"commonmark.render.rst") if m in sys.modules))')
+        out = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEqual(out.strip(), b'[]')
+        self.assertTrue(callable(commonmark.dumpJSON))
+        self.assertTrue(callable(commonmark.ReStructuredTextRenderer))
+        self.assertTrue(callable(commonmark.preview))
+        self.assertTrue(issubclass(commonmark.LimitExceeded,
+                                   commonmark.CommonMarkError))
+        # the names commonmark.main used to import stay reachable
+        from commonmark import main
+        self.assertIs(main.dumpAST, commonmark.dumpAST)
+        self.assertIs(main.ReStructuredTextRenderer,
+                      commonmark.ReStructuredTextRenderer)
+
+    def test_case_folding_table(self):
+        from commonmark import normalize_reference
+        self.assertEqual(normalize_reference._get_xlat()[ord('A')], 'a')
+
+
 class TestHtmlRenderer(unittest.TestCase):
     def test_init(self):
         HtmlRenderer()
@@ -125,11 +200,222 @@ class TestInlineParser(unittest.TestCase):
     def test_init(self):
         InlineParser()
 
+    def test_match(self):
+        parser = InlineParser()
+        parser.subject = 'ab  c'
+        parser.pos = 0
+        self.assertEqual(parser.match(re.compile('^a')), 'a')
+        self.assertEqual(parser.match('^b *'), 'b  ')
+        self.assertIsNone(parser.match('^x'))
+        self.assertEqual(parser.pos, 4)
+
+
+class TestFragmentCache(unittest.TestCase):
+    source = '# a\n\n- b\n- c\n\n> d *e*\n\n```\nf\n```\n'
+
+    def test_reuses_unchanged_blocks(self):
+        cache = FragmentCache()
+        renderer = HtmlRenderer()
+        doc = Parser().parse(self.source)
+        self.assertEqual(cache.render(doc, renderer), renderer.render(doc))
+        self.assertEqual((cache.hits, cache.misses), (0, 4))
+        edited = Parser().parse(self.source.replace('*e*', '_e_ g'))
+        self.assertEqual(cache.render(edited, renderer),
+                         renderer.render(edited))
+        self.assertEqual((cache.hits, cache.misses), (3, 5))
+
+    def test_key_includes_options_and_structure(self):
+        cache = FragmentCache()
+        doc = Parser().parse('- a\n- b\n')
+        loose = Parser().parse('- a\n\n- b\n')
+        self.assertNotEqual(cache.key(doc.first_child, HtmlRenderer()),
+                            cache.key(loose.first_child, HtmlRenderer()))
+        self.assertNotEqual(
+            cache.key(doc.first_child, HtmlRenderer()),
+            cache.key(doc.first_child, HtmlRenderer({'sourcepos': True})))
+        moved = Parser().parse('\n- a\n- b\n')
+        self.assertEqual(cache.key(doc.first_child, HtmlRenderer()),
+                         cache.key(moved.first_child, HtmlRenderer()))
+        self.assertNotEqual(
+            cache.key(doc.first_child, HtmlRenderer({'sourcepos': True})),
+            cache.key(moved.first_child, HtmlRenderer({'sourcepos': True})))
+
+    def test_bounds(self):
+        cache = FragmentCache(max_entries=2)
+        cache.render(Parser().parse(self.source), HtmlRenderer())
+        self.assertEqual(len(cache), 2)
+        cache = FragmentCache(max_bytes=30)
+        cache.render(Parser().parse(self.source), HtmlRenderer())
+        self.assertLessEqual(cache.stats()['bytes'], 30)
+        self.assertEqual(cache.stats()['bytes'],
+                         sum(len(html) for html in cache._cache.values()))
+
+    def test_dump_and_load(self):
+        cache = FragmentCache()
+        doc = Parser().parse(self.source)
+        cache.render(doc, HtmlRenderer())
+        fp = io.StringIO()
+        cache.dump(fp)
+        fp.seek(0)
+        loaded = FragmentCache()
+        loaded.load(fp)
+        self.assertEqual(loaded.render(doc, HtmlRenderer()),
+                         HtmlRenderer().render(doc))
+        self.assertEqual(loaded.stats()['misses'], 0)
+        self.assertRaises(ValueError, loaded.load, io.StringIO('{}'))
+
+    def test_threads(self):
+        cache = FragmentCache(max_entries=8, max_bytes=400)
+        docs = [Parser().parse(self.source.replace('f', str(i)))
+                for i in range(20)]
+        expected = [HtmlRenderer().render(doc) for doc in docs]
+
+        def work():
+            renderer = HtmlRenderer()
+            for _ in range(20):
+                for doc, html in zip(docs, expected):
+                    self.assertEqual(cache.render(doc, renderer), html)
+        run_in_threads(work)
+        stats = cache.stats()
+        self.assertEqual(stats['hits'] + stats['misses'], 8 * 20 * 20 * 4)
+        self.assertEqual(stats['bytes'],
+                         sum(len(html) for html in cache._cache.values()))
+        self.assertLessEqual(stats['size'], 8)
+
+
+class TestReferenceMemo(unittest.TestCase):
+    def test_normalizes(self):
+        memo = ReferenceMemo()
+        self.assertEqual(memo('[Foo \n  BAR]'), 'foo bar')
+
+    def test_hits_and_misses(self):
+        memo = ReferenceMemo()
+        memo('[a]')
+        memo('[a]')
+        memo('[b]')
+        self.assertEqual(memo.stats(), {
+            'hits': 1, 'misses': 2, 'size': 2, 'maxsize': 1024})
+        memo.clear()
+        self.assertEqual(memo.stats()['size'], 0)
+
+    def test_evicts_least_recently_used(self):
+        memo = ReferenceMemo(maxsize=2)
+        memo('[a]')
+        memo('[b]')
+        memo('[a]')
+        memo('[c]')
+        self.assertEqual(len(memo), 2)
+        memo('[a]')
+        self.assertEqual(memo.hits, 2)
+        memo('[b]')
+        self.assertEqual(memo.misses, 4)
+
+    def test_threads(self):
+        memo = ReferenceMemo(maxsize=16)
+        labels = ['[Label  %d]' % i for i in range(40)]
+
+        def work():
+            for _ in range(50):
+                for label in labels:
+                    self.assertEqual(memo(label), label[1:-1].lower()
+                                     .replace('  ', ' '))
+        run_in_threads(work)
+        stats = memo.stats()
+        self.assertEqual(stats['hits'] + stats['misses'], 8 * 50 * 40)
+        self.assertLessEqual(stats['size'], 16)
+
+    def test_refmap_records(self):
+        parser = Parser()
+        parser.parse('[Foo]: /url "title"\n\n[foo]\n')
+        ref = parser.refmap['foo']
+        self.assertIsInstance(ref, Reference)
+        self.assertEqual(ref.destination, '/url')
+        self.assertEqual(ref['title'], 'title')
+
 
 class TestNode(unittest.TestCase):
     def test_doc_node(self):
         Node('document', [[1, 1], [0, 0]])
 
+    def test_dispose(self):
+        doc = Parser().parse('> *a* [b](c)\n\n- d\n')
+        para = doc.first_child.first_child
+        doc.dispose()
+        self.assertIsNone(doc.first_child)
+        self.assertIsNone(para.parent)
+        self.assertIsNone(para.first_child)
+
+    def test_dispose_subtree(self):
+        doc = Parser().parse('a\n\nb\n\nc\n')
+        with doc.first_child.nxt as para:
+            self.assertEqual(para.t, 'paragraph')
+        self.assertEqual(doc.first_child.nxt, doc.last_child)
+
+    def test_nodes_of_type(self):
+        source = ('# [a](/a)\n\n> - *b* [c][x] ![d](/d)\n>\n'
+                  '>   [e](/e)\n\n[x]: /x\n\nf\n')
+        walked = Parser().parse(source)
+        self.assertIsNone(getattr(walked, 'type_index', None))
+        indexed = Parser({'type_index': True}).parse(source)
+        self.assertIsNotNone(indexed.type_index)
+        for t in ('document', 'heading', 'paragraph', 'item', 'link',
+                  'image', 'emph', 'text', 'code_block'):
+            self.assertEqual(
+                [n.sourcepos for n in indexed.nodes_of_type(t)],
+                [n.sourcepos for n in walked.nodes_of_type(t)])
+        self.assertEqual(
+            [n.destination for n in indexed.nodes_of_type('link')],
+            ['/a', '/x', '/e'])
+        self.assertEqual(indexed.nodes_of_type('code_block'), [])
+
+    def test_disposed_tree_is_not_garbage(self):
+        gc.collect()
+        gc.disable()
+        try:
+            for md in ['*a _b _c _d e*', '**a *b _c d** e_ f*',
+                       '> - [*a*][x]\n\n[x]: /y\n']:
+                Parser().parse(md).dispose()
+                Parser({'type_index': True}).parse(md).dispose()
+            self.assertEqual(gc.collect(), 0)
+        finally:
+            gc.enable()
+
+
+class TestCompactTree(unittest.TestCase):
+    source = ('# Title \u2020\n\n> - *a* [b][x] `c`\n>   - d\n\n'
+              '```py\ncode\n```\n\n<div>\n\n[x]: /url "t"\n')
+
+    def test_render_matches_node_tree(self):
+        for options in ({}, {'sourcepos': True}):
+            expected = HtmlRenderer(options).render(
+                Parser().parse(self.source))
+            tree = compact.parse(self.source)
+            self.assertEqual(HtmlRenderer(options).render(tree), expected)
+            tree = compact.CompactTree.from_node(Parser().parse(self.source))
+            self.assertEqual(HtmlRenderer(options).render(tree), expected)
+
+    def test_views(self):
+        doc = Parser().parse(self.source)
+        tree = compact.CompactTree.from_node(doc)
+        self.assertEqual(len(tree), sum(1 for _, e in doc.walker() if e))
+        for (node, entering), (view, view_entering) in zip(
+                doc.walker(), tree.walker()):
+            self.assertEqual(entering, view_entering)
+            for name in ('t', 'literal', 'destination', 'title', 'info',
+                         'level', 'sourcepos', 'list_data', 'is_fenced',
+                         'fence_length', 'html_block_type'):
+                self.assertEqual(getattr(view, name),
+                                 getattr(node, name, None))
+            for name in ('parent', 'first_child', 'last_child', 'nxt',
+                         'prv'):
+                linked = getattr(view, name)
+                self.assertEqual(
+                    None if linked is None else linked.t,
+                    getattr(getattr(node, name), 't', None))
+        heading = tree.root.first_child
+        self.assertEqual(heading, tree.node(1))
+        self.assertEqual(heading.first_child.literal, 'Title \u2020')
+
 
 class TestNodeWalker(unittest.TestCase):
     def test_node_walker(self):
@@ -152,6 +438,716 @@ class TestParser(unittest.TestCase):
     def test_text(self, s):
         self.parser.parse(s)
 
+    span_lines = ['foo', '    code', '\tcode', '  \tcode', '> quote',
+                  '>\tcode', '- item', '  - sub', '      deep', '```',
+                  '~~~ info', '<div>', '[a]: /url', '# h', 'bar', '===',
+                  '', '   ', '\0', '  ```']
+
+    @given(data())
+    def test_spans_match_line_copies(self, data):
+        lines = data.draw(lists(sampled_from(self.span_lines)))
+        endings = data.draw(lists(sampled_from(['\n', '\r\n', '\r'])))
+        text = ''.join(line + (endings[i] if i < len(endings) else '\n')
+                       for i, line in enumerate(lines))
+        split = re.split(reLineEnding, text)
+        if text.endswith('\n'):
+            split.pop()
+        expected = Parser().parse_lines(split)
+        doc = Parser().parse_blocks(text)
+        self.assertEqual([(n.t, n.sourcepos, n.string_content, n.literal,
+                           n.info) for n, _ in doc.walker()],
+                         [(n.t, n.sourcepos, n.string_content, n.literal,
+                           n.info) for n, _ in expected.walker()])
+
+    def test_tabs_in_container_prefixes(self):
+        cases = [
+            ('- a\n\n\t  code\n  \tb\n',
+             '<ul>\n<li>\n<p>a</p>\n<pre><code>code\n</code></pre>\n'
+             '<p>b</p>\n</li>\n</ul>\n'),
+            ('>\t\tfoo\n>  bar\n',
+             '<blockquote>\n<pre><code>  foo\n</code></pre>\n'
+             '<p>bar</p>\n</blockquote>\n'),
+            ('1.  x\n    \n   \t y\n',
+             '<ol>\n<li>\n<p>x</p>\n<p>y</p>\n</li>\n</ol>\n'),
+        ]
+        for text, html in cases:
+            self.assertEqual(commonmark.commonmark(text), html)
+
+    def test_nested_containers(self):
+        cases = [
+            ('- a\n  - b\n    - c\n\n      d\n  - e\n',
+             '<ul>\n<li>a\n<ul>\n<li>b\n<ul>\n<li>\n<p>c</p>\n<p>d</p>\n'
+             '</li>\n</ul>\n</li>\n<li>e</li>\n</ul>\n</li>\n</ul>\n'),
+            ('> > > a\n> > b\n>\n> > > c\n',
+             '<blockquote>\n<blockquote>\n<blockquote>\n<p>a\nb</p>\n'
+             '</blockquote>\n</blockquote>\n<blockquote>\n<blockquote>\n'
+             '<p>c</p>\n</blockquote>\n</blockquote>\n</blockquote>\n'),
+        ]
+        for text, html in cases:
+            self.assertEqual(commonmark.commonmark(text), html)
+            # the same with tabs, which take the general path
+            self.assertEqual(
+                commonmark.commonmark(text.replace('    ', '\t')), html)
+
+    def test_source_span(self):
+        text = '# Title\r\n\n  ```py\n  x = 1\n  ```  \n> a\n>     b\n\nend'
+        self.assertIsNone(self.parser.parse(text).source_span)
+        doc = Parser({'incremental': True}).parse(text)
+        spans = [(node.t, text[slice(*node.source_span)])
+                 for node, entering in doc.walker()
+                 if entering and node.source_span is not None]
+        self.assertEqual(spans, [
+            ('document', text),
+            ('heading', '# Title'),
+            ('code_block', '```py\n  x = 1\n  ```'),
+            ('block_quote', '> a\n>     b'),
+            ('paragraph', 'a\n>     b'),
+            ('paragraph', 'end'),
+        ])
+        self.assertIsNone(doc.first_child.first_child.source_span)
+        self.assertEqual(doc.source, text)
+
+    outline_lines = ['foo', '  bar [x]', '# h *e*', '## [x]', '===', '---',
+                     '```', '````', '~~~', '```py', '> # q', '- # i', '',
+                     '    code', '[x]: /u', '<div>', 'Title', '\tb']
+
+    @given(data())
+    def test_outline_matches_parse(self, data):
+        lines = data.draw(lists(sampled_from(self.outline_lines)))
+        text = '\n'.join(lines) + data.draw(sampled_from(['', '\n']))
+        headings = [{'level': node.level, 'text': literal_text(node),
+                     'sourcepos': node.sourcepos}
+                    for node, entering in Parser().parse(text).walker()
+                    if entering and node.t == 'heading']
+        self.assertEqual(Parser().parse_outline(text), headings)
+
+    def test_outline(self):
+        text = ('# A *b*\n\nsome\ntext\n\n```\n# not\n```\n\n'
+                'multi\nline\nsetext\n---\n\n> ## [x]\n\n[x]: /u\n')
+        self.assertEqual(commonmark.outline(text), [
+            {'level': 1, 'text': 'A b', 'sourcepos': [[1, 1], [1, 7]]},
+            {'level': 2, 'text': 'multi\nline\nsetext',
+             'sourcepos': [[10, 1], [13, 3]]},
+            {'level': 2, 'text': 'x', 'sourcepos': [[15, 3], [15, 8]]},
+        ])
+        self.assertEqual(commonmark.outline('just text\n'), [])
+
+
+class TestReparse(unittest.TestCase):
+    lines = ['foo', 'bar *baz*', '', '# h', '- a', '* b', '1. c', '2) d',
+             '> q', '>', '```', '~~~', '    code', '\tcode', '---', '===',
+             '<div>', '</div>', '<!-- x', '-->', '  - nested', '   more',
+             '[x]: /u', '[x]', ' > - x', '    ', '- ', '1.', 'a  ']
+
+    def render(self, doc):
+        return HtmlRenderer({'sourcepos': True}).render(doc)
+
+    def full_parse(self, lines):
+        parser = Parser({'incremental': True})
+        doc = parser.parse_lines(list(lines))
+        parser.process_inlines(doc)
+        return doc
+
+    @given(data())
+    def test_matches_full_parse(self, data):
+        lines = data.draw(lists(sampled_from(self.lines), max_size=20))
+        parser = Parser({'incremental': True})
+        doc = parser.parse_lines(list(lines))
+        parser.process_inlines(doc)
+        for _ in range(data.draw(integers(1, 4))):
+            start = data.draw(integers(1, len(lines) + 1))
+            end = data.draw(integers(start - 1, len(lines)))
+            new = data.draw(lists(sampled_from(self.lines), max_size=4))
+            text = ''.join(line + '\n' for line in new)
+            doc = parser.reparse(doc, (start, end, text))
+            lines = lines[:start - 1] + new + lines[end:]
+            expected = self.full_parse(lines)
+            self.assertEqual(doc.lines, lines)
+            self.assertEqual(doc.sourcepos, expected.sourcepos)
+            self.assertEqual(self.render(doc), self.render(expected))
+
+    def test_reuses_blocks_after_edit(self):
+        parser = Parser({'incremental': True})
+        doc = parser.parse('# a\n\nb\n\n- c\n- d\n\n> e\n')
+        quote = doc.last_child
+        doc = parser.reparse(doc, (3, 3, 'b\nmore\n\nnew\n'))
+        self.assertIs(doc.last_child, quote)
+        self.assertEqual(quote.sourcepos, [[11, 1], [11, 3]])
+        self.assertEqual(
+            self.render(doc),
+            self.render(Parser().parse(
+                '# a\n\nb\nmore\n\nnew\n\n- c\n- d\n\n> e\n')))
+
+    def test_bad_edit(self):
+        parser = Parser({'incremental': True})
+        doc = parser.parse('a\nb\n')
+        self.assertRaises(ValueError, parser.reparse, doc, (4, 4, 'x'))
+        self.assertRaises(ValueError, parser.reparse, doc, (2, 3, 'x'))
+
+    def test_incremental_option(self):
+        # documents only keep their text when asked to
+        parser = Parser()
+        doc = parser.parse('a\n\n[x]: /u\n')
+        self.assertIsNone(getattr(doc, 'source', None))
+        self.assertIsNone(getattr(doc, 'refmap', None))
+        self.assertRaises(ValueError, parser.reparse, doc, (1, 1, 'b'))
+        self.assertIsNone(getattr(parser.parse_lines(['a']), 'lines', None))
+        # the lines of the old document are not changed in place
+        parser = Parser({'incremental': True})
+        lines = ['a', '', 'b']
+        doc = parser.parse_lines(lines)
+        parser.process_inlines(doc)
+        doc = parser.reparse(doc, (3, 3, 'c\n'))
+        self.assertEqual(lines, ['a', '', 'b'])
+        self.assertEqual(doc.lines, ['a', '', 'c'])
+
+
+class TestPlainText(unittest.TestCase):
+    pieces = ['word', 'a', ' ', '\n', '\n', '\r\n', '\r', '!', '"', '>',
+              '1', '2.', '-', '\t', '\x0c', '\u2003', '\xa0', '*', '#']
+
+    def full_parse(self, text):
+        parser = Parser()
+        doc = parser.parse_lines(split_lines(text))
+        parser.process_inlines(doc)
+        return doc
+
+    def signature(self, doc):
+        return [(node.t, node.sourcepos, node.string_content, node.literal,
+                 node.last_line_blank, node.is_open)
+                for node, entering in doc.walker()]
+
+    @given(data())
+    def test_matches_full_parse(self, data):
+        text = ''.join(data.draw(lists(sampled_from(self.pieces))))
+        expected = self.full_parse(text)
+        self.assertEqual(self.signature(Parser().parse(text)),
+                         self.signature(expected))
+        self.assertEqual(commonmark.commonmark(text),
+                         HtmlRenderer().render(expected))
+
+    def test_detection(self):
+        self.assertTrue(is_plain('Thanks!\n\nSee you "tomorrow" > 3pm.'))
+        self.assertTrue(is_plain('trailing spaces at the end  '))
+        for text in ['# h', 'a\n- b', 'a\n 1', '2. x', 'a *b*', 'a  \nb',
+                     'a & b', 'x\ry\r[a]: /u', 'a\0']:
+            self.assertFalse(is_plain(text), text)
+        self.assertTrue(is_plain_blocks('a *b* `c`'))
+        self.assertFalse(is_plain_blocks('a\n\tb'))
+
+    def test_html(self):
+        self.assertEqual(commonmark.commonmark(''), '')
+        self.assertEqual(commonmark.commonmark('a\r\nb\n\n\n"c"\n'),
+                         '<p>a\nb</p>\n<p>&quot;c&quot;</p>\n')
+
+
+class TestConverter(unittest.TestCase):
+    texts = ['*%d* "quoted"\nline' % i if i % 2 else '# [x]\n\n[x]: /u'
+             for i in range(40)]
+
+    def test_options_not_modified(self):
+        options = {'sourcepos': True}
+        renderer = HtmlRenderer(options)
+        self.assertEqual(options, {'sourcepos': True})
+        self.assertEqual(renderer.options['softbreak'], '\n')
+        HtmlRenderer({'softbreak': '<br />'})
+        self.assertEqual(HtmlRenderer().options['softbreak'], '\n')
+
+    def test_options(self):
+        options = commonmark.Options({'smart': True}, sourcepos=True)
+        self.assertEqual(dict(options), {'smart': True, 'sourcepos': True})
+        self.assertEqual(hash(options),
+                         hash(commonmark.Options(smart=True, sourcepos=True)))
+        with self.assertRaises(TypeError):
+            options['safe'] = True
+        with self.assertRaises(AttributeError):
+            options.safe = True
+        html = HtmlRenderer(options).render(Parser(options).parse('"a"'))
+        self.assertEqual(html, '<p data-sourcepos="1:1-1:3">'
+                               '\u201ca\u201d</p>\n')
+
+    def test_convert(self):
+        for options in [None, {'smart': True}, {'softbreak': '<br />'}]:
+            converter = commonmark.Converter(options)
+            for text in self.texts + ['plain\ntext']:
+                expected = HtmlRenderer(options).render(
+                    Parser(options).parse(text))
+                self.assertEqual(converter.convert(text), expected)
+                self.assertEqual(
+                    converter.render(converter.parse(text)), expected)
+        converter = commonmark.Converter(format='json')
+        self.assertEqual(converter.convert(self.texts[0]),
+                         commonmark.commonmark(self.texts[0], 'json'))
+
+    def test_threads(self):
+        converter = commonmark.Converter({'smart': True})
+        expected = [commonmark.Converter({'smart': True}).convert(text)
+                    for text in self.texts]
+        results = {}
+        start = threading.Barrier(8) if hasattr(threading, 'Barrier') \
+            else None
+
+        def work(number):
+            if start is not None:
+                start.wait()
+            results[number] = [[converter.convert(text)
+                                for text in self.texts]
+                               for _ in range(10)]
+        threads = [threading.Thread(target=work, args=(number,))
+                   for number in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 8)
+        for runs in results.values():
+            for run in runs:
+                self.assertEqual(run, expected)
+
+
+@unittest.skipIf(sys.version_info < (3, 7), 'needs executor initializer')
+class TestParallel(unittest.TestCase):
+    texts = ['*%d*' % i if i % 3 else 'page %d' % i for i in range(50)]
+
+    def test_render_many(self):
+        expected = commonmark.render_batch(self.texts)
+        self.assertEqual(parallel.render_many(self.texts, workers=2),
+                         expected)
+        self.assertEqual(parallel.render_many(iter(self.texts), workers=3,
+                                              chunksize=7, format='json'),
+                         commonmark.render_batch(self.texts, 'json'))
+        self.assertEqual(parallel.render_many([], workers=2), [])
+
+    def test_render_unordered(self):
+        results = parallel.render_unordered(self.texts, workers=2,
+                                            chunksize=4)
+        self.assertEqual(sorted(results),
+                         list(enumerate(commonmark.render_batch(self.texts))))
+
+    def test_bad_format(self):
+        with self.assertRaises(ValueError):
+            parallel.render_many(self.texts, format='xml')
+
+    @unittest.skipIf(sys.version_info < (3, 8), 'needs shared_memory')
+    def test_render_shared(self):
+        with parallel.render_shared(self.texts, workers=2,
+                                    chunksize=8) as results:
+            self.assertEqual([bytes(view).decode('utf-8')
+                              for view in results],
+                             commonmark.render_batch(self.texts))
+            self.assertEqual(len(results.segments), 7)
+            names = [segment.name for segment in results.segments]
+        self.assertEqual(len(results), 0)
+        from multiprocessing import shared_memory
+        for name in names:
+            with self.assertRaises(FileNotFoundError):
+                shared_memory.SharedMemory(name=name)
+
+    @unittest.skipIf(sys.version_info < (3, 8), 'needs shared_memory')
+    def test_render_shared_error(self):
+        closed = []
+        close = parallel.SharedResults.close
+
+        def record_close(results):
+            closed.append(len(results.segments))
+            close(results)
+        parallel.SharedResults.close = record_close
+        try:
+            with self.assertRaises(TypeError):
+                parallel.render_shared(self.texts + [None], workers=2,
+                                       chunksize=10)
+        finally:
+            parallel.SharedResults.close = close
+        self.assertEqual(closed, [5])
+        with self.assertRaises(ValueError):
+            parallel.render_shared(self.texts, format='ast')
+
+    def test_interpreters(self):
+        texts = self.texts + ['\u2020 \U0001f600 *x*']
+        self.assertEqual(interpreters.render_many(texts, workers=2),
+                         commonmark.render_batch(texts))
+        self.assertEqual(interpreters.render_many(texts, workers=2,
+                                                  chunksize=5, format='rst'),
+                         commonmark.render_batch(texts, 'rst'))
+        with self.assertRaises(ValueError):
+            interpreters.render_many(texts, format='ast')
+
+
+class TestDeadline(unittest.TestCase):
+    def test_past_deadline(self):
+        past = monotonic() - 1
+        for text in ['line &\n' * 1000, '- a\n' * 1000, '*a ' * 1000,
+                     '[a ' * 1000 + '**b ' * 1000]:
+            parser = Parser()
+            with self.assertRaises(commonmark.DeadlineExceeded):
+                parser.parse(text, deadline=past)
+            self.assertIsNone(parser.deadline)
+            self.assertIsNone(parser.inline_parser.deadline)
+            with self.assertRaises(commonmark.DeadlineExceeded):
+                commonmark.commonmark(text, deadline=past)
+        doc = Parser().parse('- *a*\n' * 100)
+        with self.assertRaises(commonmark.DeadlineExceeded):
+            HtmlRenderer().render(doc, past)
+        self.assertIsInstance(commonmark.DeadlineExceeded(),
+                              commonmark.CommonMarkError)
+
+    def test_future_deadline(self):
+        future = monotonic() + 3600
+        text = '# a\n\n- *b* [c](/d)\n' * 200
+        self.assertEqual(commonmark.commonmark(text, deadline=future),
+                         commonmark.commonmark(text))
+        converter = commonmark.Converter(format='rst')
+        self.assertEqual(converter.convert(text, future),
+                         converter.convert(text))
+        self.assertEqual(commonmark.commonmark('*a*', deadline=future),
+                         '<p><em>a</em></p>\n')
+
+    def test_expired_deadline(self):
+        # the clock is checked before anything is parsed, so even short
+        # inputs raise
+        past = monotonic() - 1
+        for text in ['*a*', 'a']:
+            with self.assertRaises(commonmark.DeadlineExceeded):
+                commonmark.commonmark(text, deadline=past)
+            with self.assertRaises(commonmark.DeadlineExceeded):
+                commonmark.Converter().convert(text, past)
+
+    def test_steps_start_over(self):
+        parser = Parser()
+        future = monotonic() + 3600
+        parser.parse('*a* ' * 10, deadline=future)
+        steps = parser.inline_parser.steps
+        self.assertTrue(0 < steps < 64)
+        parser.parse('*a* ' * 10, deadline=future)
+        self.assertEqual(parser.inline_parser.steps, steps)
+
+
+class TestLimits(unittest.TestCase):
+    def convert(self, text, **options):
+        return commonmark.Converter(options).convert(text)
+
+    def assertLimit(self, limit, text, **options):
+        with self.assertRaises(commonmark.LimitExceeded) as cm:
+            self.convert(text, **options)
+        self.assertEqual(cm.exception.limit, limit)
+        self.assertEqual(cm.exception.maximum, options[limit])
+
+    def test_under_limits(self):
+        text = '# a\n\n> - *b* [c](/d)\n' * 20
+        self.assertEqual(
+            self.convert(text, max_nodes=1000, max_depth=3,
+                         max_inline_depth=1, max_output=10000),
+            commonmark.commonmark(text))
+
+    def test_raise(self):
+        self.assertLimit('max_nodes', 'a\n\nb\n\nc\n', max_nodes=2)
+        self.assertLimit('max_nodes', 'a *b* c', max_nodes=3)
+        self.assertLimit('max_depth', '> > > a\n', max_depth=2)
+        self.assertLimit('max_depth', '> - a\n', max_depth=2)
+        self.assertLimit('max_inline_depth', '*a [b](/c)*',
+                         max_inline_depth=1)
+        self.assertLimit('max_output', 'a\n\nb\n', max_output=10)
+        self.assertIsInstance(commonmark.LimitExceeded('max_nodes', 1),
+                              commonmark.CommonMarkError)
+        with self.assertRaises(ValueError):
+            commonmark.Converter({'on_limit': 'stop'})
+
+    def test_text(self):
+        self.assertEqual(
+            self.convert('a\n\n# b\n\n> c\n\n- d\n', max_nodes=2,
+                         on_limit='text'),
+            '<p>a</p>\n<h1>b</h1>\n<p>&gt; c\n\n- d</p>\n')
+        self.assertEqual(
+            self.convert('a *b* `c` d', max_nodes=5, on_limit='text'),
+            '<p>a *b* `c` d</p>\n')
+        self.assertEqual(
+            self.convert('> > > a\n', max_depth=2, on_limit='text'),
+            '<blockquote>\n<blockquote>\n<p>&gt; a</p>\n</blockquote>\n'
+            '</blockquote>\n')
+        self.assertEqual(
+            self.convert('> - a\n', max_depth=2, on_limit='text'),
+            '<blockquote>\n<p>- a</p>\n</blockquote>\n')
+        self.assertEqual(
+            self.convert('*a [b *c*](/d)*', max_inline_depth=2,
+                         on_limit='text'),
+            '<p>*a <a href="/d">b <em>c</em></a>*</p>\n')
+        self.assertEqual(
+            self.convert('a\n\nb\n\nc\n', max_output=18, on_limit='text'),
+            '<p>a</p>\n<p>b</p>\n')
+
+    def test_output_keeps_blocks_that_fit(self):
+        options = {'max_output': 60, 'on_limit': 'text'}
+        words = 'word ' * 30
+        # leaf blocks have no exit event
+        for text, html in [('```\ncode\n```\n\n', '<pre><code>code\n'
+                            '</code></pre>\n'),
+                           ('---\n\n', '<hr />\n'),
+                           ('<div>\n\n', '<div>\n')]:
+            self.assertEqual(self.convert(text + words, **options), html)
+        # the top-level blocks of a compact tree are fresh views
+        self.assertEqual(
+            HtmlRenderer(options).render(compact.parse('para\n\n' + words)),
+            '<p>para</p>\n')
+
+    def test_bounded_while_building(self):
+        def count(text, **options):
+            options['on_limit'] = 'text'
+            doc = Parser(options).parse(text)
+            return sum(1 for _, entering in doc.walker() if entering) - 1
+
+        for text in ['- ' * 20000 + 'x', '> ' * 20000 + 'x', '- a\n' * 500,
+                     '*a ' * 2000 + 'b' + '*' * 2000, '[a](/b) ' * 2000]:
+            self.assertLess(count(text, max_nodes=100), 200)
+        # the documented bound, also for small limits
+        for text in ['> bar\n\nbaz', '- a\n\nb', '<http://a> ' * 50,
+                     '> - # *a* [b](/c)\n' * 10]:
+            for max_nodes in range(1, 8):
+                self.assertLessEqual(count(text, max_nodes=max_nodes),
+                                     2 * max_nodes + 4)
+        # emphasis made inside link text counts the link
+        self.assertLimit('max_inline_depth', '[*a*](/u)',
+                         max_inline_depth=1)
+        self.assertLimit('max_nodes', 'a *b*', max_nodes=4)
+        self.assertEqual(self.convert('a *b*', max_nodes=6),
+                         '<p>a <em>b</em></p>\n')
+
+    def test_rest_sourcepos(self):
+        parser = Parser({'max_nodes': 1, 'on_limit': 'text'})
+        doc = parser.parse('a\n\nb\nc\n')
+        rest = doc.last_child
+        self.assertEqual(rest.sourcepos, [[2, 1], [4, 1]])
+        self.assertEqual(doc.sourcepos, [[1, 1], [4, 1]])
+        # counting starts over with each document
+        self.assertEqual(parser.parse('a\n').first_child.first_child.literal,
+                         'a')
+
+
+class TestPreview(unittest.TestCase):
+    text = ('# Title\n\nSome *text* with [a link][x].\n\n- one\n- two\n\n'
+            'The end.\n\n[x]: /url "T"\n')
+
+    def test_max_blocks(self):
+        self.assertEqual(
+            commonmark.preview(self.text, max_blocks=2),
+            '<h1>Title</h1>\n<p>Some <em>text</em> with '
+            '<a href="/url" title="T">a link</a>.</p>\n')
+        self.assertEqual(commonmark.preview(self.text, max_blocks=10),
+                         commonmark.commonmark(self.text))
+        self.assertEqual(commonmark.preview(self.text),
+                         commonmark.commonmark(self.text))
+        self.assertEqual(commonmark.preview(''), '')
+
+    def test_max_chars(self):
+        self.assertEqual(
+            commonmark.preview(self.text, max_chars=12),
+            '<h1>Title</h1>\n<p>Some <em>te</em></p>\n')
+        self.assertEqual(
+            commonmark.preview(self.text, max_blocks=1, max_chars=100),
+            '<h1>Title</h1>\n')
+        # raw HTML is never cut
+        self.assertEqual(commonmark.preview('a <b>c</b>', max_chars=4),
+                         '<p>a </p>\n')
+        # nor left open: tags whose closing tag is cut off are dropped
+        self.assertEqual(
+            commonmark.preview('a <b>cdef</b> g', max_chars=6),
+            '<p>a c</p>\n')
+        self.assertEqual(
+            commonmark.preview('<i>a</i> <b>cdef</b>', max_chars=14),
+            '<p><i>a</i> cd</p>\n')
+        # elements left open by HTML blocks are closed
+        text = '<div>\n  b\n\na\n\nmore text here and here\n\n</div>\n\nend\n'
+        self.assertEqual(
+            commonmark.preview(text, max_chars=20),
+            '<div>\n  b\n<p>a</p>\n<p>more text </p>\n</div>\n')
+        self.assertEqual(commonmark.preview(text, max_blocks=1),
+                         '<div>\n  b\n</div>\n')
+        self.assertEqual(commonmark.preview(text, max_blocks=5),
+                         commonmark.commonmark(text))
+
+    def test_references(self):
+        text = '[x]: /u\n\n[x] [y]\n\n```\n[y]: /code\n```\n\n[y]: /v\n'
+        self.assertEqual(commonmark.preview(text, max_blocks=1),
+                         '<p><a href="/u">x</a> <a href="/v">y</a></p>\n')
+        # the first definition wins
+        self.assertEqual(
+            commonmark.preview('[z]\n\n[z]: /1\n[z]: /2\n', max_blocks=1),
+            '<p><a href="/1">z</a></p>\n')
+        # definitions inside containers count, lines that only look like
+        # one do not
+        self.assertEqual(commonmark.preview('[foo]\n\n> [foo]: /url\n'),
+                         commonmark.commonmark('[foo]\n\n> [foo]: /url\n'))
+        self.assertEqual(
+            commonmark.preview('[x]\n\nfoo\n[x]: /u\n', max_blocks=1),
+            '<p>[x]</p>\n')
+
+    def test_spec_examples(self):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            '..', '..', 'spec.txt')
+        if not os.path.exists(path):
+            self.skipTest('spec.txt not found')
+        with io.open(path, encoding='utf-8') as f:
+            spec = f.read()
+        examples = re.findall(
+            r'^`{32} example\n([\s\S]*?)^\.\n', spec, re.MULTILINE)
+        self.assertTrue(examples)
+        for example in examples:
+            markdown = example.replace('\u2192', '\t')
+            self.assertEqual(commonmark.preview(markdown),
+                             commonmark.commonmark(markdown), markdown)
+
+
+class TestEvents(unittest.TestCase):
+    def tree_events(self, text):
+        result = []
+        for node, entering in Parser().parse(text).walker():
+            if entering:
+                attrs = {} if node.t == 'document' else \
+                    node_attributes(node)
+                result.append(('enter', node.t, attrs))
+                if node.is_container():
+                    continue
+            result.append(('exit', node.t, {}))
+        return result
+
+    def test_matches_tree(self):
+        for text in ['', 'a', '# [x] *y*\n\n- `z`\n  > q\n\n[x]: /u "t"\n',
+                     '```py\ncode\n```\n\n<div>\n\n1. a\n\n   b\n']:
+            self.assertEqual(list(commonmark.events(text)),
+                             self.tree_events(text))
+
+    def test_events(self):
+        self.assertEqual(list(commonmark.events('[a]\n\n[a]: /u\n')), [
+            ('enter', 'document', {}),
+            ('enter', 'paragraph', {'sourcepos': [[1, 1], [1, 3]]}),
+            ('enter', 'link', {'destination': '/u', 'title': ''}),
+            ('enter', 'text', {'literal': 'a'}),
+            ('exit', 'text', {}),
+            ('exit', 'link', {}),
+            ('exit', 'paragraph', {}),
+            ('exit', 'document', {}),
+        ])
+
+
+class TestStreamParser(unittest.TestCase):
+    def render(self, doc):
+        return HtmlRenderer({'sourcepos': True}).render(doc)
+
+    def assertParsesLike(self, doc, text):
+        self.assertEqual(self.render(doc), self.render(Parser().parse(text)))
+
+    @given(data())
+    def test_matches_full_parse(self, data):
+        pieces = ['foo', 'bar *baz*', '', '# h', '- a', '1. c', '> q',
+                  '```', '    code', '---', '===', '<div>', '  - nested',
+                  '[x]: /u', '[x]', '[y]', ' > - x', '- ']
+        lines = data.draw(lists(sampled_from(pieces), max_size=12))
+        text = '\n'.join(lines)
+        stream = StreamParser()
+        pos = 0
+        while pos < len(text):
+            end = pos + data.draw(integers(1, 8))
+            stream.append(text[pos:end])
+            pos = end
+            self.assertParsesLike(stream.document(), text[:pos])
+        self.assertParsesLike(stream.close(), text)
+
+    def test_line_endings_split_across_chunks(self):
+        stream = StreamParser()
+        for chunk in ['a\r', '\nb\r', '', '\r\n']:
+            stream.append(chunk)
+        self.assertParsesLike(stream.close(), 'a\r\nb\r\r\n')
+
+    def test_later_definition_resolves_earlier_link(self):
+        stream = StreamParser()
+        stream.append('see [x]\n\n')
+        html = HtmlRenderer().render(stream.document())
+        self.assertEqual(html, '<p>see [x]</p>\n')
+        stream.append('[x]: /u')
+        html = HtmlRenderer().render(stream.document())
+        self.assertEqual(html, '<p>see <a href="/u">x</a></p>\n')
+        stream.append('\n\ndone\n')
+        self.assertParsesLike(stream.close(),
+                              'see [x]\n\n[x]: /u\n\ndone\n')
+
+    def test_closed_blocks_are_kept(self):
+        stream = StreamParser()
+        stream.append('# a\n\nb')
+        heading = stream.document().first_child
+        stream.append('c\n')
+        self.assertIs(stream.document().first_child, heading)
+        self.assertIs(stream.close().first_child, heading)
+        self.assertRaises(ValueError, stream.append, 'x')
+
+
+class TestProgressiveHtmlRenderer(unittest.TestCase):
+    def test_final_prefix(self):
+        stream = StreamParser()
+        renderer = ProgressiveHtmlRenderer()
+        stream.append('# a\n\nb')
+        self.assertEqual(renderer.render_progress(stream),
+                         ('<h1>a</h1>\n', '<p>b</p>\n'))
+        stream.append('c\n\n- d')
+        self.assertEqual(renderer.render_progress(stream),
+                         ('<p>bc</p>\n', '<ul>\n<li>d</li>\n</ul>\n'))
+        stream.close()
+        self.assertEqual(renderer.render_progress(stream),
+                         ('<ul>\n<li>d</li>\n</ul>\n', ''))
+
+    def test_unresolved_reference_is_held_back(self):
+        stream = StreamParser()
+        renderer = ProgressiveHtmlRenderer()
+        stream.append('[x]\n\nb\n\n')
+        self.assertEqual(renderer.render_progress(stream),
+                         ('', '<p>[x]</p>\n<p>b</p>\n'))
+        stream.append('[x]: /u\n\n')
+        self.assertEqual(renderer.render_progress(stream),
+                         ('<p><a href="/u">x</a></p>\n<p>b</p>\n', ''))
+
+    def test_only_pending_labels_hold_back(self):
+        # a blank label can never be defined
+        stream = StreamParser()
+        renderer = ProgressiveHtmlRenderer()
+        stream.append('[ ] a\n\nb\n\n')
+        self.assertEqual(renderer.render_progress(stream),
+                         ('<p>[ ] a</p>\n<p>b</p>\n', ''))
+        # other labels are waited for during hold_blocks later blocks
+        stream = StreamParser(hold_blocks=2)
+        renderer = ProgressiveHtmlRenderer()
+        stream.append('[sic]\n\n[y]: /y\n\nb\n\n')
+        self.assertEqual(renderer.render_progress(stream),
+                         ('', '<p>[sic]</p>\n<p>b</p>\n'))
+        self.assertFalse(stream.is_stable(stream.document().first_child))
+        stream.append('c\n\n')
+        self.assertEqual(renderer.render_progress(stream),
+                         ('<p>[sic]</p>\n<p>b</p>\n<p>c</p>\n', ''))
+        stream.append('[sic]: /s\n')
+        self.assertEqual(renderer.render_progress(stream), ('', ''))
+        self.assertEqual(HtmlRenderer().render(stream.close()),
+                         '<p>[sic]</p>\n<p>b</p>\n<p>c</p>\n')
+
+    @given(data())
+    def test_pieces_add_up(self, data):
+        pieces = ['foo', '', '# h', '- a', '> q', '```', '    code', '===',
+                  '[x]: /u', '[x]', '<div>']
+        text = ''.join(line + '\n' for line in data.draw(
+            lists(sampled_from(pieces), max_size=12)))
+        stream = StreamParser()
+        renderer = ProgressiveHtmlRenderer({'sourcepos': True})
+        html = HtmlRenderer({'sourcepos': True})
+        output = ''
+        pos = 0
+        while pos < len(text):
+            end = pos + data.draw(integers(1, 8))
+            stream.append(text[pos:end])
+            pos = end
+            final, provisional = renderer.render_progress(stream)
+            output += final
+            self.assertEqual(output + provisional,
+                             html.render(Parser().parse(text[:pos])))
+        stream.close()
+        output += renderer.render_progress(stream)[0]
+        self.assertEqual(output, html.render(Parser().parse(text)))
+
 
 if __name__ == '__main__':
     unittest.main()